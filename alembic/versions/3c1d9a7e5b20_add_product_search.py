@@ -0,0 +1,55 @@
+"""add product search
+
+Revision ID: 3c1d9a7e5b20
+Revises: f62818a24fd8
+Create Date: 2026-10-16 12:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3c1d9a7e5b20'
+down_revision: Union[str, Sequence[str], None] = 'f62818a24fd8'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+
+    op.add_column('products', sa.Column('search_document', postgresql.TSVECTOR(), nullable=True))
+
+    # Заполняем документ для уже существующих товаров (то же выражение, что в db/search.py)
+    op.execute("""
+        UPDATE products AS p SET search_document =
+            setweight(to_tsvector('simple', coalesce(p.name, '')), 'A')
+            || setweight(to_tsvector('simple', coalesce(
+                (SELECT b.name FROM brands AS b WHERE b.id = p.brand_id), '')), 'B')
+            || setweight(to_tsvector('simple', coalesce(
+                (SELECT c.name FROM categories AS c WHERE c.id = p.category_id), '')), 'B')
+            || setweight(to_tsvector('simple', coalesce(
+                (SELECT string_agg(i.name, ' ')
+                 FROM product_ingredients AS pi
+                 JOIN ingredients AS i ON i.id = pi.ingredient_id
+                 WHERE pi.product_id = p.id), '')), 'C')
+    """)
+
+    op.create_index('ix_products_search_document', 'products', ['search_document'], unique=False, postgresql_using='gin')
+    op.create_index('ix_products_name_trgm', 'products', ['name'], unique=False, postgresql_using='gin', postgresql_ops={'name': 'gin_trgm_ops'})
+    op.create_index('ix_brands_name_trgm', 'brands', ['name'], unique=False, postgresql_using='gin', postgresql_ops={'name': 'gin_trgm_ops'})
+    op.create_index('ix_categories_name_trgm', 'categories', ['name'], unique=False, postgresql_using='gin', postgresql_ops={'name': 'gin_trgm_ops'})
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_categories_name_trgm', table_name='categories', postgresql_using='gin')
+    op.drop_index('ix_brands_name_trgm', table_name='brands', postgresql_using='gin')
+    op.drop_index('ix_products_name_trgm', table_name='products', postgresql_using='gin')
+    op.drop_index('ix_products_search_document', table_name='products', postgresql_using='gin')
+    op.drop_column('products', 'search_document')
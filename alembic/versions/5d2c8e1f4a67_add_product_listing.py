@@ -0,0 +1,65 @@
+"""add product listing read model
+
+Revision ID: 5d2c8e1f4a67
+Revises: 8b4e2f6a9c13
+Create Date: 2026-10-16 18:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5d2c8e1f4a67'
+down_revision: Union[str, Sequence[str], None] = '8b4e2f6a9c13'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('product_listing',
+    sa.Column('product_id', sa.Integer(), nullable=False),
+    sa.Column('brand_name', sa.String(length=100), nullable=True),
+    sa.Column('category_name', sa.String(length=100), nullable=True),
+    sa.Column('skin_type_ids', postgresql.ARRAY(sa.Integer()), server_default='{}', nullable=False),
+    sa.Column('concern_ids', postgresql.ARRAY(sa.Integer()), server_default='{}', nullable=False),
+    sa.Column('tag_ids', postgresql.ARRAY(sa.Integer()), server_default='{}', nullable=False),
+    sa.Column('ingredient_ids', postgresql.ARRAY(sa.Integer()), server_default='{}', nullable=False),
+    sa.ForeignKeyConstraint(['product_id'], ['products.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('product_id')
+    )
+
+    # Заполняем строки для уже существующих товаров (то же выражение, что в db/read_model.py)
+    op.execute("""
+        INSERT INTO product_listing
+            (product_id, brand_name, category_name, skin_type_ids, concern_ids, tag_ids, ingredient_ids)
+        SELECT
+            p.id,
+            b.name,
+            c.name,
+            ARRAY(SELECT x.skin_type_id FROM product_skin_types AS x WHERE x.product_id = p.id ORDER BY 1),
+            ARRAY(SELECT x.concern_id FROM product_concerns AS x WHERE x.product_id = p.id ORDER BY 1),
+            ARRAY(SELECT x.tag_id FROM product_tags AS x WHERE x.product_id = p.id ORDER BY 1),
+            ARRAY(SELECT x.ingredient_id FROM product_ingredients AS x WHERE x.product_id = p.id ORDER BY 1)
+        FROM products AS p
+        LEFT JOIN brands AS b ON b.id = p.brand_id
+        LEFT JOIN categories AS c ON c.id = p.category_id
+    """)
+
+    op.create_index('ix_product_listing_skin_type_ids', 'product_listing', ['skin_type_ids'], unique=False, postgresql_using='gin')
+    op.create_index('ix_product_listing_concern_ids', 'product_listing', ['concern_ids'], unique=False, postgresql_using='gin')
+    op.create_index('ix_product_listing_tag_ids', 'product_listing', ['tag_ids'], unique=False, postgresql_using='gin')
+    op.create_index('ix_product_listing_ingredient_ids', 'product_listing', ['ingredient_ids'], unique=False, postgresql_using='gin')
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_product_listing_ingredient_ids', table_name='product_listing', postgresql_using='gin')
+    op.drop_index('ix_product_listing_tag_ids', table_name='product_listing', postgresql_using='gin')
+    op.drop_index('ix_product_listing_concern_ids', table_name='product_listing', postgresql_using='gin')
+    op.drop_index('ix_product_listing_skin_type_ids', table_name='product_listing', postgresql_using='gin')
+    op.drop_table('product_listing')
@@ -0,0 +1,37 @@
+"""add reverse association indexes
+
+Revision ID: 8b4e2f6a9c13
+Revises: 3c1d9a7e5b20
+Create Date: 2026-10-16 14:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8b4e2f6a9c13'
+down_revision: Union[str, Sequence[str], None] = '3c1d9a7e5b20'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index('ix_product_ingredients_ingredient_id_product_id', 'product_ingredients', ['ingredient_id', 'product_id'], unique=False)
+    op.create_index('ix_product_skin_types_skin_type_id_product_id', 'product_skin_types', ['skin_type_id', 'product_id'], unique=False)
+    op.create_index('ix_product_concerns_concern_id_product_id', 'product_concerns', ['concern_id', 'product_id'], unique=False)
+    op.create_index('ix_product_tags_tag_id_product_id', 'product_tags', ['tag_id', 'product_id'], unique=False)
+    op.create_index(op.f('ix_products_brand_id'), 'products', ['brand_id'], unique=False)
+    op.create_index(op.f('ix_products_category_id'), 'products', ['category_id'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_products_category_id'), table_name='products')
+    op.drop_index(op.f('ix_products_brand_id'), table_name='products')
+    op.drop_index('ix_product_tags_tag_id_product_id', table_name='product_tags')
+    op.drop_index('ix_product_concerns_concern_id_product_id', table_name='product_concerns')
+    op.drop_index('ix_product_skin_types_skin_type_id_product_id', table_name='product_skin_types')
+    op.drop_index('ix_product_ingredients_ingredient_id_product_id', table_name='product_ingredients')
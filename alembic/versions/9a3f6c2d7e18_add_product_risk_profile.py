@@ -0,0 +1,72 @@
+"""add product risk profile
+
+Revision ID: 9a3f6c2d7e18
+Revises: 5d2c8e1f4a67
+Create Date: 2026-10-16 20:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '9a3f6c2d7e18'
+down_revision: Union[str, Sequence[str], None] = '5d2c8e1f4a67'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('product_listing', sa.Column('safety_rank', sa.SmallInteger(), nullable=True))
+    op.add_column('product_listing', sa.Column('max_allergenicity', sa.Integer(), nullable=True))
+    op.add_column('product_listing', sa.Column('max_carcinogenicity', sa.Integer(), nullable=True))
+    op.add_column('product_listing', sa.Column('safe_count', sa.Integer(), server_default='0', nullable=False))
+    op.add_column('product_listing', sa.Column('caution_count', sa.Integer(), server_default='0', nullable=False))
+    op.add_column('product_listing', sa.Column('danger_count', sa.Integer(), server_default='0', nullable=False))
+    op.add_column('product_listing', sa.Column('unknown_count', sa.Integer(), server_default='0', nullable=False))
+
+    # Считаем профиль для уже существующих товаров (то же выражение, что в db/risk.py)
+    op.execute("""
+        UPDATE product_listing AS pl SET
+            safety_rank = risk.safety_rank,
+            max_allergenicity = risk.max_allergenicity,
+            max_carcinogenicity = risk.max_carcinogenicity,
+            safe_count = risk.safe_count,
+            caution_count = risk.caution_count,
+            danger_count = risk.danger_count,
+            unknown_count = risk.unknown_count
+        FROM (
+            SELECT
+                pi.product_id,
+                max(CASE i.safety_level WHEN 'safe' THEN 0 WHEN 'unknown' THEN 1 WHEN 'caution' THEN 2 WHEN 'danger' THEN 3 END) AS safety_rank,
+                max(i.allergenicity) AS max_allergenicity,
+                max(i.carcinogenicity) AS max_carcinogenicity,
+                count(*) FILTER (WHERE i.safety_level = 'safe') AS safe_count,
+                count(*) FILTER (WHERE i.safety_level = 'caution') AS caution_count,
+                count(*) FILTER (WHERE i.safety_level = 'danger') AS danger_count,
+                count(*) FILTER (WHERE i.safety_level = 'unknown') AS unknown_count
+            FROM product_ingredients AS pi
+            JOIN ingredients AS i ON i.id = pi.ingredient_id
+            GROUP BY pi.product_id
+        ) AS risk
+        WHERE risk.product_id = pl.product_id
+    """)
+
+    op.create_index('ix_product_listing_safety_rank', 'product_listing', ['safety_rank'], unique=False)
+    op.create_index('ix_product_listing_max_allergenicity', 'product_listing', ['max_allergenicity'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_product_listing_max_allergenicity', table_name='product_listing')
+    op.drop_index('ix_product_listing_safety_rank', table_name='product_listing')
+    op.drop_column('product_listing', 'unknown_count')
+    op.drop_column('product_listing', 'danger_count')
+    op.drop_column('product_listing', 'caution_count')
+    op.drop_column('product_listing', 'safe_count')
+    op.drop_column('product_listing', 'max_carcinogenicity')
+    op.drop_column('product_listing', 'max_allergenicity')
+    op.drop_column('product_listing', 'safety_rank')
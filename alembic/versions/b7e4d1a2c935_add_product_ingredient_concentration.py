@@ -0,0 +1,28 @@
+"""add product ingredient concentration
+
+Revision ID: b7e4d1a2c935
+Revises: 9a3f6c2d7e18
+Create Date: 2026-10-16 22:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b7e4d1a2c935'
+down_revision: Union[str, Sequence[str], None] = '9a3f6c2d7e18'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('product_ingredients', sa.Column('concentration', sa.Numeric(precision=5, scale=2), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('product_ingredients', 'concentration')
@@ -0,0 +1,36 @@
+"""add updated_at and version
+
+Revision ID: c4a8e2f1d6b3
+Revises: b7e4d1a2c935
+Create Date: 2026-10-17 10:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c4a8e2f1d6b3'
+down_revision: Union[str, Sequence[str], None] = 'b7e4d1a2c935'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# products не версионируются: ETag товара считается по содержимому ответа,
+# которое меняется и при правке связей и справочников
+TABLES = ('brands', 'categories', 'ingredients', 'skin_types', 'concerns', 'tags')
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    for table in TABLES:
+        op.add_column(table, sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False))
+        op.add_column(table, sa.Column('version', sa.Integer(), server_default='1', nullable=False))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    for table in reversed(TABLES):
+        op.drop_column(table, 'version')
+        op.drop_column(table, 'updated_at')
@@ -0,0 +1,91 @@
+"""Латентность отфильтрованного списка товаров (логика GET /products/all).
+
+Запускать на БД, заполненной bench.seed и обновлённой до head:
+
+    python -m bench.filtered_listing
+    python -m bench.filtered_listing --drop reverse
+    python -m bench.filtered_listing --drop listing
+
+--drop удаляет набор индексов в транзакции замера и откатывает её в конце,
+схема и product_listing не меняются: reverse — обратные индексы связей
+(миграция 8b4e2f6a9c13), listing — GIN-индексы массивов product_listing.
+Пока идёт замер, таблицы с удалёнными индексами заблокированы для других
+сессий.
+"""
+import argparse
+import statistics
+import time
+from typing import Optional
+
+from fastapi import Response
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from core.enums import MatchMode
+from db.connection import get_engine, start_db_connections
+from db.product_filters import ProductFilters
+from server.api.product import _list_products
+
+CASES = {
+    "no filters": ProductFilters(),
+    "category": ProductFilters(category_id=3),
+    "brand name": ProductFilters(brand="Brand 12"),
+    "skin type": ProductFilters(skin_type_ids=[2]),
+    "tag + concern": ProductFilters(tag_ids=[5], concern_ids=[7]),
+    "ingredient": ProductFilters(ingredient_ids=[42]),
+    "ingredients all": ProductFilters(ingredient_ids=[42, 43], ingredient_match=MatchMode.all),
+    "four facets": ProductFilters(
+        skin_type_ids=[1, 2], concern_ids=[3, 4], tag_ids=[5, 6], ingredient_ids=[7, 8, 9],
+    ),
+}
+
+INDEX_SETS = {
+    "reverse": [
+        "ix_product_ingredients_ingredient_id_product_id",
+        "ix_product_skin_types_skin_type_id_product_id",
+        "ix_product_concerns_concern_id_product_id",
+        "ix_product_tags_tag_id_product_id",
+        "ix_products_brand_id",
+        "ix_products_category_id",
+    ],
+    "listing": [
+        "ix_product_listing_skin_type_ids",
+        "ix_product_listing_concern_ids",
+        "ix_product_listing_tag_ids",
+        "ix_product_listing_ingredient_ids",
+    ],
+}
+
+
+def run(repeat: int, limit: int, drop: Optional[str] = None) -> None:
+    with get_engine().connect() as conn:
+        transaction = conn.begin()
+        try:
+            for index in INDEX_SETS.get(drop, []):
+                conn.execute(text(f"DROP INDEX {index}"))
+
+            print(f"{'case':<18}{'median ms':>12}{'p95 ms':>10}{'rows':>7}")
+            for name, filters in CASES.items():
+                timings, rows = [], 0
+                for _ in range(repeat):
+                    started = time.perf_counter()
+                    with Session(bind=conn) as s:
+                        rows = len(_list_products(s, Response(), filters, None, 0, limit))
+                    timings.append((time.perf_counter() - started) * 1000)
+                timings.sort()
+                p95 = timings[min(len(timings) - 1, int(len(timings) * 0.95))]
+                print(f"{name:<18}{statistics.median(timings):>12.2f}{p95:>10.2f}{rows:>7}")
+        finally:
+            # Удалённые индексы возвращаются откатом
+            transaction.rollback()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--repeat", type=int, default=50)
+    parser.add_argument("--limit", type=int, default=50)
+    parser.add_argument("--drop", choices=sorted(INDEX_SETS))
+    args = parser.parse_args()
+
+    start_db_connections()
+    run(args.repeat, args.limit, args.drop)
@@ -0,0 +1,63 @@
+"""Стоимость страницы списка товаров: ORM-объекты против плоских строк.
+
+Сравнивает прежний путь GET /products/all (Product + selectinload brand/category,
+затем ProductShort с from_attributes) и текущий (колонки одним запросом, dict в
+ProductShort). Время приводится на 1000 товаров; БД — заполненная bench.seed.
+
+    python -m bench.list_serialization --rows 1000 --repeat 20
+"""
+import argparse
+import statistics
+import time
+from typing import List
+
+from pydantic import TypeAdapter
+from sqlalchemy.orm import selectinload
+
+from db import Product
+from db.connection import start_db_connections
+from db.product_filters import ProductFilters, product_row_dict, product_rows_select
+from db.session import session
+from server.schemas.product import ProductShort
+
+adapter = TypeAdapter(List[ProductShort])
+
+
+def orm_path(rows: int) -> bytes:
+    with session() as s:
+        products = (
+            s.query(Product)
+            .options(selectinload(Product.brand), selectinload(Product.category))
+            .order_by(Product.id)
+            .limit(rows)
+            .all()
+        )
+        return adapter.dump_json(adapter.validate_python(products, from_attributes=True), by_alias=True)
+
+
+def rows_path(rows: int) -> bytes:
+    with session() as s:
+        result = s.execute(product_rows_select(ProductFilters()).order_by(Product.id).limit(rows))
+        items = [product_row_dict(row) for row in result]
+    return adapter.dump_json(adapter.validate_python(items), by_alias=True)
+
+
+def measure(fn, rows: int, repeat: int) -> float:
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn(rows)
+        timings.append(time.perf_counter() - started)
+    return statistics.median(timings) * 1000 * 1000 / rows
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=1000)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    start_db_connections()
+    assert orm_path(args.rows) == rows_path(args.rows), "both paths must produce the same JSON"
+    for name, fn in (("orm + from_attributes", orm_path), ("columns + dict", rows_path)):
+        print(f"{name:<24}{measure(fn, args.rows, args.repeat):>10.2f} ms / 1000 products")
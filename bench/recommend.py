@@ -0,0 +1,91 @@
+"""Оценка каталога под профиль: цикл по строкам против RecommendationIndex.top.
+
+Каталог синтетический, собирается в памяти (БД не нужна): у товара 1–3 типа
+кожи, 1–4 проблемы и 5–30 ингредиентов. Сравнивается построчная оценка на
+Python (как если бы каждый запрос перебирал product_listing) и векторная.
+
+    python -m bench.recommend --products 100000 --repeat 20
+"""
+import argparse
+import random
+import statistics
+import time
+from typing import List
+
+from core.enums import SafetyLevel
+from db.risk import SAFETY_LEVEL_RANK
+from server.recommend import (
+    CONCERN_WEIGHT,
+    SAFETY_WEIGHT,
+    SKIN_TYPE_WEIGHT,
+    IndexRow,
+    RecommendationIndex,
+    UserProfile,
+)
+
+
+def catalog(products: int, seed: int = 1) -> List[IndexRow]:
+    rnd = random.Random(seed)
+    return [
+        (
+            product_id,
+            sorted(rnd.sample(range(1, 8), rnd.randint(1, 3))),
+            sorted(rnd.sample(range(1, 30), rnd.randint(1, 4))),
+            sorted(rnd.sample(range(1, 5000), rnd.randint(5, 30))),
+            rnd.randint(0, 3),
+        )
+        for product_id in range(1, products + 1)
+    ]
+
+
+def python_top(rows: List[IndexRow], profile: UserProfile, k: int):
+    skin_types, concerns = set(profile.skin_type_ids), set(profile.concern_ids)
+    avoid = set(profile.avoid_ingredient_ids)
+    scored = []
+    for product_id, row_skin_types, row_concerns, ingredients, rank in rows:
+        if avoid.intersection(ingredients):
+            continue
+        if rank > SAFETY_LEVEL_RANK[profile.max_safety_level]:
+            continue
+        score = SKIN_TYPE_WEIGHT * bool(skin_types.intersection(row_skin_types))
+        score += CONCERN_WEIGHT * len(concerns.intersection(row_concerns)) / len(concerns)
+        score -= SAFETY_WEIGHT * rank
+        scored.append((-score, product_id))
+    scored.sort()
+    return [(product_id, -score) for score, product_id in scored[:k]]
+
+
+def measure(fn, repeat: int) -> float:
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - started)
+    return statistics.median(timings) * 1000
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--products", type=int, default=100000)
+    parser.add_argument("--limit", type=int, default=20)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    rows = catalog(args.products)
+    index = RecommendationIndex(ttl=0)
+    started = time.perf_counter()
+    index._load(rows, time.monotonic())
+    print(f"загрузка индекса: {(time.perf_counter() - started) * 1000:.0f} мс на {args.products} товаров")
+
+    profile = UserProfile(
+        skin_type_ids=(1, 4),
+        concern_ids=(2, 5, 11),
+        avoid_ingredient_ids=(10, 20, 30),
+        max_safety_level=SafetyLevel.caution,
+    )
+    assert index.top(profile, args.limit) == python_top(rows, profile, args.limit)
+    for name, fn in (
+        ("python", lambda: python_top(rows, profile, args.limit)),
+        ("numpy", lambda: index.top(profile, args.limit)),
+    ):
+        print(f"{name:>8}: {measure(fn, args.repeat):8.2f} мс на запрос")
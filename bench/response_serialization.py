@@ -0,0 +1,89 @@
+"""Сериализация большого ответа List[ProductShort] без обращения к БД.
+
+Сравнивает путь response_model со стандартным json (валидация, jsonable_encoder,
+json.dumps в JSONResponse) с server.responses: APIJSONResponse поверх уже
+готовых данных и model_response (одна валидация, сразу байты из pydantic-core).
+
+    python -m bench.response_serialization --rows 1000 --rows 10000
+"""
+import argparse
+import json
+import statistics
+import time
+from typing import List
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+
+from db import Brand, Category, Product
+from server.responses import APIJSONResponse, adapter_for, model_response
+from server.schemas.product import ProductShort
+
+adapter = adapter_for(List[ProductShort])
+
+
+def make_products(rows: int) -> List[Product]:
+    brands = [Brand(id=i, name=f"Brand {i}") for i in range(1, 51)]
+    categories = [Category(id=i, name=f"Category {i}") for i in range(1, 21)]
+    products = []
+    for i in range(1, rows + 1):
+        brand, category = brands[i % len(brands)], categories[i % len(categories)]
+        products.append(Product(
+            id=i,
+            name=f"Product {i}",
+            description="Лёгкий увлажняющий крем для ежедневного ухода " * 3,
+            how_to_use="Нанести на очищенную кожу утром и вечером",
+            image_url=f"https://cdn.example.com/products/{i}.jpg",
+            volume_ml=50,
+            brand_id=brand.id,
+            brand=brand,
+            category_id=category.id,
+            category=category,
+        ))
+    return products
+
+
+def stdlib_path(products: List[Product]) -> bytes:
+    items = adapter.validate_python(products, from_attributes=True)
+    content = jsonable_encoder(adapter.dump_python(items, mode="json", by_alias=True))
+    return JSONResponse(content).body
+
+
+def api_json_response(products: List[Product]) -> bytes:
+    return APIJSONResponse(adapter.validate_python(products, from_attributes=True)).body
+
+
+def model_response_path(products: List[Product]) -> bytes:
+    return model_response(List[ProductShort], products).body
+
+
+PATHS = {
+    "response_model + json": stdlib_path,
+    "APIJSONResponse": api_json_response,
+    "model_response": model_response_path,
+}
+
+
+def measure(fn, products: List[Product], repeat: int) -> float:
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn(products)
+        timings.append(time.perf_counter() - started)
+    return statistics.median(timings) * 1000
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, action="append")
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    print(f"{'path':<24}{'rows':>8}{'median ms':>12}{'bytes':>12}")
+    for rows in args.rows or [1000, 10000]:
+        products = make_products(rows)
+        expected = json.loads(stdlib_path(products))
+        for name, fn in PATHS.items():
+            body = fn(products)
+            assert json.loads(body) == expected, f"{name} changed the response"
+            print(f"{name:<24}{rows:>8}{measure(fn, products, args.repeat):>12.2f}{len(body):>12}")
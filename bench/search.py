@@ -0,0 +1,75 @@
+"""Латентность поиска по каталогу: прежние ilike по join'ам против search_document.
+
+Прежний путь — ИЛИ из ilike '%term%' по названиям товара, бренда, категории и
+ингредиентов через outer join, дубли схлопываются по id, порядок по id.
+Текущий — логика GET /products/all?search=... (tsquery по префиксам слов или
+триграммная похожесть названия; порядок по релевантности, а при числе
+совпадений больше SEARCH_RANK_MAX_MATCHES — по id). БД — заполненная
+bench.seed, с расширением pg_trgm и его GIN-индексом по названию; обе выборки
+возвращают одни и те же колонки.
+
+    python -m bench.search --repeat 30 --limit 50
+"""
+import argparse
+import statistics
+import time
+
+import sqlalchemy as sa
+from fastapi import Response
+
+from db import Brand, Category, Ingredient, Product
+from db.connection import start_db_connections
+from db.models import product_ingredients
+from db.product_filters import ProductFilters, product_rows_select
+from db.session import session
+from server.api.product import _list_products
+
+TERMS = ["Product 4242", "Brand 12", "Category 7", "Ingredient 1500", "Ingr", "zzz no match"]
+
+
+def ilike_path(s, term: str, limit: int) -> int:
+    pattern = f"%{term}%"
+    matched = (
+        sa.select(Product.id)
+        .outerjoin(Brand, Brand.id == Product.brand_id)
+        .outerjoin(Category, Category.id == Product.category_id)
+        .outerjoin(product_ingredients, product_ingredients.c.product_id == Product.id)
+        .outerjoin(Ingredient, Ingredient.id == product_ingredients.c.ingredient_id)
+        .where(sa.or_(
+            Product.name.ilike(pattern),
+            Brand.name.ilike(pattern),
+            Category.name.ilike(pattern),
+            Ingredient.name.ilike(pattern),
+        ))
+    )
+    query = product_rows_select(ProductFilters()).where(Product.id.in_(matched)).order_by(Product.id)
+    return len(s.execute(query.limit(limit)).all())
+
+
+def search_path(s, term: str, limit: int) -> int:
+    return len(_list_products(s, Response(), ProductFilters(search=term), None, 0, limit))
+
+
+def measure(fn, term: str, limit: int, repeat: int):
+    timings, rows = [], 0
+    for _ in range(repeat):
+        started = time.perf_counter()
+        with session() as s:
+            rows = fn(s, term, limit)
+        timings.append((time.perf_counter() - started) * 1000)
+    timings.sort()
+    return statistics.median(timings), timings[min(len(timings) - 1, int(len(timings) * 0.95))], rows
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--repeat", type=int, default=30)
+    parser.add_argument("--limit", type=int, default=50)
+    args = parser.parse_args()
+
+    start_db_connections()
+    print(f"{'term':<18}{'path':<8}{'median ms':>12}{'p95 ms':>10}{'rows':>7}")
+    for term in TERMS:
+        for name, fn in (("ilike", ilike_path), ("search", search_path)):
+            median, p95, rows = measure(fn, term, args.limit, args.repeat)
+            print(f"{term:<18}{name:<8}{median:>12.2f}{p95:>10.2f}{rows:>7}")
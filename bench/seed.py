@@ -0,0 +1,85 @@
+"""Заполняет пустую БД синтетическим каталогом для бенчмарков.
+
+    python -m bench.seed --products 100000
+"""
+import argparse
+
+from sqlalchemy import text
+
+from db.connection import get_engine, start_db_connections
+from db.read_model import refresh_product_read_models
+from db.session import session
+
+_REFERENCE_SQL = [
+    "INSERT INTO brands (name) SELECT 'Brand ' || g FROM generate_series(1, :brands) AS g",
+    "INSERT INTO categories (name) SELECT 'Category ' || g FROM generate_series(1, :categories) AS g",
+    "INSERT INTO skin_types (name) SELECT 'Skin type ' || g FROM generate_series(1, :skin_types) AS g",
+    "INSERT INTO concerns (name) SELECT 'Concern ' || g FROM generate_series(1, :concerns) AS g",
+    "INSERT INTO tags (name) SELECT 'Tag ' || g FROM generate_series(1, :tags) AS g",
+    "INSERT INTO ingredients (name) SELECT 'Ingredient ' || g FROM generate_series(1, :ingredients) AS g",
+]
+
+_PRODUCTS_SQL = """
+INSERT INTO products (name, volume_ml, brand_id, category_id)
+SELECT 'Product ' || g,
+       (array[15, 30, 50, 100, 200])[1 + (g % 5)],
+       1 + (random() * (:brands - 1))::int,
+       1 + (random() * (:categories - 1))::int
+FROM generate_series(1, :products) AS g
+"""
+
+# Каждому товару — per_product случайных различных значений из таблицы справочника
+_ASSOCIATION_SQL = """
+INSERT INTO {table} (product_id, {column})
+SELECT DISTINCT p.id, 1 + (random() * (:total - 1))::int
+FROM products AS p, generate_series(1, :per_product)
+ON CONFLICT DO NOTHING
+"""
+
+_ASSOCIATIONS = [
+    ("product_ingredients", "ingredient_id", "ingredients", 15),
+    ("product_skin_types", "skin_type_id", "skin_types", 2),
+    ("product_concerns", "concern_id", "concerns", 3),
+    ("product_tags", "tag_id", "tags", 3),
+]
+
+
+def seed(products: int) -> None:
+    sizes = {
+        "products": products,
+        "brands": 300,
+        "categories": 30,
+        "skin_types": 6,
+        "concerns": 25,
+        "tags": 40,
+        "ingredients": 3000,
+    }
+
+    with session() as s:
+        if s.execute(text("SELECT EXISTS (SELECT 1 FROM products)")).scalar():
+            raise SystemExit("products table is not empty; seed an empty database")
+
+        for sql in _REFERENCE_SQL:
+            s.execute(text(sql), sizes)
+        s.execute(text(_PRODUCTS_SQL), sizes)
+        for table, column, reference, per_product in _ASSOCIATIONS:
+            s.execute(
+                text(_ASSOCIATION_SQL.format(table=table, column=column)),
+                {"total": sizes[reference], "per_product": per_product},
+            )
+        product_ids = s.execute(text("SELECT array_agg(id) FROM products")).scalar()
+        # Без статистики планировщик перебирает весь справочник ингредиентов на каждый товар
+        s.execute(text("ANALYZE"))
+        refresh_product_read_models(s, product_ids=product_ids)
+
+    with get_engine().connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        conn.execute(text("ANALYZE"))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--products", type=int, default=100_000)
+    args = parser.parse_args()
+
+    start_db_connections()
+    seed(args.products)
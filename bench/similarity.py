@@ -0,0 +1,67 @@
+"""Сборка индекса похожих товаров: время и полнота относительно точного перебора.
+
+Каталог синтетический (БД не нужна): товары — вариации базовых рецептур, из
+которых убрано и добавлено несколько ингредиентов, плюс общие для всех
+ингредиенты вроде воды и глицерина. Полнота считается по выборке товаров:
+доля точных соседей (полный перебор по Jaccard), попавших в список индекса.
+
+    python -m bench.similarity --products 100000 --sample 200
+"""
+import argparse
+import random
+import time
+from typing import List
+
+from server.similarity import SimilarityRow, build_neighbours
+
+COMMON = list(range(1, 6))
+
+
+def catalog(products: int, seed: int = 1) -> List[SimilarityRow]:
+    rnd = random.Random(seed)
+    formulas = [rnd.sample(range(6, 8000), rnd.randint(8, 25)) for _ in range(max(products // 20, 1))]
+    rows = []
+    for product_id in range(1, products + 1):
+        base = rnd.choice(formulas)
+        kept = rnd.sample(base, len(base) - rnd.randint(0, 3))
+        extra = rnd.sample(range(6, 8000), rnd.randint(0, 3))
+        rows.append((product_id, sorted(set(kept + extra + rnd.sample(COMMON, 2)))))
+    return rows
+
+
+def exact_top(rows: List[SimilarityRow], product_id: int, count: int) -> List[int]:
+    target = set(rows[product_id - 1][1])
+    scored = []
+    for other_id, ingredients in rows:
+        if other_id != product_id:
+            common = len(target.intersection(ingredients))
+            if common:
+                scored.append((-common / (len(target) + len(ingredients) - common), other_id))
+    scored.sort()
+    return [other_id for _, other_id in scored[:count]]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--products", type=int, default=100000)
+    parser.add_argument("--neighbours", type=int, default=20)
+    parser.add_argument("--sample", type=int, default=200)
+    args = parser.parse_args()
+
+    rows = catalog(args.products)
+    started = time.perf_counter()
+    neighbours = build_neighbours(rows, args.neighbours)
+    print(f"сборка: {time.perf_counter() - started:.1f} с на {args.products} товаров")
+
+    found = total = 0
+    for product_id in random.Random(2).sample(range(1, args.products + 1), args.sample):
+        expected = exact_top(rows, product_id, args.neighbours)
+        got = {other_id for other_id, _ in neighbours.of(product_id)}
+        found += len(got.intersection(expected))
+        total += len(expected)
+    print(f"полнота top-{args.neighbours}: {found / total:.3f}")
+
+    started = time.perf_counter()
+    for product_id in range(1, args.products + 1):
+        neighbours.of(product_id)
+    print(f"выдача: {(time.perf_counter() - started) / args.products * 1e6:.1f} мкс на товар")
@@ -6,3 +6,25 @@ class SafetyLevel(str, Enum):
     caution = "caution"
     danger = "danger"
     unknown = "unknown"
+
+
+class MatchMode(str, Enum):
+    any = "any"
+    all = "all"
+
+
+class ExportFormat(str, Enum):
+    ndjson = "ndjson"
+    csv = "csv"
+
+
+class ProductSort(str, Enum):
+    id = "id"
+    safety = "safety"
+    allergenicity = "allergenicity"
+
+
+class InciMatch(str, Enum):
+    exact = "exact"
+    synonym = "synonym"
+    partial = "partial"
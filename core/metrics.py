@@ -0,0 +1,150 @@
+import threading
+from bisect import bisect_left
+from typing import Dict, Iterable, List, Sequence, Tuple
+
+# Границы по умолчанию (секунды): от 1 мс до 10 с
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class Histogram:
+    """Потокобезопасная гистограмма с фиксированными границами (в стиле Prometheus)."""
+
+    def __init__(self, buckets: Sequence[float] = DEFAULT_BUCKETS):
+        self.buckets = tuple(sorted(buckets))
+        self._counts = [0] * (len(self.buckets) + 1)
+        self._sum = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float) -> None:
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            self._counts[index] += 1
+            self._sum += value
+
+    def snapshot(self) -> Dict:
+        """Накопительные счётчики по верхним границам (le), общее число и сумма."""
+        with self._lock:
+            counts = list(self._counts)
+            total = self._sum
+
+        cumulative, running = {}, 0
+        for bound, count in zip(self.buckets, counts):
+            running += count
+            cumulative[repr(bound)] = running
+        running += counts[-1]
+        cumulative["+Inf"] = running
+
+        return {"buckets": cumulative, "count": running, "sum": total}
+
+
+class Counter:
+    """Потокобезопасный монотонный счётчик."""
+
+    def __init__(self):
+        self._value = 0.0
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1) -> None:
+        with self._lock:
+            self._value += amount
+
+    @property
+    def value(self) -> float:
+        return self._value
+
+
+Labels = Sequence[Tuple[str, str]]
+
+
+class _Family:
+    """Метрика с метками: по экземпляру на каждый набор значений меток."""
+
+    kind = ""
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._children: Dict[Tuple[str, ...], object] = {}
+        self._lock = threading.Lock()
+
+    def _new(self):
+        raise NotImplementedError
+
+    def labels(self, *values: str):
+        child = self._children.get(values)
+        if child is None:
+            with self._lock:
+                child = self._children.setdefault(values, self._new())
+        return child
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        with self._lock:
+            children = sorted(self._children.items())
+        for values, child in children:
+            lines.extend(self._render_child(list(zip(self.labelnames, values)), child))
+        return lines
+
+    def _render_child(self, labels: Labels, child) -> List[str]:
+        raise NotImplementedError
+
+
+class CounterFamily(_Family):
+    kind = "counter"
+
+    def _new(self) -> Counter:
+        return Counter()
+
+    def _render_child(self, labels: Labels, child: Counter) -> List[str]:
+        return [f"{self.name}{_label_text(labels)} {_number(child.value)}"]
+
+
+class HistogramFamily(_Family):
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, help, labelnames)
+        self.buckets = tuple(buckets)
+
+    def _new(self) -> Histogram:
+        return Histogram(self.buckets)
+
+    def _render_child(self, labels: Labels, child: Histogram) -> List[str]:
+        return render_histogram(self.name, child, labels)
+
+
+def render_histogram(name: str, histogram: Histogram, labels: Labels = ()) -> List[str]:
+    """Строки _bucket/_sum/_count одной гистограммы в текстовом формате Prometheus."""
+    labels = list(labels)
+    snapshot = histogram.snapshot()
+    lines = [
+        f"{name}_bucket{_label_text(labels + [('le', bound)])} {count}"
+        for bound, count in snapshot["buckets"].items()
+    ]
+    lines.append(f"{name}_sum{_label_text(labels)} {_number(snapshot['sum'])}")
+    lines.append(f"{name}_count{_label_text(labels)} {snapshot['count']}")
+    return lines
+
+
+def render_gauge(name: str, help: str, value: float) -> List[str]:
+    return [f"# HELP {name} {help}", f"# TYPE {name} gauge", f"{name} {_number(value)}"]
+
+
+def render_text(sections: Iterable[List[str]]) -> str:
+    """Склеивает секции в ответ /metrics (text/plain; version=0.0.4)."""
+    return "".join(line + "\n" for section in sections for line in section)
+
+
+def _label_text(labels: Labels) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in labels) + "}"
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _number(value: float) -> str:
+    return repr(int(value)) if float(value).is_integer() else repr(float(value))
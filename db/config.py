@@ -1,3 +1,5 @@
+from typing import Dict, Optional
+
 from pydantic_settings import BaseSettings
 
 
@@ -10,6 +12,86 @@ class Config(BaseSettings):
 
     ECHO: bool = False
 
+    # Журнал медленных запросов: выражения дольше порога (мс) пишутся JSON-строками
+    # в SLOW_QUERY_LOG_FILE или stderr; None — выключено
+    SLOW_QUERY_MS: Optional[float] = None
+    SLOW_QUERY_LOG_FILE: Optional[str] = None
+    # Доля медленных SELECT, для которых дополнительно снимается
+    # EXPLAIN (ANALYZE, BUFFERS) — запрос при этом выполняется повторно
+    SLOW_QUERY_EXPLAIN_RATE: float = 0.0
+
+    # true: async-обработчики работают через asyncpg + AsyncSession,
+    # false: через psycopg2 в пуле потоков
+    DB_ASYNC: bool = False
+
+    # Пул соединений (на один процесс uvicorn). pool_size + max_overflow по всем
+    # воркерам не должен превышать лимит PgBouncer/max_connections.
+    DB_POOL_SIZE: int = 5
+    DB_MAX_OVERFLOW: int = 10
+    DB_POOL_TIMEOUT: float = 30
+    # Переоткрывать соединения старше N секунд (-1 — никогда)
+    DB_POOL_RECYCLE: int = -1
+    # SELECT 1 перед каждой выдачей соединения; можно выключить, если задан DB_POOL_RECYCLE
+    DB_POOL_PRE_PING: bool = True
+
+    # Служебные эндпоинты (/internal/pool, /metrics): по умолчанию не подключаются.
+    # С INTERNAL_TOKEN требуют заголовок "Authorization: Bearer <токен>"
+    INTERNAL_ENDPOINTS: bool = False
+    INTERNAL_TOKEN: Optional[str] = None
+
+    # Поиск по каталогу сортируется по релевантности, только если совпадений не
+    # больше этого числа; при более широком запросе (короткий префикс, общее
+    # слово) оценивать каждое совпадение дорого, и список идёт по ID
+    SEARCH_RANK_MAX_MATCHES: int = 1000
+
+    # Время жизни кэша справочников (сек); ограничивает устаревание между воркерами
+    REFERENCE_CACHE_TTL: int = 300
+
+    # Кэш счётчиков фасетов по комбинациям фильтров
+    FACET_CACHE_TTL: int = 60
+    FACET_CACHE_SIZE: int = 1024
+
+    # Полная перезагрузка индекса рекомендаций (сек) фоновой задачей; видит записи
+    # других воркеров. Задача проверяет возраст индекса раз в RECOMMEND_INDEX_CHECK_INTERVAL
+    RECOMMEND_INDEX_TTL: int = 300
+    RECOMMEND_INDEX_CHECK_INTERVAL: int = 10
+
+    # Кэш карточек товаров (GET /products/{id}): размер in-process LRU и TTL (сек).
+    # С PRODUCT_CACHE_REDIS_URL кэш общий для воркеров (нужен пакет redis), и
+    # инвалидация после записи видна всем сразу. Без него каждый воркер держит
+    # свой LRU, а запись сбрасывает только кэш воркера, который её выполнил:
+    # остальные отдают прежнюю карточку до PRODUCT_CACHE_LOCAL_TTL. С одним
+    # воркером его можно поднять до PRODUCT_CACHE_TTL.
+    PRODUCT_CACHE_SIZE: int = 2048
+    PRODUCT_CACHE_TTL: int = 300
+    PRODUCT_CACHE_LOCAL_TTL: int = 10
+    PRODUCT_CACHE_REDIS_URL: Optional[str] = None
+
+    # Индекс похожих товаров: соседей на товар, проверка необходимости сборки,
+    # минимальный интервал между пересборками после изменений и обязательная
+    # пересборка (сек) ради изменений в других воркерах
+    SIMILAR_PRODUCTS_COUNT: int = 20
+    SIMILAR_INDEX_CHECK_INTERVAL: int = 30
+    SIMILAR_INDEX_MIN_REBUILD_INTERVAL: int = 600
+    SIMILAR_INDEX_TTL: int = 3600
+
+    # Cache-Control для успешных GET по шаблону пути маршрута; остальным — по умолчанию.
+    # Задаётся JSON-объектом в переменной окружения CACHE_CONTROL.
+    CACHE_CONTROL: Dict[str, str] = {
+        "/products/all": "public, max-age=30",
+        "/products/facets": "public, max-age=30",
+        "/products/batch": "public, max-age=60",
+        "/products/{product_id}": "public, max-age=60",
+        "/brands/": "public, max-age=300",
+        "/categories/": "public, max-age=300",
+        "/ingredients/": "public, max-age=300",
+        "/skin-types/": "public, max-age=300",
+        "/concerns/": "public, max-age=300",
+        "/tags/": "public, max-age=300",
+    }
+    # no-cache: кэшировать можно, но перед использованием сверять ETag
+    CACHE_CONTROL_DEFAULT: str = "no-cache"
+
     class Config:
         env_file = ".env"
 
@@ -2,21 +2,49 @@ from typing import Optional
 from sqlalchemy import text
 from sqlalchemy.engine import Engine, create_engine
 from sqlalchemy.exc import ArgumentError, OperationalError
+from sqlalchemy.ext.asyncio import AsyncEngine, async_sessionmaker, create_async_engine
 from sqlalchemy.orm import close_all_sessions, sessionmaker
 from urllib.parse import quote_plus
 
 from .config import config
+from .pool import InstrumentedAsyncQueuePool, InstrumentedQueuePool, pool_metrics
+from .query_stats import instrument_engine
 
 _session_factory: Optional['sessionmaker'] = None
 _db_engine: Optional['Engine'] = None
 
+_async_session_factory: Optional['async_sessionmaker'] = None
+_async_db_engine: Optional['AsyncEngine'] = None
+
+
+def _pool_options() -> dict:
+    """Параметры пула соединений из config."""
+    return {
+        "pool_size": config.DB_POOL_SIZE,
+        "max_overflow": config.DB_MAX_OVERFLOW,
+        "pool_timeout": config.DB_POOL_TIMEOUT,
+        "pool_recycle": config.DB_POOL_RECYCLE,
+        "pool_pre_ping": config.DB_POOL_PRE_PING,
+    }
+
 
 def _make_engine(url: str, echo: bool) -> 'Engine':
     """Создаёт SQLAlchemy Engine для PostgreSQL."""
-    return create_engine(url, echo=echo, pool_pre_ping=True)
+    engine = create_engine(url, echo=echo, poolclass=InstrumentedQueuePool, **_pool_options())
+    pool_metrics.pool = engine.pool
+    instrument_engine(engine)
+    return engine
 
 
-def _build_postgres_url() -> str:
+def _make_async_engine(url: str, echo: bool) -> 'AsyncEngine':
+    """Создаёт асинхронный SQLAlchemy Engine (asyncpg) для PostgreSQL."""
+    engine = create_async_engine(url, echo=echo, poolclass=InstrumentedAsyncQueuePool, **_pool_options())
+    pool_metrics.pool = engine.sync_engine.pool
+    instrument_engine(engine.sync_engine)
+    return engine
+
+
+def _build_postgres_url(driver: str = "postgresql") -> str:
     """Формирует URL подключения к PostgreSQL из параметров config."""
     user = getattr(config, "DB_USER", None)
     password = getattr(config, "DB_PASSWORD", None)
@@ -29,7 +57,7 @@ def _build_postgres_url() -> str:
         exit(1)
 
     password_enc = quote_plus(password) if password else ""
-    return f"postgresql://{user}:{password_enc}@{host}:{port}/{dbname}"
+    return f"{driver}://{user}:{password_enc}@{host}:{port}/{dbname}"
 
 
 def start_db_connections(engine_factory=_make_engine) -> None:
@@ -66,6 +94,36 @@ def stop_db_connections() -> None:
     _db_engine = None
 
 
+async def start_async_db_connections(engine_factory=_make_async_engine) -> None:
+    """Инициализация асинхронного подключения к БД (режим DB_ASYNC)."""
+    global _async_db_engine, _async_session_factory
+
+    if _async_db_engine:
+        raise RuntimeError("Async DB connection is already initialized")
+
+    db_url = _build_postgres_url("postgresql+asyncpg")
+
+    try:
+        _async_db_engine = engine_factory(db_url, echo=getattr(config, "ECHO", False))
+        _async_session_factory = async_sessionmaker(
+            autocommit=False, autoflush=False, expire_on_commit=False, bind=_async_db_engine
+        )
+        await _check_async_conn()
+    except (OperationalError, ArgumentError, OSError) as exc:
+        _db_url_error(exc)
+
+
+async def stop_async_db_connections() -> None:
+    """Закрывает асинхронный пул и очищает фабрику сессий."""
+    global _async_db_engine, _async_session_factory
+    if not _async_db_engine:
+        return
+
+    await _async_db_engine.dispose()
+    _async_session_factory = None
+    _async_db_engine = None
+
+
 def get_engine() -> 'Engine':
     if not _db_engine:
         raise RuntimeError("DB connection was not initialized")
@@ -78,6 +136,18 @@ def get_session_factory():
     return _session_factory
 
 
+def get_async_engine() -> 'AsyncEngine':
+    if not _async_db_engine:
+        raise RuntimeError("Async DB connection was not initialized")
+    return _async_db_engine
+
+
+def get_async_session_factory():
+    if _async_session_factory is None:
+        raise RuntimeError("Async DB connection was not initialized")
+    return _async_session_factory
+
+
 def _db_url_error(exc=None):
     print(
         f'\n'
@@ -98,3 +168,9 @@ def _check_conn():
         s.execute(text('SELECT 1;'))
     finally:
         s.close()
+
+
+async def _check_async_conn():
+    """Проверяет асинхронное соединение с базой."""
+    async with _async_session_factory() as s:
+        await s.execute(text('SELECT 1;'))
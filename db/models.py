@@ -1,16 +1,23 @@
 import sqlalchemy as sa
+from sqlalchemy.dialects.postgresql import ARRAY, TSVECTOR
 from sqlalchemy.orm import relationship, Mapped, mapped_column
+from datetime import datetime
 from typing import List
 
 from db import DeclBase
 from core.enums import SafetyLevel
 
 
+# Составной PK (product_id, X_id) обслуживает выборку по товару; индексы
+# (X_id, product_id) нужны для обратного направления — фильтров и фасетов по X.
 product_ingredients = sa.Table(
     "product_ingredients",
     DeclBase.metadata,
     sa.Column("product_id", sa.ForeignKey("products.id"), primary_key=True),
     sa.Column("ingredient_id", sa.ForeignKey("ingredients.id"), primary_key=True),
+    # Доля ингредиента в товаре, %; NULL — производитель её не раскрывает
+    sa.Column("concentration", sa.Numeric(5, 2), nullable=True),
+    sa.Index("ix_product_ingredients_ingredient_id_product_id", "ingredient_id", "product_id"),
 )
 
 product_skin_types = sa.Table(
@@ -18,6 +25,7 @@ product_skin_types = sa.Table(
     DeclBase.metadata,
     sa.Column("product_id", sa.ForeignKey("products.id"), primary_key=True),
     sa.Column("skin_type_id", sa.ForeignKey("skin_types.id"), primary_key=True),
+    sa.Index("ix_product_skin_types_skin_type_id_product_id", "skin_type_id", "product_id"),
 )
 
 product_concerns = sa.Table(
@@ -25,6 +33,7 @@ product_concerns = sa.Table(
     DeclBase.metadata,
     sa.Column("product_id", sa.ForeignKey("products.id"), primary_key=True),
     sa.Column("concern_id", sa.ForeignKey("concerns.id"), primary_key=True),
+    sa.Index("ix_product_concerns_concern_id_product_id", "concern_id", "product_id"),
 )
 
 product_tags = sa.Table(
@@ -32,11 +41,32 @@ product_tags = sa.Table(
     DeclBase.metadata,
     sa.Column("product_id", sa.ForeignKey("products.id"), primary_key=True),
     sa.Column("tag_id", sa.ForeignKey("tags.id"), primary_key=True),
+    sa.Index("ix_product_tags_tag_id_product_id", "tag_id", "product_id"),
 )
 
 
-class Brand(DeclBase):
+class Versioned:
+    """updated_at и version меняются при каждом UPDATE строки (ORM и Core).
+
+    Служат валидаторами HTTP-кэша: ETag и Last-Modified отдельных записей.
+    """
+
+    updated_at: Mapped[datetime] = mapped_column(
+        sa.DateTime(timezone=True), nullable=False, server_default=sa.func.now(), onupdate=sa.func.now()
+    )
+    version: Mapped[int] = mapped_column(
+        sa.Integer, nullable=False, server_default="1", onupdate=sa.text("version + 1")
+    )
+
+
+class Brand(Versioned, DeclBase):
     __tablename__ = "brands"
+    __table_args__ = (
+        sa.Index(
+            "ix_brands_name_trgm", "name",
+            postgresql_using="gin", postgresql_ops={"name": "gin_trgm_ops"},
+        ),
+    )
 
     id: Mapped[int] = mapped_column(sa.Integer, primary_key=True)
     name: Mapped[str] = mapped_column(sa.String(100), unique=True, nullable=False)
@@ -44,8 +74,14 @@ class Brand(DeclBase):
     products: Mapped[List["Product"]] = relationship("Product", back_populates="brand")
 
 
-class Category(DeclBase):
+class Category(Versioned, DeclBase):
     __tablename__ = "categories"
+    __table_args__ = (
+        sa.Index(
+            "ix_categories_name_trgm", "name",
+            postgresql_using="gin", postgresql_ops={"name": "gin_trgm_ops"},
+        ),
+    )
 
     id: Mapped[int] = mapped_column(sa.Integer, primary_key=True)
     name: Mapped[str] = mapped_column(sa.String(100), unique=True, nullable=False)
@@ -53,7 +89,7 @@ class Category(DeclBase):
     products: Mapped[List["Product"]] = relationship("Product", back_populates="category")
 
 
-class Ingredient(DeclBase):
+class Ingredient(Versioned, DeclBase):
     __tablename__ = "ingredients"
 
     id: Mapped[int] = mapped_column(sa.Integer, primary_key=True)
@@ -79,7 +115,7 @@ class Ingredient(DeclBase):
     )
 
 
-class SkinType(DeclBase):
+class SkinType(Versioned, DeclBase):
     __tablename__ = "skin_types"
 
     id: Mapped[int] = mapped_column(sa.Integer, primary_key=True)
@@ -91,7 +127,7 @@ class SkinType(DeclBase):
     )
 
 
-class Concern(DeclBase):
+class Concern(Versioned, DeclBase):
     __tablename__ = "concerns"
 
     id: Mapped[int] = mapped_column(sa.Integer, primary_key=True)
@@ -103,7 +139,7 @@ class Concern(DeclBase):
     )
 
 
-class Tag(DeclBase):
+class Tag(Versioned, DeclBase):
     __tablename__ = "tags"
 
     id: Mapped[int] = mapped_column(sa.Integer, primary_key=True)
@@ -117,6 +153,13 @@ class Tag(DeclBase):
 
 class Product(DeclBase):
     __tablename__ = "products"
+    __table_args__ = (
+        sa.Index("ix_products_search_document", "search_document", postgresql_using="gin"),
+        sa.Index(
+            "ix_products_name_trgm", "name",
+            postgresql_using="gin", postgresql_ops={"name": "gin_trgm_ops"},
+        ),
+    )
 
     id: Mapped[int] = mapped_column(sa.Integer, primary_key=True)
     name: Mapped[str] = mapped_column(sa.String(200), nullable=False)
@@ -125,8 +168,11 @@ class Product(DeclBase):
     image_url: Mapped[str] = mapped_column(sa.String(300), nullable=True)
     volume_ml: Mapped[int] = mapped_column(sa.Integer, nullable=True)
 
-    brand_id: Mapped[int] = mapped_column(sa.ForeignKey("brands.id"), nullable=True)
-    category_id: Mapped[int] = mapped_column(sa.ForeignKey("categories.id"), nullable=True)
+    # Поисковый документ (название, бренд, категория, ингредиенты); см. db/search.py
+    search_document: Mapped[str] = mapped_column(TSVECTOR, nullable=True, deferred=True)
+
+    brand_id: Mapped[int] = mapped_column(sa.ForeignKey("brands.id"), nullable=True, index=True)
+    category_id: Mapped[int] = mapped_column(sa.ForeignKey("categories.id"), nullable=True, index=True)
 
     brand: Mapped["Brand"] = relationship("Brand", back_populates="products")
     category: Mapped["Category"] = relationship("Category", back_populates="products")
@@ -150,3 +196,41 @@ class Product(DeclBase):
         secondary=product_tags,
         back_populates="products",
     )
+
+
+class ProductListing(DeclBase):
+    """Денормализованная строка каталога: одна на товар, без join'ов при чтении.
+
+    Заполняется db/read_model.py при каждой записи товара или справочника;
+    массивы id фильтруются операторами && / @> по GIN-индексам.
+    """
+
+    __tablename__ = "product_listing"
+    __table_args__ = (
+        sa.Index("ix_product_listing_skin_type_ids", "skin_type_ids", postgresql_using="gin"),
+        sa.Index("ix_product_listing_concern_ids", "concern_ids", postgresql_using="gin"),
+        sa.Index("ix_product_listing_tag_ids", "tag_ids", postgresql_using="gin"),
+        sa.Index("ix_product_listing_ingredient_ids", "ingredient_ids", postgresql_using="gin"),
+        sa.Index("ix_product_listing_safety_rank", "safety_rank"),
+        sa.Index("ix_product_listing_max_allergenicity", "max_allergenicity"),
+    )
+
+    product_id: Mapped[int] = mapped_column(
+        sa.ForeignKey("products.id", ondelete="CASCADE"), primary_key=True
+    )
+    brand_name: Mapped[str] = mapped_column(sa.String(100), nullable=True)
+    category_name: Mapped[str] = mapped_column(sa.String(100), nullable=True)
+
+    skin_type_ids: Mapped[List[int]] = mapped_column(ARRAY(sa.Integer), nullable=False, server_default="{}")
+    concern_ids: Mapped[List[int]] = mapped_column(ARRAY(sa.Integer), nullable=False, server_default="{}")
+    tag_ids: Mapped[List[int]] = mapped_column(ARRAY(sa.Integer), nullable=False, server_default="{}")
+    ingredient_ids: Mapped[List[int]] = mapped_column(ARRAY(sa.Integer), nullable=False, server_default="{}")
+
+    # Профиль риска по ингредиентам (см. db/risk.py); NULL — у товара нет ингредиентов
+    safety_rank: Mapped[int] = mapped_column(sa.SmallInteger, nullable=True)
+    max_allergenicity: Mapped[int] = mapped_column(sa.Integer, nullable=True)
+    max_carcinogenicity: Mapped[int] = mapped_column(sa.Integer, nullable=True)
+    safe_count: Mapped[int] = mapped_column(sa.Integer, nullable=False, server_default="0")
+    caution_count: Mapped[int] = mapped_column(sa.Integer, nullable=False, server_default="0")
+    danger_count: Mapped[int] = mapped_column(sa.Integer, nullable=False, server_default="0")
+    unknown_count: Mapped[int] = mapped_column(sa.Integer, nullable=False, server_default="0")
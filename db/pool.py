@@ -0,0 +1,58 @@
+import time
+from typing import Dict, Optional
+
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.pool import AsyncAdaptedQueuePool, Pool, QueuePool
+
+from core.metrics import Counter, Histogram
+from .query_stats import current_stats
+
+
+class PoolMetrics:
+    """Статистика выдачи соединений из пула текущего процесса."""
+
+    def __init__(self):
+        self.checkout_seconds = Histogram()
+        self.timeouts = Counter()
+        self.pool: Optional[Pool] = None
+
+    def snapshot(self) -> Dict:
+        pool = self.pool
+        return {
+            "pool_class": type(pool).__name__ if pool else None,
+            "size": pool.size() if pool else 0,
+            "checked_in": pool.checkedin() if pool else 0,
+            "checked_out": pool.checkedout() if pool else 0,
+            "overflow": pool.overflow() if pool else 0,
+            "timeouts": int(self.timeouts.value),
+            "checkout_seconds": self.checkout_seconds.snapshot(),
+        }
+
+
+pool_metrics = PoolMetrics()
+
+
+class _InstrumentedPoolMixin:
+    """Замеряет время получения соединения: ожидание в очереди, открытие и pre-ping."""
+
+    def connect(self):
+        started = time.perf_counter()
+        try:
+            return super().connect()
+        except PoolTimeoutError:
+            pool_metrics.timeouts.inc()
+            raise
+        finally:
+            elapsed = time.perf_counter() - started
+            pool_metrics.checkout_seconds.observe(elapsed)
+            stats = current_stats()
+            if stats is not None:
+                stats.pool_wait_seconds += elapsed
+
+
+class InstrumentedQueuePool(_InstrumentedPoolMixin, QueuePool):
+    pass
+
+
+class InstrumentedAsyncQueuePool(_InstrumentedPoolMixin, AsyncAdaptedQueuePool):
+    pass
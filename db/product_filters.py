@@ -0,0 +1,217 @@
+from dataclasses import asdict, dataclass, replace
+from typing import Dict, List, Optional, Tuple
+
+import sqlalchemy as sa
+from sqlalchemy.orm import Session
+
+from core.enums import MatchMode, SafetyLevel
+from .models import (
+    Brand,
+    Category,
+    Product,
+    ProductListing,
+)
+from .risk import SAFETY_LEVEL_RANK, safety_level
+from .search import search_filter, use_custom_plans
+
+
+@dataclass(frozen=True)
+class ProductFilters:
+    """Фильтры каталога товаров (общие для списка, фасетов и экспорта)."""
+
+    search: Optional[str] = None
+    name: Optional[str] = None
+    brand: Optional[str] = None
+    category_id: Optional[int] = None
+    category: Optional[str] = None
+    skin_type_ids: Optional[List[int]] = None
+    skin_type_match: MatchMode = MatchMode.any
+    concern_ids: Optional[List[int]] = None
+    concern_match: MatchMode = MatchMode.any
+    tag_ids: Optional[List[int]] = None
+    tag_match: MatchMode = MatchMode.any
+    ingredient_ids: Optional[List[int]] = None
+    ingredient_match: MatchMode = MatchMode.any
+    max_safety_level: Optional[SafetyLevel] = None
+    max_allergenicity: Optional[int] = None
+
+    def cache_key(self) -> Tuple:
+        """Нормализованный ключ: порядок и повторы id не влияют на результат."""
+        return tuple(
+            tuple(sorted(set(value))) if isinstance(value, list) else value
+            for value in asdict(self).values()
+        )
+
+
+def facet_condition(column: sa.Column, ids: List[int], match: MatchMode) -> sa.ColumnElement:
+    """Товар связан с любым (any, &&) или со всеми (all, @>) ids; оба оператора идут по GIN-индексу массива."""
+    unique_ids = sorted(set(ids))
+    if match == MatchMode.all:
+        return column.contains(unique_ids)
+    return column.overlap(unique_ids)
+
+
+def listing_join() -> sa.Join:
+    """products + product_listing (1:1 по первичному ключу): FROM для всех запросов каталога."""
+    return sa.join(Product, ProductListing, ProductListing.product_id == Product.id)
+
+
+def product_conditions(filters: ProductFilters) -> List[sa.ColumnElement]:
+    """WHERE-условия по products и product_listing (см. listing_join)."""
+    conditions = []
+
+    if filters.search:
+        conditions.append(search_filter(filters.search))
+    else:
+        if filters.name:
+            conditions.append(Product.name.ilike(f"%{filters.name}%"))
+        if filters.brand:
+            conditions.append(Product.brand_id.in_(
+                sa.select(Brand.id).where(Brand.name.ilike(f"%{filters.brand}%"))
+            ))
+
+    if filters.category_id:
+        conditions.append(Product.category_id == filters.category_id)
+    elif filters.category:
+        conditions.append(Product.category_id.in_(
+            sa.select(Category.id).where(Category.name.ilike(f"%{filters.category}%"))
+        ))
+
+    if filters.skin_type_ids:
+        conditions.append(facet_condition(
+            ProductListing.skin_type_ids, filters.skin_type_ids, filters.skin_type_match,
+        ))
+    if filters.concern_ids:
+        conditions.append(facet_condition(
+            ProductListing.concern_ids, filters.concern_ids, filters.concern_match,
+        ))
+    if filters.tag_ids:
+        conditions.append(facet_condition(
+            ProductListing.tag_ids, filters.tag_ids, filters.tag_match,
+        ))
+    if filters.ingredient_ids:
+        conditions.append(facet_condition(
+            ProductListing.ingredient_ids, filters.ingredient_ids, filters.ingredient_match,
+        ))
+
+    # Товары без ингредиентов (профиль NULL) под ограничения риска не подпадают
+    if filters.max_safety_level is not None:
+        conditions.append(ProductListing.safety_rank <= SAFETY_LEVEL_RANK[filters.max_safety_level])
+    if filters.max_allergenicity is not None:
+        conditions.append(ProductListing.max_allergenicity <= filters.max_allergenicity)
+
+    return conditions
+
+
+# Фасет -> (колонка-массив product_listing, поле ProductFilters с его фильтром)
+_M2M_FACETS = {
+    "skin_types": (ProductListing.skin_type_ids, "skin_type_ids"),
+    "concerns": (ProductListing.concern_ids, "concern_ids"),
+    "tags": (ProductListing.tag_ids, "tag_ids"),
+}
+
+
+def facet_counts(db_session: Session, filters: ProductFilters) -> Dict[str, List[Tuple[int, int]]]:
+    """Число товаров на каждое значение фасета, одним запросом (UNION ALL групп).
+
+    Счётчики фасета считаются без его собственного фильтра: они показывают,
+    сколько товаров останется, если выбрать это значение.
+    """
+    if filters.search:
+        use_custom_plans(db_session)
+    selects = []
+    for facet, (column, field) in _M2M_FACETS.items():
+        conditions = product_conditions(replace(filters, **{field: None}))
+        values = sa.func.unnest(column).table_valued("value_id").render_derived().lateral()
+        selects.append(
+            sa.select(
+                sa.literal(facet).label("facet"),
+                values.c.value_id,
+                sa.func.count().label("products"),
+            )
+            .select_from(listing_join().join(values, sa.true()))
+            .where(*conditions)
+            .group_by(values.c.value_id)
+        )
+
+    conditions = product_conditions(replace(filters, category_id=None, category=None))
+    selects.append(
+        sa.select(
+            sa.literal("categories").label("facet"),
+            Product.category_id.label("value_id"),
+            sa.func.count().label("products"),
+        )
+        .select_from(listing_join())
+        .where(Product.category_id.is_not(None), *conditions)
+        .group_by(Product.category_id)
+    )
+
+    counts: Dict[str, List[Tuple[int, int]]] = {facet: [] for facet in (*_M2M_FACETS, "categories")}
+    for facet, value_id, products in db_session.execute(sa.union_all(*selects)):
+        counts[facet].append((value_id, products))
+    return counts
+
+
+def matches_more_than(db_session: Session, filters: ProductFilters, count: int) -> bool:
+    """Больше ли count товаров подходит под фильтры; читает не более count + 1 строк."""
+    matched = sa.select(Product.id).select_from(listing_join()).where(*product_conditions(filters))
+    return db_session.execute(sa.select(sa.func.count()).select_from(matched.limit(count + 1).subquery())).scalar() > count
+
+
+def product_rows_select(filters: ProductFilters) -> sa.Select:
+    """Плоская выборка колонок товара с названиями бренда и категории из product_listing, без ORM-объектов."""
+    return (
+        sa.select(
+            Product.id,
+            Product.name,
+            Product.description,
+            Product.how_to_use,
+            Product.image_url,
+            Product.volume_ml,
+            Product.brand_id,
+            ProductListing.brand_name,
+            Product.category_id,
+            ProductListing.category_name,
+            ProductListing.safety_rank,
+            ProductListing.max_allergenicity,
+            ProductListing.max_carcinogenicity,
+            ProductListing.safe_count,
+            ProductListing.caution_count,
+            ProductListing.danger_count,
+            ProductListing.unknown_count,
+        )
+        .select_from(listing_join())
+        .where(*product_conditions(filters))
+    )
+
+
+def product_row_dict(row: sa.Row) -> Dict:
+    """Строка product_rows_select (или RETURNING тех же колонок товара) в форме ProductShort."""
+    return {
+        "id": row.id,
+        "name": row.name,
+        "description": row.description,
+        "how_to_use": row.how_to_use,
+        "image_url": row.image_url,
+        "volume_ml": row.volume_ml,
+        "brand_id": row.brand_id,
+        "category_id": row.category_id,
+        "brand": {"id": row.brand_id, "name": row.brand_name} if row.brand_id is not None else None,
+        "category": {"id": row.category_id, "name": row.category_name} if row.category_id is not None else None,
+    }
+
+
+def product_list_item_dict(row: sa.Row) -> Dict:
+    """Строка product_rows_select в форме ProductListItem: с профилем риска."""
+    return {
+        **product_row_dict(row),
+        "risk": {
+            "worst_safety_level": safety_level(row.safety_rank),
+            "max_allergenicity": row.max_allergenicity,
+            "max_carcinogenicity": row.max_carcinogenicity,
+            "safe_count": row.safe_count,
+            "caution_count": row.caution_count,
+            "danger_count": row.danger_count,
+            "unknown_count": row.unknown_count,
+        },
+    }
@@ -0,0 +1,81 @@
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass
+from typing import Any, Iterator, Mapping, Optional
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from core.metrics import Counter, Histogram
+from . import slow_query
+from .config import config
+
+
+@dataclass
+class QueryStats:
+    """SQL-нагрузка одного запроса к API."""
+
+    statements: int = 0
+    db_seconds: float = 0.0
+    pool_wait_seconds: float = 0.0
+    # ASGI scope запроса; после маршрутизации в нём есть route (для журнала медленных запросов)
+    request: Optional[Mapping[str, Any]] = None
+
+
+_current: ContextVar[Optional[QueryStats]] = ContextVar("query_stats", default=None)
+
+# Все выражения процесса, включая фоновые задачи вне запросов
+statements_total = Counter()
+statement_seconds = Histogram()
+
+
+@contextmanager
+def track_queries(request: Optional[Mapping[str, Any]] = None) -> Iterator[QueryStats]:
+    """Собирает статистику SQL в пределах блока.
+
+    Объект изменяется на месте, поэтому видит и выражения, выполненные в пуле
+    потоков (run_in_threadpool копирует контекст) или в greenlet run_sync.
+    """
+    stats = QueryStats(request=request)
+    token = _current.set(stats)
+    try:
+        yield stats
+    finally:
+        _current.reset(token)
+
+
+def current_stats() -> Optional[QueryStats]:
+    return _current.get()
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - conn.info["query_started"].pop()
+    statements_total.inc()
+    statement_seconds.observe(elapsed)
+    stats = _current.get()
+    if stats is not None:
+        stats.statements += 1
+        stats.db_seconds += elapsed
+    if config.SLOW_QUERY_MS is not None and elapsed * 1000 >= config.SLOW_QUERY_MS:
+        request = stats.request if stats is not None else None
+        slow_query.report(conn, statement, parameters, context, executemany, elapsed, request)
+
+
+def _handle_error(exception_context):
+    # after_cursor_execute не вызывается при ошибке: снимаем метку начала
+    conn = exception_context.connection
+    started = conn.info.get("query_started") if conn is not None else None
+    if started:
+        started.pop()
+
+
+def instrument_engine(engine: Engine) -> None:
+    """Подключает учёт выражений к синхронному Engine (для async — к engine.sync_engine)."""
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+    event.listen(engine, "handle_error", _handle_error)
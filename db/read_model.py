@@ -0,0 +1,142 @@
+from typing import Callable, Iterable, List, Optional
+
+import sqlalchemy as sa
+from sqlalchemy.orm import Session
+
+from .risk import RISK_COLUMNS, RISK_PROFILE_SQL
+from .search import refresh_search_documents
+
+# Та же выборка заполняет таблицу в миграциях 5d2c8e1f4a67 и 9a3f6c2d7e18
+_REFRESH_SQL = """
+INSERT INTO product_listing AS pl
+    (product_id, brand_name, category_name, skin_type_ids, concern_ids, tag_ids, ingredient_ids,
+     {risk_columns})
+SELECT
+    p.id,
+    b.name,
+    c.name,
+    ARRAY(SELECT x.skin_type_id FROM product_skin_types AS x WHERE x.product_id = p.id ORDER BY 1),
+    ARRAY(SELECT x.concern_id FROM product_concerns AS x WHERE x.product_id = p.id ORDER BY 1),
+    ARRAY(SELECT x.tag_id FROM product_tags AS x WHERE x.product_id = p.id ORDER BY 1),
+    ARRAY(SELECT x.ingredient_id FROM product_ingredients AS x WHERE x.product_id = p.id ORDER BY 1),
+    {risk_values}
+FROM products AS p
+LEFT JOIN brands AS b ON b.id = p.brand_id
+LEFT JOIN categories AS c ON c.id = p.category_id
+{risk_join}
+WHERE p.id = ANY(:ids)
+ON CONFLICT (product_id) DO UPDATE SET
+    brand_name = EXCLUDED.brand_name,
+    category_name = EXCLUDED.category_name,
+    skin_type_ids = EXCLUDED.skin_type_ids,
+    concern_ids = EXCLUDED.concern_ids,
+    tag_ids = EXCLUDED.tag_ids,
+    ingredient_ids = EXCLUDED.ingredient_ids,
+    {risk_updates}
+RETURNING pl.product_id
+""".format(
+    risk_columns=", ".join(RISK_COLUMNS),
+    risk_values=", ".join(f"risk.{column}" for column in RISK_COLUMNS),
+    risk_join=RISK_PROFILE_SQL.strip(),
+    risk_updates=",\n    ".join(f"{column} = EXCLUDED.{column}" for column in RISK_COLUMNS),
+)
+
+# Подписчики на изменения product_listing (например, индексы в памяти процесса):
+# callback(db_session, product_ids) вызывается внутри транзакции записи
+_listeners: List[Callable[[Session, List[int]], None]] = []
+
+
+def on_listing_change(callback: Callable[[Session, List[int]], None]) -> Callable[[Session, List[int]], None]:
+    _listeners.append(callback)
+    return callback
+
+
+def _notify(db_session: Session, product_ids: List[int]) -> None:
+    if product_ids:
+        for callback in _listeners:
+            callback(db_session, product_ids)
+
+
+# Справочник -> колонка product_listing с id его значений
+_ARRAY_COLUMNS = {
+    "skin_type_id": "skin_type_ids",
+    "concern_id": "concern_ids",
+    "tag_id": "tag_ids",
+}
+
+
+def refresh_product_listing(db_session: Session, product_ids: Iterable[int]) -> None:
+    """Пересобирает строки product_listing перечисленных товаров (вставляет недостающие)."""
+    result = db_session.execute(sa.text(_REFRESH_SQL), {"ids": list(product_ids)})
+    _notify(db_session, list(result.scalars()))
+
+
+def refresh_product_read_models(
+    db_session: Session,
+    *,
+    product_ids: Optional[Iterable[int]] = None,
+    brand_id: Optional[int] = None,
+    category_id: Optional[int] = None,
+    ingredient_id: Optional[int] = None,
+) -> None:
+    """Пересобирает search_document и product_listing затронутых изменением товаров.
+
+    Товары выбираются один раз: по списку id, по бренду, категории или
+    ингредиенту (через GIN-индекс product_listing).
+    """
+    if product_ids is not None:
+        ids = list(product_ids)
+    else:
+        if brand_id is not None:
+            query, params = "SELECT id FROM products WHERE brand_id = :brand_id", {"brand_id": brand_id}
+        elif category_id is not None:
+            query, params = (
+                "SELECT id FROM products WHERE category_id = :category_id",
+                {"category_id": category_id},
+            )
+        elif ingredient_id is not None:
+            query = (
+                "SELECT product_id FROM product_listing"
+                " WHERE ingredient_ids @> ARRAY[CAST(:ingredient_id AS integer)]"
+            )
+            params = {"ingredient_id": ingredient_id}
+        else:
+            raise ValueError("No products selected for read model refresh")
+        ids = list(db_session.execute(sa.text(query), params).scalars())
+
+    if ids:
+        refresh_search_documents(db_session, ids)
+        refresh_product_listing(db_session, ids)
+
+
+def drop_listing_reference(db_session: Session, **reference: int) -> None:
+    """Убирает id удаляемого значения справочника из массивов product_listing.
+
+    Пример: drop_listing_reference(db, tag_id=5). Затронутые строки находятся
+    по GIN-индексу, остальные колонки не пересчитываются.
+    """
+    (field, obj_id), = reference.items()
+    column = _ARRAY_COLUMNS[field]
+    result = db_session.execute(
+        sa.text(
+            f"UPDATE product_listing SET {column} = array_remove({column}, CAST(:obj_id AS integer))"
+            f" WHERE {column} @> ARRAY[CAST(:obj_id AS integer)]"
+            " RETURNING product_id"
+        ),
+        {"obj_id": obj_id},
+    )
+    _notify(db_session, list(result.scalars()))
+
+
+def listing_product_ids(db_session: Session, **reference: int) -> List[int]:
+    """id товаров, ссылающихся на значение справочника, по GIN-индексу product_listing.
+
+    Пример: listing_product_ids(db, tag_id=5).
+    """
+    (field, obj_id), = reference.items()
+    column = _ARRAY_COLUMNS[field]
+    result = db_session.execute(
+        sa.text(f"SELECT product_id FROM product_listing WHERE {column} @> ARRAY[CAST(:obj_id AS integer)]"),
+        {"obj_id": obj_id},
+    )
+    return list(result.scalars())
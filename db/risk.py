@@ -0,0 +1,49 @@
+from typing import Dict, Optional
+
+from core.enums import SafetyLevel
+
+# Порядок уровней от лучшего к худшему. unknown — «нет данных»: хуже safe,
+# но лучше известного повода для осторожности.
+SAFETY_LEVEL_RANK: Dict[SafetyLevel, int] = {
+    SafetyLevel.safe: 0,
+    SafetyLevel.unknown: 1,
+    SafetyLevel.caution: 2,
+    SafetyLevel.danger: 3,
+}
+_LEVEL_BY_RANK = {rank: level for level, rank in SAFETY_LEVEL_RANK.items()}
+
+_RANK_CASE = "CASE i.safety_level {} END".format(
+    " ".join(f"WHEN '{level.value}' THEN {rank}" for level, rank in SAFETY_LEVEL_RANK.items())
+)
+
+# Профиль риска товара по его ингредиентам: LATERAL-подзапрос для выборки по products AS p
+RISK_PROFILE_SQL = f"""
+LEFT JOIN LATERAL (
+    SELECT
+        max({_RANK_CASE}) AS safety_rank,
+        max(i.allergenicity) AS max_allergenicity,
+        max(i.carcinogenicity) AS max_carcinogenicity,
+        count(*) FILTER (WHERE i.safety_level = 'safe') AS safe_count,
+        count(*) FILTER (WHERE i.safety_level = 'caution') AS caution_count,
+        count(*) FILTER (WHERE i.safety_level = 'danger') AS danger_count,
+        count(*) FILTER (WHERE i.safety_level = 'unknown') AS unknown_count
+    FROM product_ingredients AS pi
+    JOIN ingredients AS i ON i.id = pi.ingredient_id
+    WHERE pi.product_id = p.id
+) AS risk ON true
+"""
+
+RISK_COLUMNS = (
+    "safety_rank",
+    "max_allergenicity",
+    "max_carcinogenicity",
+    "safe_count",
+    "caution_count",
+    "danger_count",
+    "unknown_count",
+)
+
+
+def safety_level(rank: Optional[int]) -> Optional[SafetyLevel]:
+    """Уровень по рангу из product_listing; None — у товара нет ингредиентов."""
+    return _LEVEL_BY_RANK.get(rank) if rank is not None else None
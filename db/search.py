@@ -0,0 +1,70 @@
+import re
+from typing import Iterable, Optional
+
+import sqlalchemy as sa
+from sqlalchemy.orm import Session
+
+from .models import Product
+
+# 'simple' не стеммит слова: в каталоге смешаны русские и латинские названия,
+# бренды и INCI-имена, для которых языковые словари только мешают.
+TS_CONFIG = "simple"
+
+_WORD_RE = re.compile(r"\w+", re.UNICODE)
+
+_REFRESH_SQL = """
+UPDATE products AS p SET search_document =
+    setweight(to_tsvector('simple', coalesce(p.name, '')), 'A')
+    || setweight(to_tsvector('simple', coalesce(
+        (SELECT b.name FROM brands AS b WHERE b.id = p.brand_id), '')), 'B')
+    || setweight(to_tsvector('simple', coalesce(
+        (SELECT c.name FROM categories AS c WHERE c.id = p.category_id), '')), 'B')
+    || setweight(to_tsvector('simple', coalesce(
+        (SELECT string_agg(i.name, ' ')
+         FROM product_ingredients AS pi
+         JOIN ingredients AS i ON i.id = pi.ingredient_id
+         WHERE pi.product_id = p.id), '')), 'C')
+WHERE p.id = ANY(:ids)
+"""
+
+
+def _prefix_tsquery(term: str) -> Optional[sa.ColumnElement]:
+    """Строит tsquery, где каждое слово ищется как префикс (для поиска по мере набора)."""
+    words = _WORD_RE.findall(term.lower())
+    if not words:
+        return None
+    return sa.func.to_tsquery(TS_CONFIG, " & ".join(f"{w}:*" for w in words))
+
+
+def search_filter(term: str) -> sa.ColumnElement:
+    """Условие поиска: полнотекстовое совпадение по документу или похожесть названия (pg_trgm)."""
+    fuzzy = Product.name.op("%")(term)
+    tsquery = _prefix_tsquery(term)
+    if tsquery is None:
+        return fuzzy
+    return sa.or_(Product.search_document.op("@@")(tsquery), fuzzy)
+
+
+def search_rank(term: str) -> sa.ColumnElement:
+    """Релевантность: вес совпадения по документу плюс триграммная похожесть названия."""
+    rank = sa.func.similarity(Product.name, term)
+    tsquery = _prefix_tsquery(term)
+    if tsquery is not None:
+        rank = sa.func.ts_rank_cd(Product.search_document, tsquery) + rank
+    return sa.cast(rank, sa.Float)
+
+
+def use_custom_plans(db_session: Session) -> None:
+    """Планировать поисковые выражения транзакции под конкретные параметры.
+
+    psycopg 3 и asyncpg подготавливают выражения, и после пяти выполнений
+    PostgreSQL может перейти на общий план. Для поиска он не годится: число
+    совпадений зависит от слова (префикс «ingr» — весь каталог, артикул — одна
+    строка), и общий план одинаково медленный для всех запросов.
+    """
+    db_session.execute(sa.text("SET LOCAL plan_cache_mode = force_custom_plan"))
+
+
+def refresh_search_documents(db_session: Session, product_ids: Iterable[int]) -> None:
+    """Пересобирает search_document у перечисленных товаров."""
+    db_session.execute(sa.text(_REFRESH_SQL), {"ids": list(product_ids)})
@@ -1,6 +1,13 @@
-from contextlib import contextmanager
+from contextlib import asynccontextmanager, contextmanager
+from typing import Any, AsyncIterator, Callable, Sequence, TypeVar
 
-from .connection import get_session_factory
+from sqlalchemy import Executable, Row
+from starlette.concurrency import run_in_threadpool
+
+from .config import config
+from .connection import get_async_session_factory, get_session_factory
+
+T = TypeVar("T")
 
 
 @contextmanager
@@ -14,3 +21,60 @@ def session():
         _session.commit()
     finally:
         _session.close()
+
+
+@asynccontextmanager
+async def async_session():
+    _session = get_async_session_factory()()
+    try:
+        yield _session
+    except:
+        raise
+    else:
+        await _session.commit()
+    finally:
+        await _session.close()
+
+
+def _run_sync(fn: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+    with session() as s:
+        return fn(s, *args, **kwargs)
+
+
+async def run_in_session(fn: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+    """Выполняет fn(session, *args, **kwargs) в транзакции.
+
+    В режиме DB_ASYNC fn получает синхронный фасад AsyncSession (через
+    run_sync, поверх asyncpg), иначе выполняется в пуле потоков с обычной
+    сессией psycopg2. Так один и тот же код обработчика работает в обоих режимах.
+    """
+    if config.DB_ASYNC:
+        async with async_session() as s:
+            return await s.run_sync(fn, *args, **kwargs)
+    return await run_in_threadpool(_run_sync, fn, *args, **kwargs)
+
+
+async def stream_in_session(stmt: Executable, batch_size: int) -> AsyncIterator[Sequence[Row]]:
+    """Читает результат запроса пачками по batch_size строк через серверный курсор.
+
+    В памяти одновременно находится только одна пачка, поэтому выгрузка
+    всего каталога не зависит от его размера.
+    """
+    stmt = stmt.execution_options(yield_per=batch_size)
+
+    if config.DB_ASYNC:
+        async with async_session() as s:
+            result = await s.stream(stmt)
+            async for partition in result.partitions():
+                yield partition
+        return
+
+    # Блокирующие вызовы psycopg2 уходят в пул потоков, чтобы не держать event loop
+    s = get_session_factory()()
+    try:
+        result = await run_in_threadpool(s.execute, stmt)
+        partitions = result.partitions()
+        while partition := await run_in_threadpool(next, partitions, None):
+            yield partition
+    finally:
+        await run_in_threadpool(s.close)
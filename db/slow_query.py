@@ -0,0 +1,117 @@
+import json
+import logging
+import random
+import sys
+from datetime import date, datetime, timezone
+from decimal import Decimal
+from typing import Any, Dict, List, Mapping, Optional
+
+from .config import config
+
+logger = logging.getLogger(__name__)
+logger.propagate = False
+logger.setLevel(logging.INFO)
+if config.SLOW_QUERY_LOG_FILE:
+    _handler: logging.Handler = logging.FileHandler(config.SLOW_QUERY_LOG_FILE)
+else:
+    _handler = logging.StreamHandler(sys.stderr)
+# Каждая запись — одна JSON-строка, без префиксов
+_handler.setFormatter(logging.Formatter("%(message)s"))
+logger.addHandler(_handler)
+
+_EXPLAIN_SAVEPOINT = "slow_query_explain"
+# Числа, даты и флаги нужны для разбора плана; строки могут содержать
+# пользовательские данные (поисковые запросы, названия) и не пишутся
+_PLAIN_TYPES = (bool, int, float, Decimal, date, datetime)
+_MAX_LIST_ITEMS = 10
+
+
+def redact(value: Any) -> Any:
+    """Параметр для журнала: скаляры как есть, строки и байты — только длина."""
+    if value is None or isinstance(value, _PLAIN_TYPES):
+        return value
+    if isinstance(value, str):
+        return f"<str:{len(value)}>"
+    if isinstance(value, (bytes, bytearray, memoryview)):
+        return f"<bytes:{len(value)}>"
+    if isinstance(value, dict):
+        return {key: redact(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple, set, frozenset)):
+        items = [redact(item) for item in list(value)[:_MAX_LIST_ITEMS]]
+        if len(value) > _MAX_LIST_ITEMS:
+            items.append(f"<+{len(value) - _MAX_LIST_ITEMS} more>")
+        return items
+    return f"<{type(value).__name__}>"
+
+
+def _route(request: Optional[Mapping[str, Any]]) -> Optional[str]:
+    if request is None:
+        return None
+    route = request.get("route")
+    return f"{request.get('method')} {getattr(route, 'path', request.get('path'))}"
+
+
+def _seq_scans(plan: Dict[str, Any]) -> List[str]:
+    """Таблицы, которые план читает последовательным сканированием."""
+    found = []
+    if plan.get("Node Type") == "Seq Scan":
+        found.append(plan.get("Relation Name"))
+    for child in plan.get("Plans", ()):
+        found.extend(_seq_scans(child))
+    return found
+
+
+def _explain(conn, statement: str, parameters) -> Dict[str, Any]:
+    """EXPLAIN (ANALYZE, BUFFERS) в точке сохранения на том же соединении.
+
+    Отдельный DBAPI-курсор не трогает ещё не прочитанный результат исходного
+    выражения и не проходит через события Engine. Ошибка EXPLAIN откатывается
+    до точки сохранения и не обрывает транзакцию запроса.
+    """
+    cursor = conn.connection.cursor()
+    try:
+        cursor.execute(f"SAVEPOINT {_EXPLAIN_SAVEPOINT}")
+        try:
+            cursor.execute("EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) " + statement, parameters)
+            plan = cursor.fetchone()[0]
+        except Exception as exc:
+            cursor.execute(f"ROLLBACK TO SAVEPOINT {_EXPLAIN_SAVEPOINT}")
+            first_line = (str(exc).splitlines() or [""])[0]
+            return {"explain_error": f"{type(exc).__name__}: {first_line}"}
+        cursor.execute(f"RELEASE SAVEPOINT {_EXPLAIN_SAVEPOINT}")
+    finally:
+        cursor.close()
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    plan = plan[0]
+    return {"seq_scans": _seq_scans(plan["Plan"]), "plan": plan}
+
+
+def _explainable(statement: str, context, executemany: bool) -> bool:
+    # ANALYZE выполняет выражение, поэтому только SELECT; серверный курсор
+    # (выгрузка через yield_per) ещё открыт на этом соединении
+    if executemany or not statement.lstrip().upper().startswith("SELECT"):
+        return False
+    return context is None or not context.execution_options.get("stream_results", False)
+
+
+def report(conn, statement: str, parameters, context, executemany: bool, elapsed: float, request: Optional[Mapping[str, Any]]) -> None:
+    """Пишет медленное выражение в журнал; выборочно — с планом выполнения."""
+    record: Dict[str, Any] = {
+        "ts": datetime.now(timezone.utc).isoformat(),
+        "event": "slow_query",
+        "duration_ms": round(elapsed * 1000, 3),
+        "route": _route(request),
+        "statement": statement,
+    }
+    if executemany:
+        record["executemany"] = len(parameters)
+        record["params"] = redact(parameters[0]) if parameters else None
+    else:
+        record["params"] = redact(parameters)
+
+    if config.SLOW_QUERY_EXPLAIN_RATE > 0 and random.random() < config.SLOW_QUERY_EXPLAIN_RATE:
+        if _explainable(statement, context, executemany):
+            record.update(_explain(conn, statement, parameters))
+
+    logger.info(json.dumps(record, default=str, ensure_ascii=False))
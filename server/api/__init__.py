@@ -5,6 +5,9 @@ from .ingredient import router as ingredient_router
 from .skin_type import router as skin_type_router
 from .concern import router as concern_router
 from .tag import router as tag_router
+from .internal import router as internal_router
+from .routine import router as routine_router
+from .metrics import router as metrics_router
 
 __all__ = [
     "product_router",
@@ -14,4 +17,7 @@ __all__ = [
     "skin_type_router",
     "concern_router",
     "tag_router",
+    "internal_router",
+    "routine_router",
+    "metrics_router",
 ]
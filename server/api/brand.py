@@ -1,82 +1,113 @@
-from typing import List
+from typing import List, Optional
 
-from fastapi import APIRouter, HTTPException, status
+from fastapi import APIRouter, Header, HTTPException, Request, status
 from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
 
 from db import Brand
-from db.session import session
+from db.read_model import refresh_product_read_models
+from db.session import run_in_session
+from ..cache import facet_cache, reference_cache
+from ..http_cache import not_modified, validators, version_etag
+from ..responses import APIJSONResponse, model_response
 from ..schemas.brand import BrandCreate, BrandUpdate, BrandSchema
 
 router = APIRouter(prefix="/brands", tags=["Brands"])
 
 
+def _load_brands(db: Session) -> List[Brand]:
+    return db.query(Brand).all()
+
+
 @router.get("/", response_model=List[BrandSchema])
-def get_all_brands():
+async def get_all_brands(if_none_match: Optional[str] = Header(None)):
     """Retrieve all brands."""
-    with session() as db:
-        brands = db.query(Brand).all()
-        return brands
+    return await reference_cache.respond("brands", BrandSchema, _load_brands, if_none_match)
+
+
+def _get_brand(db: Session, brand_id: int):
+    brand = db.query(Brand).filter(Brand.id == brand_id).first()
+    if not brand:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Brand not found"
+        )
+    return brand
 
 
-@router.get("/{brand_id}", response_model=BrandSchema)
-def get_brand(brand_id: int):
+@router.get("/{brand_id}", response_model=BrandSchema, response_class=APIJSONResponse)
+async def get_brand(brand_id: int, request: Request):
     """Retrieve a specific brand by ID."""
-    with session() as db:
-        brand = db.query(Brand).filter(Brand.id == brand_id).first()
-        if not brand:
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail="Brand not found"
-            )
-        return brand
+    brand = await run_in_session(_get_brand, brand_id)
+    headers = validators(version_etag("brand", brand.id, brand.version), brand.updated_at)
+    return not_modified(request, headers) or model_response(BrandSchema, brand, headers=headers)
+
+
+def _create_brand(db: Session, brand_data: BrandCreate):
+    try:
+        new_brand = Brand(name=brand_data.name)
+        db.add(new_brand)
+        db.flush()
+        reference_cache.invalidate_on_commit(db, "brands")
+        return new_brand
+    except IntegrityError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Brand name already exists"
+        )
 
 
 @router.post("/", response_model=BrandSchema, status_code=status.HTTP_201_CREATED)
-def create_brand(brand_data: BrandCreate):
+async def create_brand(brand_data: BrandCreate):
     """Create a new brand."""
-    with session() as db:
-        try:
-            new_brand = Brand(name=brand_data.name)
-            db.add(new_brand)
-            db.flush()
-            return new_brand
-        except IntegrityError:
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail="Brand name already exists"
-            )
+    return await run_in_session(_create_brand, brand_data)
+
+
+def _update_brand(db: Session, brand_id: int, brand_data: BrandUpdate):
+    brand = db.query(Brand).filter(Brand.id == brand_id).first()
+    if not brand:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Brand not found"
+        )
+
+    try:
+        brand.name = brand_data.name
+        db.flush()
+        reference_cache.invalidate_on_commit(db, "brands")
+        refresh_product_read_models(db, brand_id=brand.id)
+        facet_cache.clear_on_commit(db)
+        return brand
+    except IntegrityError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Brand name already exists"
+        )
 
 
 @router.put("/{brand_id}", response_model=BrandSchema)
-def update_brand(brand_id: int, brand_data: BrandUpdate):
+async def update_brand(brand_id: int, brand_data: BrandUpdate):
     """Update an existing brand."""
-    with session() as db:
-        brand = db.query(Brand).filter(Brand.id == brand_id).first()
-        if not brand:
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail="Brand not found"
-            )
-        
-        try:
-            brand.name = brand_data.name
-            db.flush()
-            return brand
-        except IntegrityError:
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail="Brand name already exists"
-            )
+    return await run_in_session(_update_brand, brand_id, brand_data)
+
+
+def _delete_brand(db: Session, brand_id: int):
+    brand = db.query(Brand).filter(Brand.id == brand_id).first()
+    if not brand:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Brand not found"
+        )
+    # У товаров бренд обнуляется при flush, поэтому их id нужны заранее
+    product_ids = [product.id for product in brand.products]
+    db.delete(brand)
+    db.flush()
+    refresh_product_read_models(db, product_ids=product_ids)
+    reference_cache.invalidate_on_commit(db, "brands")
+    facet_cache.clear_on_commit(db)
 
 
 @router.delete("/{brand_id}", status_code=status.HTTP_204_NO_CONTENT)
-def delete_brand(brand_id: int):
+async def delete_brand(brand_id: int):
     """Delete a brand."""
-    with session() as db:
-        brand = db.query(Brand).filter(Brand.id == brand_id).first()
-        if not brand:
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail="Brand not found"
-            )
-        db.delete(brand)
+    await run_in_session(_delete_brand, brand_id)
@@ -1,82 +1,113 @@
-from typing import List
+from typing import List, Optional
 
-from fastapi import APIRouter, HTTPException, status
+from fastapi import APIRouter, Header, HTTPException, Request, status
 from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
 
 from db import Category
-from db.session import session
+from db.read_model import refresh_product_read_models
+from db.session import run_in_session
+from ..cache import facet_cache, reference_cache
+from ..http_cache import not_modified, validators, version_etag
+from ..responses import APIJSONResponse, model_response
 from ..schemas.category import CategoryCreate, CategoryUpdate, CategorySchema
 
 router = APIRouter(prefix="/categories", tags=["Categories"])
 
 
+def _load_categories(db: Session) -> List[Category]:
+    return db.query(Category).all()
+
+
 @router.get("/", response_model=List[CategorySchema])
-def get_all_categories():
+async def get_all_categories(if_none_match: Optional[str] = Header(None)):
     """Retrieve all categories."""
-    with session() as db:
-        categories = db.query(Category).all()
-        return categories
+    return await reference_cache.respond("categories", CategorySchema, _load_categories, if_none_match)
+
+
+def _get_category(db: Session, category_id: int):
+    category = db.query(Category).filter(Category.id == category_id).first()
+    if not category:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Category not found"
+        )
+    return category
 
 
-@router.get("/{category_id}", response_model=CategorySchema)
-def get_category(category_id: int):
+@router.get("/{category_id}", response_model=CategorySchema, response_class=APIJSONResponse)
+async def get_category(category_id: int, request: Request):
     """Retrieve a specific category by ID."""
-    with session() as db:
-        category = db.query(Category).filter(Category.id == category_id).first()
-        if not category:
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail="Category not found"
-            )
-        return category
+    category = await run_in_session(_get_category, category_id)
+    headers = validators(version_etag("category", category.id, category.version), category.updated_at)
+    return not_modified(request, headers) or model_response(CategorySchema, category, headers=headers)
+
+
+def _create_category(db: Session, category_data: CategoryCreate):
+    try:
+        new_category = Category(name=category_data.name)
+        db.add(new_category)
+        db.flush()
+        reference_cache.invalidate_on_commit(db, "categories")
+        return new_category
+    except IntegrityError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Category name already exists"
+        )
 
 
 @router.post("/", response_model=CategorySchema, status_code=status.HTTP_201_CREATED)
-def create_category(category_data: CategoryCreate):
+async def create_category(category_data: CategoryCreate):
     """Create a new category."""
-    with session() as db:
-        try:
-            new_category = Category(name=category_data.name)
-            db.add(new_category)
-            db.flush()
-            return new_category
-        except IntegrityError:
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail="Category name already exists"
-            )
+    return await run_in_session(_create_category, category_data)
+
+
+def _update_category(db: Session, category_id: int, category_data: CategoryUpdate):
+    category = db.query(Category).filter(Category.id == category_id).first()
+    if not category:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Category not found"
+        )
+
+    try:
+        category.name = category_data.name
+        db.flush()
+        reference_cache.invalidate_on_commit(db, "categories")
+        refresh_product_read_models(db, category_id=category.id)
+        facet_cache.clear_on_commit(db)
+        return category
+    except IntegrityError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Category name already exists"
+        )
 
 
 @router.put("/{category_id}", response_model=CategorySchema)
-def update_category(category_id: int, category_data: CategoryUpdate):
+async def update_category(category_id: int, category_data: CategoryUpdate):
     """Update an existing category."""
-    with session() as db:
-        category = db.query(Category).filter(Category.id == category_id).first()
-        if not category:
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail="Category not found"
-            )
-        
-        try:
-            category.name = category_data.name
-            db.flush()
-            return category
-        except IntegrityError:
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail="Category name already exists"
-            )
+    return await run_in_session(_update_category, category_id, category_data)
+
+
+def _delete_category(db: Session, category_id: int):
+    category = db.query(Category).filter(Category.id == category_id).first()
+    if not category:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Category not found"
+        )
+    # У товаров категория обнуляется при flush, поэтому их id нужны заранее
+    product_ids = [product.id for product in category.products]
+    db.delete(category)
+    db.flush()
+    refresh_product_read_models(db, product_ids=product_ids)
+    reference_cache.invalidate_on_commit(db, "categories")
+    facet_cache.clear_on_commit(db)
 
 
 @router.delete("/{category_id}", status_code=status.HTTP_204_NO_CONTENT)
-def delete_category(category_id: int):
+async def delete_category(category_id: int):
     """Delete a category."""
-    with session() as db:
-        category = db.query(Category).filter(Category.id == category_id).first()
-        if not category:
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail="Category not found"
-            )
-        db.delete(category)
+    await run_in_session(_delete_category, category_id)
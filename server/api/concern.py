@@ -1,82 +1,110 @@
-from typing import List
+from typing import List, Optional
 
-from fastapi import APIRouter, HTTPException, status
+from fastapi import APIRouter, Header, HTTPException, Request, status
 from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
 
 from db import Concern
-from db.session import session
+from db.read_model import drop_listing_reference, listing_product_ids
+from db.session import run_in_session
+from ..cache import facet_cache, reference_cache
+from ..http_cache import not_modified, validators, version_etag
+from ..product_cache import product_detail_cache
+from ..responses import APIJSONResponse, model_response
 from ..schemas.concern import ConcernCreate, ConcernUpdate, ConcernSchema
 
 router = APIRouter(prefix="/concerns", tags=["Concerns"])
 
 
+def _load_concerns(db: Session) -> List[Concern]:
+    return db.query(Concern).all()
+
+
 @router.get("/", response_model=List[ConcernSchema])
-def get_all_concerns():
+async def get_all_concerns(if_none_match: Optional[str] = Header(None)):
     """Retrieve all concerns."""
-    with session() as db:
-        concerns = db.query(Concern).all()
-        return concerns
+    return await reference_cache.respond("concerns", ConcernSchema, _load_concerns, if_none_match)
+
+
+def _get_concern(db: Session, concern_id: int):
+    concern = db.query(Concern).filter(Concern.id == concern_id).first()
+    if not concern:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Concern not found"
+        )
+    return concern
 
 
-@router.get("/{concern_id}", response_model=ConcernSchema)
-def get_concern(concern_id: int):
+@router.get("/{concern_id}", response_model=ConcernSchema, response_class=APIJSONResponse)
+async def get_concern(concern_id: int, request: Request):
     """Retrieve a specific concern by ID."""
-    with session() as db:
-        concern = db.query(Concern).filter(Concern.id == concern_id).first()
-        if not concern:
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail="Concern not found"
-            )
-        return concern
+    concern = await run_in_session(_get_concern, concern_id)
+    headers = validators(version_etag("concern", concern.id, concern.version), concern.updated_at)
+    return not_modified(request, headers) or model_response(ConcernSchema, concern, headers=headers)
+
+
+def _create_concern(db: Session, concern_data: ConcernCreate):
+    try:
+        new_concern = Concern(name=concern_data.name)
+        db.add(new_concern)
+        db.flush()
+        reference_cache.invalidate_on_commit(db, "concerns")
+        return new_concern
+    except IntegrityError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Concern name already exists"
+        )
 
 
 @router.post("/", response_model=ConcernSchema, status_code=status.HTTP_201_CREATED)
-def create_concern(concern_data: ConcernCreate):
+async def create_concern(concern_data: ConcernCreate):
     """Create a new concern."""
-    with session() as db:
-        try:
-            new_concern = Concern(name=concern_data.name)
-            db.add(new_concern)
-            db.flush()
-            return new_concern
-        except IntegrityError:
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail="Concern name already exists"
-            )
+    return await run_in_session(_create_concern, concern_data)
+
+
+def _update_concern(db: Session, concern_id: int, concern_data: ConcernUpdate):
+    concern = db.query(Concern).filter(Concern.id == concern_id).first()
+    if not concern:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Concern not found"
+        )
+
+    try:
+        concern.name = concern_data.name
+        db.flush()
+        product_detail_cache.invalidate_on_commit(db, listing_product_ids(db, concern_id=concern.id))
+        reference_cache.invalidate_on_commit(db, "concerns")
+        return concern
+    except IntegrityError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Concern name already exists"
+        )
 
 
 @router.put("/{concern_id}", response_model=ConcernSchema)
-def update_concern(concern_id: int, concern_data: ConcernUpdate):
+async def update_concern(concern_id: int, concern_data: ConcernUpdate):
     """Update an existing concern."""
-    with session() as db:
-        concern = db.query(Concern).filter(Concern.id == concern_id).first()
-        if not concern:
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail="Concern not found"
-            )
-        
-        try:
-            concern.name = concern_data.name
-            db.flush()
-            return concern
-        except IntegrityError:
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail="Concern name already exists"
-            )
+    return await run_in_session(_update_concern, concern_id, concern_data)
+
+
+def _delete_concern(db: Session, concern_id: int):
+    concern = db.query(Concern).filter(Concern.id == concern_id).first()
+    if not concern:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Concern not found"
+        )
+    db.delete(concern)
+    drop_listing_reference(db, concern_id=concern.id)
+    reference_cache.invalidate_on_commit(db, "concerns")
+    facet_cache.clear_on_commit(db)
 
 
 @router.delete("/{concern_id}", status_code=status.HTTP_204_NO_CONTENT)
-def delete_concern(concern_id: int):
+async def delete_concern(concern_id: int):
     """Delete a concern."""
-    with session() as db:
-        concern = db.query(Concern).filter(Concern.id == concern_id).first()
-        if not concern:
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail="Concern not found"
-            )
-        db.delete(concern)
+    await run_in_session(_delete_concern, concern_id)
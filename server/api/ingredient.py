@@ -1,99 +1,166 @@
-from typing import List
+from typing import List, Optional
 
-from fastapi import APIRouter, HTTPException, status
+from fastapi import APIRouter, Header, HTTPException, Request, status
 from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
 
 from db import Ingredient
-from db.session import session
-from ..schemas.ingredient import IngredientCreate, IngredientUpdate, IngredientSchema
+from db.read_model import refresh_product_read_models
+from db.session import run_in_session
+from ..cache import facet_cache, reference_cache
+from ..http_cache import not_modified, validators, version_etag
+from ..inci import inci_matcher
+from ..responses import APIJSONResponse, model_response
+from ..routines import routine_rules
+from ..schemas.ingredient import (
+    IngredientCreate,
+    IngredientSchema,
+    IngredientUpdate,
+    InciParseRequest,
+    InciParseResult,
+)
 
 router = APIRouter(prefix="/ingredients", tags=["Ingredients"])
 
 
+def _invalidate_on_commit(db: Session) -> None:
+    """Drop everything built from the ingredient table once the write commits."""
+    reference_cache.invalidate_on_commit(db, "ingredients")
+    routine_rules.invalidate_on_commit(db)
+    inci_matcher.invalidate_on_commit(db)
+
+
+def _load_ingredients(db: Session) -> List[Ingredient]:
+    return db.query(Ingredient).all()
+
+
 @router.get("/", response_model=List[IngredientSchema])
-def get_all_ingredients():
+async def get_all_ingredients(if_none_match: Optional[str] = Header(None)):
     """Retrieve all ingredients."""
-    with session() as db:
-        ingredients = db.query(Ingredient).all()
-        return ingredients
+    return await reference_cache.respond("ingredients", IngredientSchema, _load_ingredients, if_none_match)
+
+
+def _parse_inci(db: Session, texts: List[str]) -> List[dict]:
+    matcher = inci_matcher.get(db)
+    return [matcher.parse(text) for text in texts]
+
+
+@router.post("/parse", response_model=List[InciParseResult], response_class=APIJSONResponse)
+async def parse_inci(parse_in: InciParseRequest):
+    """Resolve pasted INCI lists to ingredient IDs.
+
+    Names are compared case- and punctuation-insensitively, with synonyms
+    (Aqua/Water, Parfum/Fragrance, ...) and names embedded in extra text.
+    IngredientIds (exact names and synonyms only) can be passed to product
+    creation as is. NeedsReview lists entries that merely contain a known
+    name, e.g. "Sodium Hyaluronate Crosspolymer"; their items carry the
+    suggested ingredient. Unmatched lists the entries that need a new
+    ingredient or a manual lookup.
+    """
+    results = await run_in_session(_parse_inci, parse_in.texts)
+    return model_response(List[InciParseResult], results)
+
 
+def _get_ingredient(db: Session, ingredient_id: int):
+    ingredient = db.query(Ingredient).filter(Ingredient.id == ingredient_id).first()
+    if not ingredient:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Ingredient not found"
+        )
+    return ingredient
 
-@router.get("/{ingredient_id}", response_model=IngredientSchema)
-def get_ingredient(ingredient_id: int):
+
+@router.get("/{ingredient_id}", response_model=IngredientSchema, response_class=APIJSONResponse)
+async def get_ingredient(ingredient_id: int, request: Request):
     """Retrieve a specific ingredient by ID."""
-    with session() as db:
-        ingredient = db.query(Ingredient).filter(Ingredient.id == ingredient_id).first()
-        if not ingredient:
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail="Ingredient not found"
-            )
-        return ingredient
+    ingredient = await run_in_session(_get_ingredient, ingredient_id)
+    headers = validators(version_etag("ingredient", ingredient.id, ingredient.version), ingredient.updated_at)
+    return not_modified(request, headers) or model_response(IngredientSchema, ingredient, headers=headers)
+
+
+def _create_ingredient(db: Session, ingredient_data: IngredientCreate):
+    try:
+        new_ingredient = Ingredient(
+            name=ingredient_data.name,
+            purpose=ingredient_data.purpose,
+            safety_level=ingredient_data.safety_level,
+            max_concentration=ingredient_data.max_concentration,
+            carcinogenicity=ingredient_data.carcinogenicity,
+            allergenicity=ingredient_data.allergenicity,
+        )
+        db.add(new_ingredient)
+        db.flush()
+        _invalidate_on_commit(db)
+        return new_ingredient
+    except IntegrityError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Ingredient name already exists"
+        )
 
 
 @router.post("/", response_model=IngredientSchema, status_code=status.HTTP_201_CREATED)
-def create_ingredient(ingredient_data: IngredientCreate):
+async def create_ingredient(ingredient_data: IngredientCreate):
     """Create a new ingredient."""
-    with session() as db:
-        try:
-            new_ingredient = Ingredient(
-                name=ingredient_data.name,
-                purpose=ingredient_data.purpose,
-                safety_level=ingredient_data.safety_level,
-                max_concentration=ingredient_data.max_concentration,
-                carcinogenicity=ingredient_data.carcinogenicity,
-                allergenicity=ingredient_data.allergenicity,
-            )
-            db.add(new_ingredient)
-            db.flush()
-            return new_ingredient
-        except IntegrityError:
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail="Ingredient name already exists"
-            )
+    return await run_in_session(_create_ingredient, ingredient_data)
+
+
+def _update_ingredient(db: Session, ingredient_id: int, ingredient_data: IngredientUpdate):
+    ingredient = db.query(Ingredient).filter(Ingredient.id == ingredient_id).first()
+    if not ingredient:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Ingredient not found"
+        )
+
+    try:
+        if ingredient_data.name is not None:
+            ingredient.name = ingredient_data.name
+        if ingredient_data.purpose is not None:
+            ingredient.purpose = ingredient_data.purpose
+        ingredient.safety_level = ingredient_data.safety_level
+        if ingredient_data.max_concentration is not None:
+            ingredient.max_concentration = ingredient_data.max_concentration
+        if ingredient_data.carcinogenicity is not None:
+            ingredient.carcinogenicity = ingredient_data.carcinogenicity
+        if ingredient_data.allergenicity is not None:
+            ingredient.allergenicity = ingredient_data.allergenicity
+        db.flush()
+        _invalidate_on_commit(db)
+        refresh_product_read_models(db, ingredient_id=ingredient.id)
+        facet_cache.clear_on_commit(db)
+        return ingredient
+    except IntegrityError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Ingredient name already exists"
+        )
 
 
 @router.put("/{ingredient_id}", response_model=IngredientSchema)
-def update_ingredient(ingredient_id: int, ingredient_data: IngredientUpdate):
+async def update_ingredient(ingredient_id: int, ingredient_data: IngredientUpdate):
     """Update an existing ingredient."""
-    with session() as db:
-        ingredient = db.query(Ingredient).filter(Ingredient.id == ingredient_id).first()
-        if not ingredient:
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail="Ingredient not found"
-            )
-        
-        try:
-            if ingredient_data.name is not None:
-                ingredient.name = ingredient_data.name
-            if ingredient_data.purpose is not None:
-                ingredient.purpose = ingredient_data.purpose
-            ingredient.safety_level = ingredient_data.safety_level
-            if ingredient_data.max_concentration is not None:
-                ingredient.max_concentration = ingredient_data.max_concentration
-            if ingredient_data.carcinogenicity is not None:
-                ingredient.carcinogenicity = ingredient_data.carcinogenicity
-            if ingredient_data.allergenicity is not None:
-                ingredient.allergenicity = ingredient_data.allergenicity
-            db.flush()
-            return ingredient
-        except IntegrityError:
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail="Ingredient name already exists"
-            )
+    return await run_in_session(_update_ingredient, ingredient_id, ingredient_data)
+
+
+def _delete_ingredient(db: Session, ingredient_id: int):
+    ingredient = db.query(Ingredient).filter(Ingredient.id == ingredient_id).first()
+    if not ingredient:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Ingredient not found"
+        )
+    # Связи удаляются при flush; поисковый документ и профиль риска затронутых товаров считаются заново
+    product_ids = [product.id for product in ingredient.products]
+    db.delete(ingredient)
+    db.flush()
+    refresh_product_read_models(db, product_ids=product_ids)
+    _invalidate_on_commit(db)
+    facet_cache.clear_on_commit(db)
 
 
 @router.delete("/{ingredient_id}", status_code=status.HTTP_204_NO_CONTENT)
-def delete_ingredient(ingredient_id: int):
+async def delete_ingredient(ingredient_id: int):
     """Delete an ingredient."""
-    with session() as db:
-        ingredient = db.query(Ingredient).filter(Ingredient.id == ingredient_id).first()
-        if not ingredient:
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail="Ingredient not found"
-            )
-        db.delete(ingredient)
+    await run_in_session(_delete_ingredient, ingredient_id)
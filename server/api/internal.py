@@ -0,0 +1,35 @@
+import secrets
+from typing import Optional
+
+from fastapi import APIRouter, Depends, Header, HTTPException, status
+
+from db.config import config
+from db.pool import pool_metrics
+from ..schemas.internal import PoolStatsSchema
+
+
+def require_internal_token(authorization: Optional[str] = Header(None)) -> None:
+    """Checks "Authorization: Bearer <INTERNAL_TOKEN>" when a token is configured."""
+    if config.INTERNAL_TOKEN is None:
+        return
+    scheme, _, token = (authorization or "").partition(" ")
+    if scheme.lower() != "bearer" or not secrets.compare_digest(token.encode(), config.INTERNAL_TOKEN.encode()):
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid internal token",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+
+
+router = APIRouter(
+    prefix="/internal",
+    tags=["Internal"],
+    include_in_schema=False,
+    dependencies=[Depends(require_internal_token)],
+)
+
+
+@router.get("/pool", response_model=PoolStatsSchema)
+async def get_pool_stats():
+    """Live connection pool statistics of this worker process."""
+    return pool_metrics.snapshot()
@@ -0,0 +1,17 @@
+from fastapi import APIRouter, Depends
+from fastapi.responses import PlainTextResponse
+
+from ..metrics import render_metrics
+from .internal import require_internal_token
+
+router = APIRouter(tags=["Internal"], include_in_schema=False, dependencies=[Depends(require_internal_token)])
+
+
+class PrometheusResponse(PlainTextResponse):
+    media_type = "text/plain; version=0.0.4"
+
+
+@router.get("/metrics", response_class=PrometheusResponse)
+async def get_metrics():
+    """Request, SQL and pool metrics of this worker process for Prometheus to scrape."""
+    return render_metrics()
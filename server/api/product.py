@@ -1,12 +1,72 @@
-from typing import Any, List, Optional, Type
+from typing import Any, Dict, List, Optional, Tuple, Type, Union
 
-from fastapi import APIRouter, HTTPException, Query, status
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Request, Response, status
+from fastapi.responses import StreamingResponse
+from pydantic_core import to_json
+from sqlalchemy import and_, func, or_
 from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import joinedload, selectinload, Session
 
+from core.enums import ExportFormat, MatchMode, ProductSort, SafetyLevel
 from db import Product, Brand, Category, Ingredient, SkinType, Concern, Tag
-from db.session import session
-from ..schemas.product import ProductCreate, ProductUpdate, ProductShort, ProductDetailed
+from db.config import config
+from db.models import ProductListing
+from db.product_filters import (
+    ProductFilters,
+    facet_counts,
+    matches_more_than,
+    product_list_item_dict,
+    product_row_dict,
+    product_rows_select,
+)
+from db.read_model import refresh_product_read_models
+from db.risk import SAFETY_LEVEL_RANK
+from db.search import search_rank, use_custom_plans
+from db.session import run_in_session, stream_in_session
+from ..cache import etag_for, facet_cache, json_response
+from ..http_cache import not_modified, weak_etag
+from ..product_export import BATCH_SIZE as EXPORT_BATCH_SIZE, csv_chunks, export_query, ndjson_chunks
+from ..product_import import (
+    MAX_REPORTED_ERRORS,
+    NDJSON_MEDIA_TYPES,
+    batches,
+    import_batch,
+    parse_csv,
+    parse_ndjson,
+)
+from ..product_writes import (
+    CONCENTRATIONS_FIELD,
+    FK_FIELDS,
+    LINK_FIELDS,
+    M2M_FIELDS,
+    add_links,
+    existing_reference_ids,
+    remove_links,
+    replace_links,
+    set_concentrations,
+    update_product_row,
+)
+from ..recommend import UserProfile, recommendation_index
+from ..similarity import exact_neighbours, similarity_index
+from ..product_cache import product_detail_cache
+from ..responses import APIJSONResponse, model_payload, model_response
+from ..pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, NEXT_CURSOR_HEADER, decode_cursor, encode_cursor
+from ..schemas.product import (
+    BulkImportResult,
+    FacetCount,
+    MAX_BATCH_IDS,
+    ProductBatch,
+    ProductBatchRequest,
+    ProductCreate,
+    ProductDetailed,
+    ProductFacets,
+    ProductListItem,
+    ProductPatch,
+    ProductRecommendation,
+    ProductShort,
+    ProductSimilar,
+    ProductUpdate,
+)
 
 router = APIRouter(prefix="/products", tags=["Products"])
 
@@ -38,14 +98,13 @@ def _assign_m2m(
     setattr(product_instance, attr_name, objs)
 
 
-@router.get("/all", response_model=List[ProductShort])
-def get_all_products(
+def product_filters(
     # Legacy parameters (maintained for backward compatibility)
     name: Optional[str] = Query(None, description="Search products by name (case-insensitive partial match) - deprecated, use 'search' instead"),
     brand: Optional[str] = Query(None, description="Search products by brand name (case-insensitive partial match) - deprecated, use 'search' instead"),
 
     # Unified search parameter
-    search: Optional[str] = Query(None, description="Universal search across product name, brand name, category name, and ingredient names (case-insensitive partial match)"),
+    search: Optional[str] = Query(None, description="Universal search across product name, brand name, category name, and ingredient names (word prefix or fuzzy name match; ordered by relevance unless sort_by is set, or by ID when too many products match)"),
 
     # Category filters
     category_id: Optional[int] = Query(None, description="Filter by category ID"),
@@ -53,14 +112,18 @@ def get_all_products(
 
     # Multi-select filters (many-to-many relationships)
     skin_type_ids: Optional[List[int]] = Query(None, description="Filter by suitable skin types (comma-separated IDs)"),
+    skin_type_match: MatchMode = Query(MatchMode.any, description="Match products having any or all of 'skin_type_ids'"),
     concern_ids: Optional[List[int]] = Query(None, description="Filter by target concerns (comma-separated IDs)"),
+    concern_match: MatchMode = Query(MatchMode.any, description="Match products having any or all of 'concern_ids'"),
     tag_ids: Optional[List[int]] = Query(None, description="Filter by product tags (comma-separated IDs)"),
+    tag_match: MatchMode = Query(MatchMode.any, description="Match products having any or all of 'tag_ids'"),
     ingredient_ids: Optional[List[int]] = Query(None, description="Filter by ingredients (comma-separated IDs)"),
+    ingredient_match: MatchMode = Query(MatchMode.any, description="Match products having any or all of 'ingredient_ids'"),
 
-    # Pagination
-    skip: int = Query(0, ge=0, description="Number of records to skip"),
-    limit: Optional[int] = Query(None, description="Maximum number of records to return"),
-):
+    # Ingredient risk profile filters
+    max_safety_level: Optional[SafetyLevel] = Query(None, description="Only products whose worst ingredient is at most this level (safe < unknown < caution < danger); products without ingredients are excluded"),
+    max_allergenicity: Optional[int] = Query(None, description="Only products whose most allergenic ingredient does not exceed this value"),
+) -> ProductFilters:
     # Parameter validation
     if category_id and category:
         raise HTTPException(
@@ -75,170 +138,528 @@ def get_all_products(
                 detail="Cannot combine legacy 'name'/'brand' parameters with unified 'search' parameter. Use 'search' instead."
             )
 
-    with session() as s:
-        query = s.query(Product).options(
+    return ProductFilters(
+        search=search,
+        name=name,
+        brand=brand,
+        category_id=category_id,
+        category=category,
+        skin_type_ids=skin_type_ids,
+        skin_type_match=skin_type_match,
+        concern_ids=concern_ids,
+        concern_match=concern_match,
+        tag_ids=tag_ids,
+        tag_match=tag_match,
+        ingredient_ids=ingredient_ids,
+        ingredient_match=ingredient_match,
+        max_safety_level=max_safety_level,
+        max_allergenicity=max_allergenicity,
+    )
+
+
+# Сортировка по профилю риска: сначала безопасные; товары без данных — в конце
+_SORT_KEYS = {
+    ProductSort.safety: func.coalesce(ProductListing.safety_rank, len(SAFETY_LEVEL_RANK)),
+    ProductSort.allergenicity: func.coalesce(ProductListing.max_allergenicity, 2**31 - 1),
+}
+
+
+def _rank_by_relevance(s: Session, filters: ProductFilters, after_key: Optional[List[Any]]) -> bool:
+    # Следующие страницы продолжают порядок первой: курсор по релевантности — пара (ранг, id)
+    if after_key is not None:
+        return len(after_key) == 2
+    # Ранг считается для каждого совпадения до LIMIT: широкий запрос идёт по ID
+    return not matches_more_than(s, filters, config.SEARCH_RANK_MAX_MATCHES)
+
+
+def _cursor_size(sort_by: Optional[ProductSort], filters: ProductFilters) -> Union[int, Tuple[int, ...]]:
+    # При сортировке по ключу курсор хранит пару (ключ, id), при sort_by=id — только id;
+    # при поиске без sort_by — пару (ранг, id) или только id, если совпадений
+    # слишком много для ранжирования
+    if sort_by in _SORT_KEYS:
+        return 2
+    if sort_by is None and filters.search:
+        return (1, 2)
+    return 1
+
+
+def _list_products(
+    s: Session,
+    response: Response,
+    filters: ProductFilters,
+    after_key: Optional[List[Any]],
+    skip: int,
+    limit: int,
+    sort_by: Optional[ProductSort] = None,
+) -> List[dict]:
+    if filters.search:
+        use_custom_plans(s)
+    # Колонки вместо ORM-объектов: без identity map и отдельных selectinload
+    query = product_rows_select(filters)
+
+    # Явная сортировка (в том числе по ID), иначе релевантность при поиске; ID — для предсказуемого порядка
+    key, descending = None, False
+    if sort_by in _SORT_KEYS:
+        key = _SORT_KEYS[sort_by]
+    elif sort_by is None and filters.search and _rank_by_relevance(s, filters, after_key):
+        key, descending = search_rank(filters.search), True
+    if key is not None:
+        query = query.add_columns(key.label("sort_key"))
+
+    # Keyset: следующая страница начинается строго после последней отданной строки
+    if after_key is not None:
+        if key is not None:
+            after_value, after_id = after_key
+            beyond = key < after_value if descending else key > after_value
+            query = query.where(
+                or_(beyond, and_(key == after_value, Product.id > after_id))
+            )
+        else:
+            query = query.where(Product.id > after_key[0])
+
+    if key is not None:
+        query = query.order_by(key.desc() if descending else key, Product.id)
+    else:
+        query = query.order_by(Product.id)
+
+    if skip:
+        query = query.offset(skip)
+
+    # Берём на одну строку больше, чтобы понять, есть ли следующая страница
+    rows = s.execute(query.limit(limit + 1)).all()
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1]
+        next_key = (last.sort_key, last.id) if key is not None else (last.id,)
+        response.headers[NEXT_CURSOR_HEADER] = encode_cursor(*next_key)
+    # Слабый ETag по сырым строкам и курсору следующей страницы: при совпадении
+    # страница не валидируется и не сериализуется
+    response.headers["ETag"] = weak_etag(
+        to_json([response.headers.get(NEXT_CURSOR_HEADER), [tuple(row) for row in rows]])
+    )
+
+    return [product_list_item_dict(row) for row in rows]
+
+
+@router.get("/all", response_model=List[ProductListItem], response_class=APIJSONResponse)
+async def get_all_products(
+    request: Request,
+    response: Response,
+    filters: ProductFilters = Depends(product_filters),
+    sort_by: Optional[ProductSort] = Query(None, description="Order by ID or by ingredient risk profile ('safety', 'allergenicity'; safest first); overrides search relevance"),
+
+    # Pagination
+    cursor: Optional[str] = Query(None, description=f"Opaque cursor from the '{NEXT_CURSOR_HEADER}' response header of the previous page"),
+    skip: int = Query(0, ge=0, description="Number of records to skip - deprecated, use 'cursor' instead"),
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE, description="Maximum number of records to return"),
+):
+    if cursor and skip:
+        raise HTTPException(
+            status_code=400,
+            detail="Cannot combine 'cursor' with 'skip'. Use 'cursor' only."
+        )
+
+    after_key = decode_cursor(cursor, size=_cursor_size(sort_by, filters)) if cursor else None
+
+    items = await run_in_session(_list_products, response, filters, after_key, skip, limit, sort_by)
+    # 304 тоже несёт курсор: клиент листает дальше по сохранённой странице
+    headers = {name: response.headers[name] for name in ("ETag", NEXT_CURSOR_HEADER) if name in response.headers}
+    return not_modified(request, headers) or model_response(
+        List[ProductListItem], items, headers=response.headers
+    )
+
+
+def _product_facets(s: Session, filters: ProductFilters) -> bytes:
+    counts = facet_counts(s, filters)
+    facets = ProductFacets(**{
+        facet: [FacetCount(id=value_id, count=products) for value_id, products in values]
+        for facet, values in counts.items()
+    })
+    return facets.model_dump_json(by_alias=True).encode()
+
+
+@router.get("/facets", response_model=ProductFacets)
+async def get_product_facets(
+    filters: ProductFilters = Depends(product_filters),
+    if_none_match: Optional[str] = Header(None),
+):
+    """Number of products per category, skin type, concern and tag for the given filters."""
+    key = filters.cache_key()
+    entry = facet_cache.get(key)
+    if entry is None:
+        generation = facet_cache.generation
+        payload = await run_in_session(_product_facets, filters)
+        entry = facet_cache.set(key, payload, generation)
+    return json_response(entry, if_none_match)
+
+
+@router.post("/bulk", response_model=BulkImportResult)
+async def bulk_create_products(request: Request):
+    """Import products from a JSON Lines (application/x-ndjson) or CSV (text/csv) upload.
+
+    The body is parsed as it streams in and written in batches, each in its own
+    transaction; rows that fail validation, reference unknown IDs or are not
+    valid UTF-8 are skipped and reported by line number. Only the first
+    errors are listed (ErrorsTruncated); Failed counts all of them.
+    """
+    content_type = request.headers.get("content-type", "").split(";")[0].strip().lower()
+    if content_type in NDJSON_MEDIA_TYPES:
+        rows = parse_ndjson(request.stream())
+    elif content_type == "text/csv":
+        rows = parse_csv(request.stream())
+    else:
+        raise HTTPException(
+            status_code=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE,
+            detail="Upload products as application/x-ndjson or text/csv"
+        )
+
+    created, failed, errors = 0, 0, []
+    async for batch in batches(rows):
+        ids, batch_errors = await run_in_session(import_batch, batch)
+        created += len(ids)
+        failed += len(batch_errors)
+        errors.extend(batch_errors[:MAX_REPORTED_ERRORS - len(errors)])
+
+    return BulkImportResult(
+        created=created, failed=failed, errors=errors, errors_truncated=failed > len(errors)
+    )
+
+
+@router.get("/export")
+async def export_products(
+    filters: ProductFilters = Depends(product_filters),
+    export_format: ExportFormat = Query(ExportFormat.ndjson, alias="format", description="Output format: one JSON object per line, or CSV"),
+):
+    """Stream the whole (filtered) catalog, reading it through a server-side cursor."""
+    partitions = stream_in_session(export_query(filters), EXPORT_BATCH_SIZE)
+    if export_format == ExportFormat.csv:
+        body, media_type = csv_chunks(partitions), "text/csv"
+    else:
+        body, media_type = ndjson_chunks(partitions), "application/x-ndjson"
+    return StreamingResponse(
+        body,
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="products.{export_format.value}"'},
+    )
+
+
+def _ranked_items(s: Session, ranked: List[Tuple[int, float]], score_field: str) -> List[dict]:
+    """List items for (product_id, score) pairs, in the given order."""
+    if not ranked:
+        return []
+
+    query = product_rows_select(ProductFilters()).where(Product.id.in_([product_id for product_id, _ in ranked]))
+    rows = {row.id: row for row in s.execute(query)}
+    return [
+        {**product_list_item_dict(rows[product_id]), score_field: score}
+        for product_id, score in ranked
+        if product_id in rows
+    ]
+
+
+def _recommend_products(s: Session, profile: UserProfile, limit: int) -> List[dict]:
+    recommendation_index.sync(s)
+    return _ranked_items(s, recommendation_index.top(profile, limit), "score")
+
+
+@router.get("/recommend", response_model=List[ProductRecommendation], response_class=APIJSONResponse)
+async def recommend_products(
+    skin_type_ids: Optional[List[int]] = Query(None, description="User's skin types; products suitable for any of them score higher"),
+    concern_ids: Optional[List[int]] = Query(None, description="User's concerns; score grows with the share of them a product targets"),
+    avoid_ingredient_ids: Optional[List[int]] = Query(None, description="Exclude products containing any of these ingredients"),
+    max_safety_level: Optional[SafetyLevel] = Query(None, description="Exclude products whose worst ingredient is above this level"),
+    limit: int = Query(20, ge=1, le=MAX_PAGE_SIZE, description="Number of products to return"),
+):
+    """Top products for a skin profile, scored across the whole catalog in memory.
+
+    The score rewards skin type match and concern overlap and is lowered by
+    the product's worst ingredient safety level.
+    """
+    profile = UserProfile(
+        skin_type_ids=tuple(skin_type_ids or ()),
+        concern_ids=tuple(concern_ids or ()),
+        avoid_ingredient_ids=tuple(avoid_ingredient_ids or ()),
+        max_safety_level=max_safety_level,
+    )
+    items = await run_in_session(_recommend_products, profile, limit)
+    return model_response(List[ProductRecommendation], items)
+
+
+def _load_detailed_payloads(s: Session, product_ids: List[int]) -> Dict[int, bytes]:
+    """Serialized ProductDetailed of the existing ids: one query per relationship for the whole set."""
+    products = (
+        s.query(Product)
+        .options(
             selectinload(Product.brand),
             selectinload(Product.category),
+            selectinload(Product.ingredients),
+            selectinload(Product.suitable_for_skin_types),
+            selectinload(Product.targets_concerns),
+            selectinload(Product.tags),
+        )
+        .filter(Product.id.in_(product_ids))
+        .all()
+    )
+    return {product.id: model_payload(ProductDetailed, product) for product in products}
+
+
+async def _detailed_payloads(product_ids: List[int]) -> Dict[int, bytes]:
+    """Payloads from the product cache; misses are loaded together and cached."""
+    cached = await product_detail_cache.lookup(product_ids)
+    payloads = {product_id: payload for product_id, (payload, _) in cached.items() if payload is not None}
+    misses = [product_id for product_id in product_ids if product_id not in payloads]
+    if misses:
+        loaded = await run_in_session(_load_detailed_payloads, misses)
+        await product_detail_cache.store(
+            {product_id: (payload, cached[product_id][1]) for product_id, payload in loaded.items()}
         )
+        payloads.update(loaded)
+    return payloads
 
-        if search:
-            search_filter = (
-                Product.name.ilike(f"%{search}%") |
-                Brand.name.ilike(f"%{search}%") |
-                Category.name.ilike(f"%{search}%") |
-                Ingredient.name.ilike(f"%{search}%")
-            )
-            query = query.outerjoin(Product.brand).outerjoin(Product.category).outerjoin(Product.ingredients).filter(search_filter)
 
-        elif name or brand:
-            if name:
-                query = query.filter(Product.name.ilike(f"%{name}%"))
-            if brand:
-                query = query.join(Product.brand).filter(Brand.name.ilike(f"%{brand}%"))
+async def _batch_response(request: Request, ids: List[int]) -> Response:
+    ids = list(dict.fromkeys(ids))
+    payloads = await _detailed_payloads(ids)
+    found = [payloads[product_id] for product_id in ids if product_id in payloads]
+    missing = [product_id for product_id in ids if product_id not in payloads]
+    # Карточки уже сериализованы (в том числе в кэше) — ответ собирается из готовых байтов
+    body = b'{"Products":[' + b",".join(found) + b'],"MissingIds":' + to_json(missing) + b"}"
+    headers = {"ETag": weak_etag(body)}
+    return not_modified(request, headers) or APIJSONResponse(body, headers=headers)
 
-        if category_id:
-            query = query.filter(Product.category_id == category_id)
-        elif category:
-            query = query.join(Product.category).filter(Category.name.ilike(f"%{category}%"))
 
-        if skin_type_ids:
-            query = query.join(Product.suitable_for_skin_types).filter(SkinType.id.in_(skin_type_ids))
+@router.get("/batch", response_model=ProductBatch, response_class=APIJSONResponse)
+async def get_products_batch(
+    request: Request,
+    ids: List[int] = Query(..., min_length=1, max_length=MAX_BATCH_IDS, description="Product IDs, e.g. ?ids=1&ids=2"),
+):
+    """Several detailed products at once, in request order; unknown IDs are listed in MissingIds."""
+    return await _batch_response(request, ids)
 
-        if concern_ids:
-            query = query.join(Product.targets_concerns).filter(Concern.id.in_(concern_ids))
 
-        if tag_ids:
-            query = query.join(Product.tags).filter(Tag.id.in_(tag_ids))
+@router.post("/batch", response_model=ProductBatch, response_class=APIJSONResponse)
+async def post_products_batch(request: Request, batch_in: ProductBatchRequest):
+    """Same as GET /products/batch, for ID lists too long for a query string."""
+    return await _batch_response(request, batch_in.ids)
 
-        if ingredient_ids:
-            query = query.join(Product.ingredients).filter(Ingredient.id.in_(ingredient_ids))
 
-        # Добавляем сортировку по ID для корректной работы distinct и предсказуемого порядка
-        query = query.order_by(Product.id)
-        
-        if any([skin_type_ids, concern_ids, tag_ids, ingredient_ids]):
-            query = query.distinct(Product.id)
-        
-        if limit:
-            query = query.offset(skip).limit(limit)
-        else:
-            query = query.offset(skip)
-
-        products = query.all()
-        return products
-
-from fastapi import HTTPException
-from sqlalchemy.orm import selectinload
-
-@router.get("/{product_id}", response_model=ProductDetailed)
-def get_product_detailed(product_id: int):
-    with session() as s:
-        product = (
-            s.query(Product)
-            .options(
-                selectinload(Product.brand),
-                selectinload(Product.category),
-                selectinload(Product.ingredients),
-                selectinload(Product.suitable_for_skin_types),
-                selectinload(Product.targets_concerns),
-                selectinload(Product.tags),
-            )
-            .filter(Product.id == product_id)
-            .first()
-        )
+@router.get("/{product_id}", response_model=ProductDetailed, response_class=APIJSONResponse)
+async def get_product_detailed(product_id: int, request: Request):
+    """Product with all its references; served from the product cache when possible."""
+    payloads = await _detailed_payloads([product_id])
+    if product_id not in payloads:
+        raise HTTPException(status_code=404, detail="Product not found")
+    headers = {"ETag": etag_for(payloads[product_id])}
+    return not_modified(request, headers) or APIJSONResponse(payloads[product_id], headers=headers)
 
-        if not product:
+
+def _similar_products(s: Session, product_id: int, limit: int) -> List[dict]:
+    ranked = similarity_index.neighbours(product_id)
+    if ranked is None:
+        if s.get(Product, product_id) is None:
             raise HTTPException(status_code=404, detail="Product not found")
+        ranked = exact_neighbours(s, product_id, limit)
+    return _ranked_items(s, ranked[:limit], "similarity")
 
-        return product
 
+@router.get("/{product_id}/similar", response_model=List[ProductSimilar], response_class=APIJSONResponse)
+async def get_similar_products(
+    product_id: int,
+    limit: int = Query(10, ge=1, le=config.SIMILAR_PRODUCTS_COUNT, description="Number of products to return"),
+):
+    """Products with the most similar ingredient lists (Jaccard similarity).
 
-@router.post("/", response_model=ProductShort, status_code=status.HTTP_201_CREATED)
-def create_product(product_in: ProductCreate) -> ProductShort:
-    with session() as s:
-        if product_in.brand_id:
-            _ensure_exists(s, Brand, product_in.brand_id, "Brand")
+    Neighbour lists are precomputed in the background; products added or
+    changed since the last rebuild are matched against the catalog directly.
+    """
+    items = await run_in_session(_similar_products, product_id, limit)
+    return model_response(List[ProductSimilar], items)
 
-        if product_in.category_id:
-            _ensure_exists(s, Category, product_in.category_id, "Category")
 
-        product_data = product_in.model_dump(
-            exclude={"ingredient_ids", "skin_type_ids", "concern_ids", "tag_ids"}
-        )
-        product = Product(**product_data)
-        s.add(product)
+def _create_product(s: Session, product_in: ProductCreate) -> Product:
+    if product_in.brand_id:
+        _ensure_exists(s, Brand, product_in.brand_id, "Brand")
+
+    if product_in.category_id:
+        _ensure_exists(s, Category, product_in.category_id, "Category")
+
+    product_data = product_in.model_dump(exclude=LINK_FIELDS)
+    product = Product(**product_data)
+    s.add(product)
+    s.flush()
+
+    _assign_m2m(s, product, "ingredients", Ingredient, product_in.ingredient_ids)
+    _assign_m2m(
+        s, product, "suitable_for_skin_types", SkinType, product_in.skin_type_ids
+    )
+    _assign_m2m(s, product, "targets_concerns", Concern, product_in.concern_ids)
+    _assign_m2m(s, product, "tags", Tag, product_in.tag_ids)
+
+    try:
         s.flush()
+        _set_concentrations(s, product.id, product_in.ingredient_concentrations)
+        refresh_product_read_models(s, product_ids=[product.id])
+        facet_cache.clear_on_commit(s)
+        s.commit()
+    except IntegrityError:
+        s.rollback()
+        raise HTTPException(
+            status_code=400, detail="Product with this name already exists"
+        )
 
-        _assign_m2m(s, product, "ingredients", Ingredient, product_in.ingredient_ids)
-        _assign_m2m(
-            s, product, "suitable_for_skin_types", SkinType, product_in.skin_type_ids
+    product = (
+        s.query(Product)
+        .options(
+            selectinload(Product.brand),
+            selectinload(Product.category),
         )
-        _assign_m2m(s, product, "targets_concerns", Concern, product_in.concern_ids)
-        _assign_m2m(s, product, "tags", Tag, product_in.tag_ids)
+        .filter(Product.id == product.id)
+        .one()
+    )
+
+    return product
+
+
+@router.post("/", response_model=ProductShort, status_code=status.HTTP_201_CREATED, response_class=APIJSONResponse)
+async def create_product(product_in: ProductCreate):
+    product = await run_in_session(_create_product, product_in)
+    return model_response(ProductShort, product, status_code=status.HTTP_201_CREATED)
+
 
-        try:
-            s.commit()
-        except IntegrityError:
-            s.rollback()
+# Поле ProductUpdate -> связь Product, как в сообщениях _assign_m2m
+_M2M_ATTRS = {
+    "ingredient_ids": "ingredients",
+    "skin_type_ids": "suitable_for_skin_types",
+    "concern_ids": "targets_concerns",
+    "tag_ids": "tags",
+}
+
+
+def _set_concentrations(s: Session, product_id: int, concentrations: Optional[Dict[int, Any]]) -> None:
+    missing = set_concentrations(s, product_id, concentrations or {})
+    if missing:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Concentrations given for ingredients not in the product: {missing}",
+        )
+
+
+def _check_references(
+    s: Session,
+    product_id: int,
+    product_in: Union[ProductUpdate, ProductPatch],
+    links: Dict[str, Optional[List[int]]],
+) -> None:
+    """Проверяет товар, бренд, категорию и добавляемые id связей (links) одним запросом.
+
+    Отсутствующий товар — 404 раньше любых ошибок в ссылках.
+    """
+    referenced = {
+        field: {getattr(product_in, field)} for field in FK_FIELDS if getattr(product_in, field) is not None
+    }
+    referenced.update({field: set(ids) for field, ids in links.items() if ids})
+    referenced["id"] = {product_id}
+    existing = existing_reference_ids(s, referenced)
+
+    if not existing["id"]:
+        raise HTTPException(status_code=404, detail="Product not found")
+
+    for field, model in FK_FIELDS.items():
+        if field in referenced and not existing[field]:
+            raise HTTPException(status_code=400, detail=f"{model.__name__} not found")
+    for field in M2M_FIELDS:
+        missing = referenced.get(field, set()) - existing.get(field, set())
+        if missing:
             raise HTTPException(
-                status_code=400, detail="Product with this name already exists"
+                status_code=400,
+                detail=f"Some {_M2M_ATTRS[field]} not found: {sorted(missing)}",
             )
 
-        product = (
-            s.query(Product)
-            .options(
-                selectinload(Product.brand),
-                selectinload(Product.category),
-            )
-            .filter(Product.id == product.id)
-            .one()
+
+def _update_product(s: Session, product_id: int, product_in: ProductUpdate) -> dict:
+    _check_references(s, product_id, product_in, {field: getattr(product_in, field) for field in M2M_FIELDS})
+
+    update_data = product_in.model_dump(exclude_unset=True, exclude=LINK_FIELDS)
+    try:
+        # Ответ строится из RETURNING, без повторной загрузки товара
+        row = update_product_row(s, product_id, update_data)
+        if row is None:
+            raise HTTPException(status_code=404, detail="Product not found")
+
+        # Список связей заменяется целиком: лишние удаляются, новые добавляются
+        for field in M2M_FIELDS:
+            ids = getattr(product_in, field)
+            if ids is not None:
+                replace_links(s, product_id, field, ids)
+        _set_concentrations(s, product_id, product_in.ingredient_concentrations)
+
+        refresh_product_read_models(s, product_ids=[product_id])
+        facet_cache.clear_on_commit(s)
+        s.commit()
+    except IntegrityError:
+        s.rollback()
+        raise HTTPException(
+            status_code=400, detail="Product with this name already exists"
         )
 
-        return product
+    return product_row_dict(row)
 
 
-@router.put("/{product_id}", response_model=ProductShort)
-def update_product(product_id: int, product_in: ProductUpdate):
-    with session() as s:
-        product = s.get(Product, product_id)
-        if not product:
-            raise HTTPException(status_code=404, detail="Product not found")
+@router.put("/{product_id}", response_model=ProductShort, response_class=APIJSONResponse)
+async def update_product(product_id: int, product_in: ProductUpdate):
+    product = await run_in_session(_update_product, product_id, product_in)
+    return model_response(ProductShort, product)
+
 
-        if product_in.brand_id is not None:
-            _ensure_exists(s, Brand, product_in.brand_id, "Brand")
-
-        if product_in.category_id is not None:
-            _ensure_exists(s, Category, product_in.category_id, "Category")
-
-        update_data = product_in.model_dump(exclude_unset=True, exclude={"ingredient_ids", "skin_type_ids", "concern_ids", "tag_ids"})
-        for field, value in update_data.items():
-            setattr(product, field, value)
-
-        if product_in.ingredient_ids is not None:
-            _assign_m2m(s, product, "ingredients", Ingredient, product_in.ingredient_ids)
-        if product_in.skin_type_ids is not None:
-            _assign_m2m(s, product, "suitable_for_skin_types", SkinType, product_in.skin_type_ids)
-        if product_in.concern_ids is not None:
-            _assign_m2m(s, product, "targets_concerns", Concern, product_in.concern_ids)
-        if product_in.tag_ids is not None:
-            _assign_m2m(s, product, "tags", Tag, product_in.tag_ids)
-
-        try:
-            s.commit()
-        except IntegrityError:
-            s.rollback()
+def _patch_product(s: Session, product_id: int, patch: ProductPatch) -> dict:
+    added = {field: getattr(patch, f"add_{field}") or [] for field in M2M_FIELDS}
+    removed = {field: getattr(patch, f"remove_{field}") or [] for field in M2M_FIELDS}
+    for field in M2M_FIELDS:
+        both = set(added[field]) & set(removed[field])
+        if both:
             raise HTTPException(
-                status_code=400, detail="Product with this name already exists"
+                status_code=400,
+                detail=f"Cannot both add and remove {_M2M_ATTRS[field]}: {sorted(both)}",
             )
+    if "name" in patch.model_fields_set and patch.name is None:
+        raise HTTPException(status_code=400, detail="Product name cannot be null")
+
+    _check_references(s, product_id, patch, added)
+
+    update_data = patch.model_dump(
+        exclude_unset=True,
+        exclude={f"{op}_{field}" for op in ("add", "remove") for field in M2M_FIELDS} | {CONCENTRATIONS_FIELD},
+    )
+    try:
+        row = update_product_row(s, product_id, update_data)
+        if row is None:
+            raise HTTPException(status_code=404, detail="Product not found")
 
-        product = (
-            s.query(Product)
-            .options(
-                selectinload(Product.brand),
-                selectinload(Product.category),
-            )
-            .filter(Product.id == product_id)
-            .one()
+        # Точечные изменения: остальные связи товара не читаются и не блокируются
+        for field in M2M_FIELDS:
+            remove_links(s, product_id, field, removed[field])
+            add_links(s, product_id, field, added[field])
+        _set_concentrations(s, product_id, patch.ingredient_concentrations)
+
+        refresh_product_read_models(s, product_ids=[product_id])
+        facet_cache.clear_on_commit(s)
+        s.commit()
+    except IntegrityError:
+        s.rollback()
+        raise HTTPException(
+            status_code=400, detail="Product with this name already exists"
         )
 
-        return product
\ No newline at end of file
+    return product_row_dict(row)
+
+
+@router.patch("/{product_id}", response_model=ProductShort, response_class=APIJSONResponse)
+async def patch_product(product_id: int, patch: ProductPatch):
+    """Partially update a product.
+
+    Only the fields present in the body are changed; Add*Ids / Remove*Ids
+    link or unlink individual ingredients, skin types, concerns and tags
+    without resending the whole list.
+    """
+    product = await run_in_session(_patch_product, product_id, patch)
+    return model_response(ProductShort, product)
@@ -0,0 +1,29 @@
+from fastapi import APIRouter, HTTPException, status
+from sqlalchemy.orm import Session
+
+from db.session import run_in_session
+from ..responses import APIJSONResponse, model_response
+from ..routines import check_routine, load_routine, routine_rules
+from ..schemas.routine import RoutineCheck, RoutineCheckRequest
+
+router = APIRouter(prefix="/routines", tags=["Routines"])
+
+
+def _check_routine(s: Session, product_ids: list) -> dict:
+    routine = load_routine(s, product_ids)
+    missing = [product_id for product_id in product_ids if product_id not in routine]
+    if missing:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Products not found: {', '.join(map(str, missing))}",
+        )
+    return check_routine(routine_rules.get(s), routine)
+
+
+@router.post("/check", response_model=RoutineCheck, response_class=APIJSONResponse)
+async def check_products_routine(routine_in: RoutineCheckRequest):
+    """Report conflicting actives, duplicated actives and summed concentrations
+    above an ingredient's max_concentration for products used together."""
+    product_ids = list(dict.fromkeys(routine_in.product_ids))
+    result = await run_in_session(_check_routine, product_ids)
+    return model_response(RoutineCheck, result)
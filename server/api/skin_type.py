@@ -1,82 +1,110 @@
-from typing import List
+from typing import List, Optional
 
-from fastapi import APIRouter, HTTPException, status
+from fastapi import APIRouter, Header, HTTPException, Request, status
 from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
 
 from db import SkinType
-from db.session import session
+from db.read_model import drop_listing_reference, listing_product_ids
+from db.session import run_in_session
+from ..cache import facet_cache, reference_cache
+from ..http_cache import not_modified, validators, version_etag
+from ..product_cache import product_detail_cache
+from ..responses import APIJSONResponse, model_response
 from ..schemas.skin_type import SkinTypeCreate, SkinTypeUpdate, SkinTypeSchema
 
 router = APIRouter(prefix="/skin-types", tags=["Skin Types"])
 
 
+def _load_skin_types(db: Session) -> List[SkinType]:
+    return db.query(SkinType).all()
+
+
 @router.get("/", response_model=List[SkinTypeSchema])
-def get_all_skin_types():
+async def get_all_skin_types(if_none_match: Optional[str] = Header(None)):
     """Retrieve all skin types."""
-    with session() as db:
-        skin_types = db.query(SkinType).all()
-        return skin_types
+    return await reference_cache.respond("skin_types", SkinTypeSchema, _load_skin_types, if_none_match)
+
+
+def _get_skin_type(db: Session, skin_type_id: int):
+    skin_type = db.query(SkinType).filter(SkinType.id == skin_type_id).first()
+    if not skin_type:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Skin type not found"
+        )
+    return skin_type
 
 
-@router.get("/{skin_type_id}", response_model=SkinTypeSchema)
-def get_skin_type(skin_type_id: int):
+@router.get("/{skin_type_id}", response_model=SkinTypeSchema, response_class=APIJSONResponse)
+async def get_skin_type(skin_type_id: int, request: Request):
     """Retrieve a specific skin type by ID."""
-    with session() as db:
-        skin_type = db.query(SkinType).filter(SkinType.id == skin_type_id).first()
-        if not skin_type:
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail="Skin type not found"
-            )
-        return skin_type
+    skin_type = await run_in_session(_get_skin_type, skin_type_id)
+    headers = validators(version_etag("skin_type", skin_type.id, skin_type.version), skin_type.updated_at)
+    return not_modified(request, headers) or model_response(SkinTypeSchema, skin_type, headers=headers)
+
+
+def _create_skin_type(db: Session, skin_type_data: SkinTypeCreate):
+    try:
+        new_skin_type = SkinType(name=skin_type_data.name)
+        db.add(new_skin_type)
+        db.flush()
+        reference_cache.invalidate_on_commit(db, "skin_types")
+        return new_skin_type
+    except IntegrityError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Skin type name already exists"
+        )
 
 
 @router.post("/", response_model=SkinTypeSchema, status_code=status.HTTP_201_CREATED)
-def create_skin_type(skin_type_data: SkinTypeCreate):
+async def create_skin_type(skin_type_data: SkinTypeCreate):
     """Create a new skin type."""
-    with session() as db:
-        try:
-            new_skin_type = SkinType(name=skin_type_data.name)
-            db.add(new_skin_type)
-            db.flush()
-            return new_skin_type
-        except IntegrityError:
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail="Skin type name already exists"
-            )
+    return await run_in_session(_create_skin_type, skin_type_data)
+
+
+def _update_skin_type(db: Session, skin_type_id: int, skin_type_data: SkinTypeUpdate):
+    skin_type = db.query(SkinType).filter(SkinType.id == skin_type_id).first()
+    if not skin_type:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Skin type not found"
+        )
+
+    try:
+        skin_type.name = skin_type_data.name
+        db.flush()
+        product_detail_cache.invalidate_on_commit(db, listing_product_ids(db, skin_type_id=skin_type.id))
+        reference_cache.invalidate_on_commit(db, "skin_types")
+        return skin_type
+    except IntegrityError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Skin type name already exists"
+        )
 
 
 @router.put("/{skin_type_id}", response_model=SkinTypeSchema)
-def update_skin_type(skin_type_id: int, skin_type_data: SkinTypeUpdate):
+async def update_skin_type(skin_type_id: int, skin_type_data: SkinTypeUpdate):
     """Update an existing skin type."""
-    with session() as db:
-        skin_type = db.query(SkinType).filter(SkinType.id == skin_type_id).first()
-        if not skin_type:
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail="Skin type not found"
-            )
-        
-        try:
-            skin_type.name = skin_type_data.name
-            db.flush()
-            return skin_type
-        except IntegrityError:
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail="Skin type name already exists"
-            )
+    return await run_in_session(_update_skin_type, skin_type_id, skin_type_data)
+
+
+def _delete_skin_type(db: Session, skin_type_id: int):
+    skin_type = db.query(SkinType).filter(SkinType.id == skin_type_id).first()
+    if not skin_type:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Skin type not found"
+        )
+    db.delete(skin_type)
+    drop_listing_reference(db, skin_type_id=skin_type.id)
+    reference_cache.invalidate_on_commit(db, "skin_types")
+    facet_cache.clear_on_commit(db)
 
 
 @router.delete("/{skin_type_id}", status_code=status.HTTP_204_NO_CONTENT)
-def delete_skin_type(skin_type_id: int):
+async def delete_skin_type(skin_type_id: int):
     """Delete a skin type."""
-    with session() as db:
-        skin_type = db.query(SkinType).filter(SkinType.id == skin_type_id).first()
-        if not skin_type:
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail="Skin type not found"
-            )
-        db.delete(skin_type)
+    await run_in_session(_delete_skin_type, skin_type_id)
@@ -1,82 +1,110 @@
-from typing import List
+from typing import List, Optional
 
-from fastapi import APIRouter, HTTPException, status
+from fastapi import APIRouter, Header, HTTPException, Request, status
 from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
 
 from db import Tag
-from db.session import session
+from db.read_model import drop_listing_reference, listing_product_ids
+from db.session import run_in_session
+from ..cache import facet_cache, reference_cache
+from ..http_cache import not_modified, validators, version_etag
+from ..product_cache import product_detail_cache
+from ..responses import APIJSONResponse, model_response
 from ..schemas.tag import TagCreate, TagUpdate, TagSchema
 
 router = APIRouter(prefix="/tags", tags=["Tags"])
 
 
+def _load_tags(db: Session) -> List[Tag]:
+    return db.query(Tag).all()
+
+
 @router.get("/", response_model=List[TagSchema])
-def get_all_tags():
+async def get_all_tags(if_none_match: Optional[str] = Header(None)):
     """Retrieve all tags."""
-    with session() as db:
-        tags = db.query(Tag).all()
-        return tags
+    return await reference_cache.respond("tags", TagSchema, _load_tags, if_none_match)
+
+
+def _get_tag(db: Session, tag_id: int):
+    tag = db.query(Tag).filter(Tag.id == tag_id).first()
+    if not tag:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Tag not found"
+        )
+    return tag
 
 
-@router.get("/{tag_id}", response_model=TagSchema)
-def get_tag(tag_id: int):
+@router.get("/{tag_id}", response_model=TagSchema, response_class=APIJSONResponse)
+async def get_tag(tag_id: int, request: Request):
     """Retrieve a specific tag by ID."""
-    with session() as db:
-        tag = db.query(Tag).filter(Tag.id == tag_id).first()
-        if not tag:
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail="Tag not found"
-            )
-        return tag
+    tag = await run_in_session(_get_tag, tag_id)
+    headers = validators(version_etag("tag", tag.id, tag.version), tag.updated_at)
+    return not_modified(request, headers) or model_response(TagSchema, tag, headers=headers)
+
+
+def _create_tag(db: Session, tag_data: TagCreate):
+    try:
+        new_tag = Tag(name=tag_data.name)
+        db.add(new_tag)
+        db.flush()
+        reference_cache.invalidate_on_commit(db, "tags")
+        return new_tag
+    except IntegrityError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Tag name already exists"
+        )
 
 
 @router.post("/", response_model=TagSchema, status_code=status.HTTP_201_CREATED)
-def create_tag(tag_data: TagCreate):
+async def create_tag(tag_data: TagCreate):
     """Create a new tag."""
-    with session() as db:
-        try:
-            new_tag = Tag(name=tag_data.name)
-            db.add(new_tag)
-            db.flush()
-            return new_tag
-        except IntegrityError:
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail="Tag name already exists"
-            )
+    return await run_in_session(_create_tag, tag_data)
+
+
+def _update_tag(db: Session, tag_id: int, tag_data: TagUpdate):
+    tag = db.query(Tag).filter(Tag.id == tag_id).first()
+    if not tag:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Tag not found"
+        )
+
+    try:
+        tag.name = tag_data.name
+        db.flush()
+        product_detail_cache.invalidate_on_commit(db, listing_product_ids(db, tag_id=tag.id))
+        reference_cache.invalidate_on_commit(db, "tags")
+        return tag
+    except IntegrityError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Tag name already exists"
+        )
 
 
 @router.put("/{tag_id}", response_model=TagSchema)
-def update_tag(tag_id: int, tag_data: TagUpdate):
+async def update_tag(tag_id: int, tag_data: TagUpdate):
     """Update an existing tag."""
-    with session() as db:
-        tag = db.query(Tag).filter(Tag.id == tag_id).first()
-        if not tag:
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail="Tag not found"
-            )
-        
-        try:
-            tag.name = tag_data.name
-            db.flush()
-            return tag
-        except IntegrityError:
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail="Tag name already exists"
-            )
+    return await run_in_session(_update_tag, tag_id, tag_data)
+
+
+def _delete_tag(db: Session, tag_id: int):
+    tag = db.query(Tag).filter(Tag.id == tag_id).first()
+    if not tag:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Tag not found"
+        )
+    db.delete(tag)
+    drop_listing_reference(db, tag_id=tag.id)
+    reference_cache.invalidate_on_commit(db, "tags")
+    facet_cache.clear_on_commit(db)
 
 
 @router.delete("/{tag_id}", status_code=status.HTTP_204_NO_CONTENT)
-def delete_tag(tag_id: int):
+async def delete_tag(tag_id: int):
     """Delete a tag."""
-    with session() as db:
-        tag = db.query(Tag).filter(Tag.id == tag_id).first()
-        if not tag:
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail="Tag not found"
-            )
-        db.delete(tag)
+    await run_in_session(_delete_tag, tag_id)
@@ -1,7 +1,14 @@
+import asyncio
 from contextlib import contextmanager
 from fastapi import FastAPI
 
-from db.connection import start_db_connections, stop_db_connections
+from db.config import config
+from db.connection import (
+    start_async_db_connections,
+    start_db_connections,
+    stop_async_db_connections,
+    stop_db_connections,
+)
 from .api import (
     product_router,
     brand_router,
@@ -10,9 +17,19 @@ from .api import (
     skin_type_router,
     concern_router,
     tag_router,
+    internal_router,
+    routine_router,
+    metrics_router,
 )
+from .http_cache import CacheControlMiddleware
+from .metrics import RequestMetricsMiddleware
+from .recommend import run_recommendation_loader
+from .similarity import run_similarity_builder
 
 app = FastAPI()
+app.add_middleware(CacheControlMiddleware, policies=config.CACHE_CONTROL, default=config.CACHE_CONTROL_DEFAULT)
+# Added last, so it is the outermost and measures the other middleware too
+app.add_middleware(RequestMetricsMiddleware)
 
 # Register all routers
 app.include_router(product_router)
@@ -22,12 +39,27 @@ app.include_router(ingredient_router)
 app.include_router(skin_type_router)
 app.include_router(concern_router)
 app.include_router(tag_router)
+app.include_router(routine_router)
+# Internal endpoints are opt-in (INTERNAL_ENDPOINTS); INTERNAL_TOKEN protects them when set
+if config.INTERNAL_ENDPOINTS:
+    app.include_router(internal_router)
+    app.include_router(metrics_router)
 
 @app.on_event('startup')
-def startup_event():
-    start_db_connections()
+async def startup_event():
+    if config.DB_ASYNC:
+        await start_async_db_connections()
+    else:
+        start_db_connections()
+    app.state.similarity_builder = asyncio.create_task(run_similarity_builder())
+    app.state.recommendation_loader = asyncio.create_task(run_recommendation_loader())
 
 
 @app.on_event('shutdown')
-def shutdown_event():
-    stop_db_connections()
\ No newline at end of file
+async def shutdown_event():
+    app.state.similarity_builder.cancel()
+    app.state.recommendation_loader.cancel()
+    if config.DB_ASYNC:
+        await stop_async_db_connections()
+    else:
+        stop_db_connections()
\ No newline at end of file
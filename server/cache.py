@@ -0,0 +1,201 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Generic, Hashable, Iterable, List, Optional, Type, TypeVar
+
+from fastapi import Response, status
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from db.config import config
+from db.session import run_in_session
+from .responses import adapter_for
+from .schemas.common import APIModel
+
+T = TypeVar("T")
+
+
+def etag_for(payload: bytes) -> str:
+    """Strong ETag derived from the response body."""
+    return '"' + hashlib.sha1(payload).hexdigest() + '"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Check an If-None-Match header value against an ETag (weak comparison)."""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    candidates = (tag.strip().removeprefix("W/") for tag in if_none_match.split(","))
+    return etag.removeprefix("W/") in candidates
+
+
+def json_response(entry: "CacheEntry", if_none_match: Optional[str] = None) -> Response:
+    """JSON response for a cached payload, or 304 if the client copy is current."""
+    if etag_matches(if_none_match, entry.etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers={"ETag": entry.etag})
+    return Response(content=entry.payload, media_type="application/json", headers={"ETag": entry.etag})
+
+
+def on_commit(db_session: Session, callback: Callable[[], None]) -> None:
+    """Run callback once the session commits, so readers never cache uncommitted state."""
+    event.listen(db_session, "after_commit", lambda _: callback(), once=True)
+
+
+@dataclass(frozen=True)
+class CacheEntry:
+    payload: bytes
+    etag: str
+    expires_at: float
+
+
+class ReferenceCache:
+    """Read-through cache of serialized reference lists (brands, tags, ...).
+
+    Every key has a version that is bumped on invalidation; a load that
+    raced with an invalidation is returned to its caller but not stored.
+    The TTL bounds staleness across worker processes, which do not see
+    each other's invalidations.
+    """
+
+    def __init__(self, ttl: float):
+        self._ttl = ttl
+        self._lock = threading.Lock()
+        self._entries: Dict[str, CacheEntry] = {}
+        self._versions: Dict[str, int] = {}
+
+    async def get(
+        self,
+        key: str,
+        schema: Type[APIModel],
+        loader: Callable[[Session], Iterable[Any]],
+    ) -> CacheEntry:
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry and entry.expires_at > now:
+                return entry
+            version = self._versions.get(key, 0)
+
+        adapter = adapter_for(List[schema])
+        items = adapter.validate_python(list(await run_in_session(loader)), from_attributes=True)
+        payload = adapter.dump_json(items, by_alias=True)
+        entry = CacheEntry(payload=payload, etag=etag_for(payload), expires_at=now + self._ttl)
+
+        with self._lock:
+            if self._versions.get(key, 0) == version:
+                self._entries[key] = entry
+        return entry
+
+    async def respond(
+        self,
+        key: str,
+        schema: Type[APIModel],
+        loader: Callable[[Session], Iterable[Any]],
+        if_none_match: Optional[str] = None,
+    ) -> Response:
+        """Build a JSON response for a cached list, or 304 if the client copy is current."""
+        entry = await self.get(key, schema, loader)
+        return json_response(entry, if_none_match)
+
+    def invalidate(self, key: str) -> None:
+        with self._lock:
+            self._versions[key] = self._versions.get(key, 0) + 1
+            self._entries.pop(key, None)
+
+    def invalidate_on_commit(self, db_session: Session, key: str) -> None:
+        on_commit(db_session, lambda: self.invalidate(key))
+
+
+class TTLCache:
+    """Bounded LRU of serialized payloads with a per-entry TTL.
+
+    clear() bumps a generation counter; callers pass the generation they
+    read before loading to set(), so results computed from pre-clear data
+    are dropped instead of stored.
+    """
+
+    def __init__(self, maxsize: int, ttl: float):
+        self._maxsize = maxsize
+        self._ttl = ttl
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[Hashable, CacheEntry]" = OrderedDict()
+        self._generation = 0
+
+    @property
+    def generation(self) -> int:
+        return self._generation
+
+    def get(self, key: Hashable) -> Optional[CacheEntry]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry.expires_at <= time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return entry
+
+    def set(self, key: Hashable, payload: bytes, generation: int) -> CacheEntry:
+        entry = CacheEntry(payload=payload, etag=etag_for(payload), expires_at=time.monotonic() + self._ttl)
+        with self._lock:
+            if generation == self._generation:
+                self._entries[key] = entry
+                self._entries.move_to_end(key)
+                while len(self._entries) > self._maxsize:
+                    self._entries.popitem(last=False)
+        return entry
+
+    def clear(self) -> None:
+        with self._lock:
+            self._generation += 1
+            self._entries.clear()
+
+    def clear_on_commit(self, db_session: Session) -> None:
+        on_commit(db_session, self.clear)
+
+
+class DerivedIndex(Generic[T]):
+    """In-process structure built from the database, e.g. a matcher over a reference table.
+
+    Built on first use inside the caller's session and rebuilt after
+    invalidate() or once the TTL expires. As in ReferenceCache, a build
+    that raced with an invalidation is returned to its caller but not kept.
+    """
+
+    def __init__(self, ttl: float, build: Callable[[Session], T]):
+        self._ttl = ttl
+        self._build = build
+        self._lock = threading.Lock()
+        self._value: Optional[T] = None
+        self._expires_at = 0.0
+        self._version = 0
+
+    def get(self, db_session: Session) -> T:
+        now = time.monotonic()
+        with self._lock:
+            value, version = self._value, self._version
+            if value is not None and self._expires_at > now:
+                return value
+
+        value = self._build(db_session)
+        with self._lock:
+            if self._version == version:
+                self._value = value
+                self._expires_at = now + self._ttl
+        return value
+
+    def invalidate(self) -> None:
+        with self._lock:
+            self._version += 1
+            self._value = None
+
+    def invalidate_on_commit(self, db_session: Session) -> None:
+        on_commit(db_session, self.invalidate)
+
+
+reference_cache = ReferenceCache(ttl=config.REFERENCE_CACHE_TTL)
+facet_cache = TTLCache(maxsize=config.FACET_CACHE_SIZE, ttl=config.FACET_CACHE_TTL)
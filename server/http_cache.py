@@ -0,0 +1,80 @@
+import hashlib
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Dict, Mapping, Optional
+
+from fastapi import Request, Response, status
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from .cache import etag_matches
+
+
+def weak_etag(payload: bytes) -> str:
+    """Weak ETag for listings: same content, not necessarily the same bytes."""
+    return 'W/"' + hashlib.sha1(payload).hexdigest() + '"'
+
+
+def version_etag(kind: str, obj_id: int, version: int) -> str:
+    """Strong ETag of a single record, whose representation only changes with its version."""
+    return f'"{kind}-{obj_id}-{version}"'
+
+
+def validators(etag: str, last_modified: Optional[datetime] = None) -> Dict[str, str]:
+    headers = {"ETag": etag}
+    if last_modified is not None:
+        headers["Last-Modified"] = format_datetime(last_modified.astimezone(timezone.utc), usegmt=True)
+    return headers
+
+
+def not_modified(request: Request, headers: Mapping[str, str]) -> Optional[Response]:
+    """304 if the client copy is current, so the handler can skip serialization.
+
+    If-None-Match takes precedence; If-Modified-Since is only consulted
+    without it, as RFC 9110 requires.
+    """
+    if_none_match = request.headers.get("if-none-match")
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_none_match is not None:
+        fresh = etag_matches(if_none_match, headers["ETag"])
+    elif if_modified_since and "Last-Modified" in headers:
+        try:
+            fresh = parsedate_to_datetime(headers["Last-Modified"]) <= parsedate_to_datetime(if_modified_since)
+        except (TypeError, ValueError):
+            fresh = False
+    else:
+        fresh = False
+    if fresh:
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=dict(headers))
+    return None
+
+
+class CacheControlMiddleware:
+    """Adds Cache-Control to successful GET/HEAD responses that don't set one.
+
+    The policy is looked up by route path template (e.g. "/products/{product_id}")
+    in `policies`, falling back to `default`.
+    """
+
+    def __init__(self, app: ASGIApp, policies: Mapping[str, str], default: Optional[str] = None):
+        self.app = app
+        self.policies = dict(policies)
+        self.default = default
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or scope["method"] not in ("GET", "HEAD"):
+            await self.app(scope, receive, send)
+            return
+
+        async def send_with_policy(message: Message) -> None:
+            if message["type"] == "http.response.start" and message["status"] in (200, 304):
+                headers = MutableHeaders(scope=message)
+                if "cache-control" not in headers:
+                    # The router stores the matched route in the shared scope
+                    route = scope.get("route")
+                    policy = self.policies.get(getattr(route, "path", None), self.default)
+                    if policy:
+                        headers["Cache-Control"] = policy
+            await send(message)
+
+        await self.app(scope, receive, send_with_policy)
@@ -0,0 +1,179 @@
+import re
+import unicodedata
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import sqlalchemy as sa
+from sqlalchemy.orm import Session
+
+from core.enums import InciMatch
+from db import Ingredient
+from db.config import config
+from .cache import DerivedIndex
+
+# Группы равнозначных названий: если в справочнике есть одно из них, остальные
+# сопоставляются с тем же ингредиентом
+SYNONYM_GROUPS: Tuple[Tuple[str, ...], ...] = (
+    ("aqua", "water", "eau"),
+    ("parfum", "fragrance", "perfume"),
+    ("tocopherol", "vitamin e"),
+    ("ascorbic acid", "vitamin c"),
+    ("niacinamide", "nicotinamide", "vitamin b3"),
+    ("panthenol", "d-panthenol", "dexpanthenol", "provitamin b5"),
+    ("glycerin", "glycerine", "glycerol"),
+    ("butyrospermum parkii butter", "shea butter"),
+    ("aloe barbadensis leaf juice", "aloe vera"),
+    ("titanium dioxide", "ci 77891"),
+    ("zinc oxide", "ci 77947"),
+)
+
+_NON_WORD = re.compile(r"[^0-9a-z]+")
+# Разделители элементов списка; запятая между цифрами (1,2-Hexanediol) — часть названия
+_SEPARATOR = re.compile(r"(?<!\d),|,(?!\d)|;|•|·")
+_PREFIX = re.compile(r"^\s*(ingredients|inci|composition|состав)\s*:\s*", re.I)
+_MAY_CONTAIN = re.compile(r"\[?\s*(\+/-|may contain|peut contenir)\s*:?\s*", re.I)
+# «Aqua (Water)»: название и альтернативное название в скобках в конце.
+# «/» не разбивается: это часть настоящих названий (Caprylic/Capric Triglyceride)
+_PARENTHETICAL = re.compile(r"^([^()]+?)\s*\(([^()]+)\)\s*$")
+
+
+def normalize(name: str) -> str:
+    """Ключ сравнения: без диакритики и регистра, пунктуация и пробелы схлопнуты в один пробел."""
+    name = unicodedata.normalize("NFKD", name)
+    name = "".join(char for char in name if not unicodedata.combining(char))
+    return _NON_WORD.sub(" ", name.casefold()).strip()
+
+
+def split_inci(text: str) -> List[str]:
+    """Элементы списка INCI по разделителям вне скобок."""
+    text = _MAY_CONTAIN.sub(", ", _PREFIX.sub("", text))
+    items, depth, start = [], 0, 0
+    for match in re.finditer(r"[()\[\]]|" + _SEPARATOR.pattern, text):
+        token = match.group()
+        if token in "([":
+            depth += 1
+        elif token in ")]":
+            depth = max(depth - 1, 0)
+        elif depth == 0:
+            items.append(text[start:match.start()])
+            start = match.end()
+    items.append(text[start:])
+    return [item.strip(" \t\r\n.*[]") for item in items if normalize(item)]
+
+
+class _Automaton:
+    """Aho–Corasick по нормализованным названиям: все вхождения ключей в строку за один проход."""
+
+    def __init__(self, keys: Sequence[str]):
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        # Ключи, оканчивающиеся в узле, включая унаследованные по fail-ссылкам
+        self._out: List[List[str]] = [[]]
+        for key in keys:
+            node = 0
+            for char in key:
+                nxt = self._goto[node].get(char)
+                if nxt is None:
+                    nxt = len(self._goto)
+                    self._goto[node][char] = nxt
+                    self._goto.append({})
+                    self._fail.append(0)
+                    self._out.append([])
+                node = nxt
+            self._out[node].append(key)
+
+        queue = list(self._goto[0].values())
+        for node in queue:
+            for char, child in self._goto[node].items():
+                fail = self._fail[node]
+                while fail and char not in self._goto[fail]:
+                    fail = self._fail[fail]
+                self._fail[child] = self._goto[fail].get(char, 0)
+                self._out[child] = self._out[child] + self._out[self._fail[child]]
+                queue.append(child)
+
+    def find(self, text: str) -> List[Tuple[int, str]]:
+        """(начало, ключ) для вхождений, которые стоят на границах слов."""
+        found, node = [], 0
+        for end, char in enumerate(text, 1):
+            while node and char not in self._goto[node]:
+                node = self._fail[node]
+            node = self._goto[node].get(char, 0)
+            for key in self._out[node]:
+                start = end - len(key)
+                if (start == 0 or text[start - 1] == " ") and (end == len(text) or text[end] == " "):
+                    found.append((start, key))
+        return found
+
+
+@dataclass(frozen=True)
+class InciMatcher:
+    # Нормализованное название -> (id ингредиента, способ сопоставления)
+    keys: Dict[str, Tuple[int, InciMatch]]
+    names: Dict[int, str]
+    automaton: _Automaton
+
+    def match(self, item: str) -> Tuple[Optional[int], Optional[InciMatch]]:
+        key = normalize(item)
+        if key in self.keys:
+            return self.keys[key]
+        # Название внутри лишнего текста («Aqua (Water) *organic»): самое длинное вхождение
+        found = self.automaton.find(key)
+        if not found:
+            return None, None
+        _, best = min(found, key=lambda hit: (-len(hit[1]), hit[0]))
+        return self.keys[best][0], InciMatch.partial
+
+    def parse(self, text: str) -> dict:
+        """Точные совпадения и синонимы попадают в ingredient_ids; вхождения внутри
+        лишнего текста — только в needs_review: «Sodium Hyaluronate Crosspolymer»
+        содержит «Sodium Hyaluronate», но это другой ингредиент."""
+        items, ingredient_ids, needs_review, unmatched = [], [], [], []
+        for raw in split_inci(text):
+            ingredient_id, matched_by = self.match(raw)
+            items.append({
+                "raw": raw,
+                "ingredient_id": ingredient_id,
+                "ingredient_name": self.names.get(ingredient_id),
+                "matched_by": matched_by,
+            })
+            if ingredient_id is None:
+                unmatched.append(raw)
+            elif matched_by is InciMatch.partial:
+                needs_review.append(raw)
+            elif ingredient_id not in ingredient_ids:
+                ingredient_ids.append(ingredient_id)
+        return {
+            "ingredient_ids": ingredient_ids,
+            "items": items,
+            "needs_review": needs_review,
+            "unmatched": unmatched,
+        }
+
+
+def build_matcher(ingredients: Sequence[Tuple[int, str]]) -> InciMatcher:
+    """Ключи по приоритету: точные названия, обе части названий вида «Aqua (Water)»,
+    затем группы синонимов. При совпадении ключа побеждает меньший id."""
+    keys: Dict[str, Tuple[int, InciMatch]] = {}
+    ingredients = sorted(ingredients)
+    for ingredient_id, name in ingredients:
+        keys.setdefault(normalize(name), (ingredient_id, InciMatch.exact))
+    for ingredient_id, name in ingredients:
+        parenthetical = _PARENTHETICAL.match(name)
+        for part in parenthetical.groups() if parenthetical else ():
+            if normalize(part):
+                keys.setdefault(normalize(part), (ingredient_id, InciMatch.synonym))
+    for group in SYNONYM_GROUPS:
+        known = [keys[normalize(name)] for name in group if normalize(name) in keys]
+        if known:
+            for name in group:
+                keys.setdefault(normalize(name), (known[0][0], InciMatch.synonym))
+    return InciMatcher(keys=keys, names=dict(ingredients), automaton=_Automaton(list(keys)))
+
+
+def _build_from_db(s: Session) -> InciMatcher:
+    return build_matcher(s.execute(sa.select(Ingredient.id, Ingredient.name)).all())
+
+
+# Пересобирается после изменения ингредиентов; TTL — для изменений в других процессах
+inci_matcher = DerivedIndex(ttl=config.REFERENCE_CACHE_TTL, build=_build_from_db)
@@ -0,0 +1,117 @@
+import time
+
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from core.metrics import CounterFamily, HistogramFamily, render_gauge, render_histogram, render_text
+from db import query_stats
+from db.pool import pool_metrics
+from db.query_stats import track_queries
+
+# Label value for requests that matched no route, so 404 scans don't add series
+UNMATCHED_ROUTE = "<unmatched>"
+
+STATEMENT_BUCKETS = (0, 1, 2, 3, 5, 8, 13, 21, 34, 55, 100)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304, 16777216)
+
+_ROUTE_LABELS = ("method", "route")
+
+requests_total = CounterFamily(
+    "http_requests_total", "HTTP requests by route template and status.", _ROUTE_LABELS + ("status",)
+)
+request_seconds = HistogramFamily(
+    "http_request_duration_seconds", "Time from request start to the last body chunk sent.", _ROUTE_LABELS
+)
+request_statements = HistogramFamily(
+    "http_request_db_statements", "SQL statements executed per request.", _ROUTE_LABELS, STATEMENT_BUCKETS
+)
+request_db_seconds = HistogramFamily(
+    "http_request_db_seconds", "Total time spent in SQL statements per request.", _ROUTE_LABELS
+)
+request_pool_wait_seconds = HistogramFamily(
+    "http_request_pool_wait_seconds", "Time spent checking out pool connections per request.", _ROUTE_LABELS
+)
+response_bytes = HistogramFamily(
+    "http_response_size_bytes", "Response body size.", _ROUTE_LABELS, SIZE_BUCKETS
+)
+
+_FAMILIES = (
+    requests_total,
+    request_seconds,
+    request_statements,
+    request_db_seconds,
+    request_pool_wait_seconds,
+    response_bytes,
+)
+
+
+class RequestMetricsMiddleware:
+    """Records latency, SQL load, pool wait and response size of every HTTP request.
+
+    Series are labelled by route path template (e.g. "/products/{product_id}"),
+    which the router stores in the shared scope, so IDs don't multiply them.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        started = time.perf_counter()
+        status_code = 500
+        size = 0
+
+        async def send_measured(message: Message) -> None:
+            nonlocal status_code, size
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            elif message["type"] == "http.response.body":
+                size += len(message.get("body", b""))
+            await send(message)
+
+        with track_queries(scope) as stats:
+            try:
+                await self.app(scope, receive, send_measured)
+            finally:
+                route = getattr(scope.get("route"), "path", UNMATCHED_ROUTE)
+                labels = (scope["method"], route)
+                requests_total.labels(*labels, str(status_code)).inc()
+                request_seconds.labels(*labels).observe(time.perf_counter() - started)
+                request_statements.labels(*labels).observe(stats.statements)
+                request_db_seconds.labels(*labels).observe(stats.db_seconds)
+                request_pool_wait_seconds.labels(*labels).observe(stats.pool_wait_seconds)
+                response_bytes.labels(*labels).observe(size)
+
+
+def render_metrics() -> str:
+    """All metrics of this worker process in the Prometheus text format."""
+    pool = pool_metrics.snapshot()
+    sections = [family.render() for family in _FAMILIES]
+    sections += [
+        [
+            "# HELP db_statements_total SQL statements executed, including background tasks.",
+            "# TYPE db_statements_total counter",
+            f"db_statements_total {int(query_stats.statements_total.value)}",
+        ],
+        [
+            "# HELP db_statement_duration_seconds Duration of single SQL statements.",
+            "# TYPE db_statement_duration_seconds histogram",
+            *render_histogram("db_statement_duration_seconds", query_stats.statement_seconds),
+        ],
+        [
+            "# HELP db_pool_checkout_seconds Connection checkout time, including queue wait.",
+            "# TYPE db_pool_checkout_seconds histogram",
+            *render_histogram("db_pool_checkout_seconds", pool_metrics.checkout_seconds),
+        ],
+        [
+            "# HELP db_pool_timeouts_total Checkouts that hit DB_POOL_TIMEOUT.",
+            "# TYPE db_pool_timeouts_total counter",
+            f"db_pool_timeouts_total {pool['timeouts']}",
+        ],
+        render_gauge("db_pool_size", "Configured pool size.", pool["size"]),
+        render_gauge("db_pool_checked_out", "Connections currently in use.", pool["checked_out"]),
+        render_gauge("db_pool_overflow", "Current overflow connections (negative while below pool size).", pool["overflow"]),
+    ]
+    return render_text(sections)
@@ -0,0 +1,54 @@
+import base64
+import json
+import math
+from typing import Any, List, Tuple, Union
+
+from fastapi import HTTPException, status
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+# Keys are compared with integer (int4) columns in SQL
+_INT_MIN, _INT_MAX = -2**31, 2**31 - 1
+
+
+def encode_cursor(*values: Any) -> str:
+    """Pack the sort key of the last returned row into an opaque cursor."""
+    raw = json.dumps(list(values), separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def _is_int(value: Any, low: int = _INT_MIN) -> bool:
+    # bool is a subclass of int, but JSON true/false is never a valid key
+    return isinstance(value, int) and not isinstance(value, bool) and low <= value <= _INT_MAX
+
+
+def _is_sort_key(value: Any) -> bool:
+    return _is_int(value) or (isinstance(value, float) and math.isfinite(value))
+
+
+def decode_cursor(cursor: str, size: Union[int, Tuple[int, ...]] = 1) -> List[Any]:
+    """Unpack a cursor produced by encode_cursor, expecting `size` key values
+    (or any of several sizes, when the cursor itself tells the ordering).
+
+    The last value is a product ID; the ones before it are numeric sort keys.
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+    except (ValueError, UnicodeDecodeError):
+        values = None
+
+    if (
+        not isinstance(values, list)
+        or len(values) not in (size if isinstance(size, tuple) else (size,))
+        or not _is_int(values[-1], low=0)
+        or not all(_is_sort_key(value) for value in values[:-1])
+    ):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid cursor"
+        )
+    return values
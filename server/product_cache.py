@@ -0,0 +1,190 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Iterable, List, Optional, Protocol, Sequence, Tuple
+
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+
+from db.config import config
+from db.read_model import on_listing_change
+from .cache import on_commit
+
+
+class CacheBackend(Protocol):
+    """Хранилище байтов с TTL. blocking — вызовы сетевые и из event loop уходят в пул потоков."""
+
+    blocking: bool
+
+    def get_many(self, keys: Sequence[str]) -> List[Optional[bytes]]: ...
+
+    def set_many(self, items: Dict[str, bytes], ttl: float) -> None: ...
+
+    def incr(self, keys: Sequence[str], ttl: float) -> None:
+        """Увеличивает счётчики на 1 и продлевает им жизнь до ttl."""
+
+
+class MemoryBackend:
+    """LRU в памяти процесса. Счётчики хранятся отдельно и не вытесняются записями.
+
+    Инвалидация видна только этому процессу: другие воркеры узнают об изменении
+    лишь по истечении TTL, поэтому с этим бэкендом TTL короткий.
+    """
+
+    blocking = False
+
+    def __init__(self, maxsize: int):
+        self._maxsize = maxsize
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[str, Tuple[bytes, float]]" = OrderedDict()
+        self._counters: Dict[str, Tuple[int, float]] = {}
+
+    def get_many(self, keys: Sequence[str]) -> List[Optional[bytes]]:
+        now = time.monotonic()
+        values = []
+        with self._lock:
+            for key in keys:
+                if key in self._counters:
+                    value, expires_at = self._counters[key]
+                    values.append(str(value).encode() if expires_at > now else None)
+                    continue
+                entry = self._entries.get(key)
+                if entry is None or entry[1] <= now:
+                    values.append(None)
+                    continue
+                self._entries.move_to_end(key)
+                values.append(entry[0])
+        return values
+
+    def set_many(self, items: Dict[str, bytes], ttl: float) -> None:
+        expires_at = time.monotonic() + ttl
+        with self._lock:
+            for key, value in items.items():
+                self._entries[key] = (value, expires_at)
+                self._entries.move_to_end(key)
+            while len(self._entries) > self._maxsize:
+                self._entries.popitem(last=False)
+
+    def incr(self, keys: Sequence[str], ttl: float) -> None:
+        now = time.monotonic()
+        with self._lock:
+            for key in keys:
+                value, expires_at = self._counters.get(key, (0, now))
+                self._counters[key] = ((value if expires_at > now else 0) + 1, now + ttl)
+            if len(self._counters) > self._maxsize:
+                self._counters = {key: item for key, item in self._counters.items() if item[1] > now}
+
+
+class RedisBackend:
+    """Redis или совместимый сервер; client — redis.Redis или его подмена с тем же API."""
+
+    blocking = True
+
+    def __init__(self, client):
+        self._client = client
+
+    @classmethod
+    def from_url(cls, url: str) -> "RedisBackend":
+        try:
+            import redis
+        except ImportError as exc:
+            raise RuntimeError("PRODUCT_CACHE_REDIS_URL is set, but the redis package is not installed") from exc
+        return cls(redis.Redis.from_url(url))
+
+    def get_many(self, keys: Sequence[str]) -> List[Optional[bytes]]:
+        return self._client.mget(keys)
+
+    def set_many(self, items: Dict[str, bytes], ttl: float) -> None:
+        pipe = self._client.pipeline(transaction=False)
+        for key, value in items.items():
+            pipe.set(key, value, px=int(ttl * 1000))
+        pipe.execute()
+
+    def incr(self, keys: Sequence[str], ttl: float) -> None:
+        pipe = self._client.pipeline(transaction=False)
+        for key in keys:
+            pipe.incr(key)
+            pipe.pexpire(key, int(ttl * 1000))
+        pipe.execute()
+
+
+class ProductDetailCache:
+    """Сериализованные карточки товаров (ProductDetailed) по id.
+
+    У каждого товара есть счётчик версий; запись хранит версию, прочитанную до
+    загрузки из БД. Инвалидация после коммита увеличивает счётчик, и запись,
+    собранная из данных до коммита, больше не совпадает по версии — даже если
+    её сохранили уже после инвалидации. Проверка версии и чтение записи — один
+    get_many (MGET). Счётчик живёт дольше записей, чтобы его истечение не
+    вернуло к жизни устаревшую запись.
+
+    Точна инвалидация только в пределах хранилища: с RedisBackend — для всех
+    воркеров, с MemoryBackend — для процесса, выполнившего запись.
+    """
+
+    def __init__(self, backend: CacheBackend, ttl: float, prefix: str = "product"):
+        self._backend = backend
+        self._ttl = ttl
+        self._prefix = prefix
+
+    def _keys(self, product_id: int) -> Tuple[str, str]:
+        return f"{self._prefix}:{product_id}:version", f"{self._prefix}:{product_id}"
+
+    def get_many(self, product_ids: Sequence[int]) -> Dict[int, Tuple[Optional[bytes], int]]:
+        """product_id -> (payload или None, текущая версия — её нужно передать в set_many)."""
+        values = self._backend.get_many([key for product_id in product_ids for key in self._keys(product_id)])
+        found = {}
+        for product_id, version, entry in zip(product_ids, values[::2], values[1::2]):
+            version = int(version or 0)
+            payload = None
+            if entry is not None:
+                stored, _, cached = entry.partition(b":")
+                if int(stored) == version:
+                    payload = cached
+            found[product_id] = (payload, version)
+        return found
+
+    def set_many(self, entries: Dict[int, Tuple[bytes, int]]) -> None:
+        """product_id -> (payload, версия из get_many)."""
+        if entries:
+            items = {
+                self._keys(product_id)[1]: b"%d:%b" % (version, payload)
+                for product_id, (payload, version) in entries.items()
+            }
+            self._backend.set_many(items, self._ttl)
+
+    async def lookup(self, product_ids: Sequence[int]) -> Dict[int, Tuple[Optional[bytes], int]]:
+        if self._backend.blocking:
+            return await run_in_threadpool(self.get_many, product_ids)
+        return self.get_many(product_ids)
+
+    async def store(self, entries: Dict[int, Tuple[bytes, int]]) -> None:
+        if self._backend.blocking:
+            await run_in_threadpool(self.set_many, entries)
+        else:
+            self.set_many(entries)
+
+    def invalidate(self, product_ids: Iterable[int]) -> None:
+        keys = [self._keys(product_id)[0] for product_id in product_ids]
+        if keys:
+            self._backend.incr(keys, 2 * self._ttl)
+
+    def invalidate_on_commit(self, db_session: Session, product_ids: Iterable[int]) -> None:
+        product_ids = list(product_ids)
+        on_commit(db_session, lambda: self.invalidate(product_ids))
+
+
+def _make_cache() -> ProductDetailCache:
+    if config.PRODUCT_CACHE_REDIS_URL:
+        return ProductDetailCache(RedisBackend.from_url(config.PRODUCT_CACHE_REDIS_URL), ttl=config.PRODUCT_CACHE_TTL)
+    # Другие воркеры не видят инвалидацию, поэтому запись живёт недолго
+    return ProductDetailCache(MemoryBackend(maxsize=config.PRODUCT_CACHE_SIZE), ttl=config.PRODUCT_CACHE_LOCAL_TTL)
+
+
+product_detail_cache = _make_cache()
+
+
+@on_listing_change
+def _invalidate_changed(db_session: Session, product_ids: List[int]) -> None:
+    # Изменения товара, его бренда, категории и ингредиентов проходят через product_listing
+    product_detail_cache.invalidate_on_commit(db_session, product_ids)
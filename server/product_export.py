@@ -0,0 +1,58 @@
+import csv
+import io
+import json
+from typing import AsyncIterator, Sequence
+
+import sqlalchemy as sa
+from sqlalchemy import Row
+
+from db import Product
+from db.product_filters import ProductFilters, product_rows_select
+
+BATCH_SIZE = 1000
+
+CSV_COLUMNS = [
+    "Id", "Name", "Description", "HowToUse", "ImageUrl", "VolumeMl",
+    "BrandId", "BrandName", "CategoryId", "CategoryName",
+]
+
+
+def export_query(filters: ProductFilters) -> sa.Select:
+    return product_rows_select(filters).order_by(Product.id)
+
+
+def _ndjson_line(row: Row) -> str:
+    # Та же форма, что у ProductShort в ответе /products/all
+    return json.dumps({
+        "Name": row.name,
+        "Description": row.description,
+        "HowToUse": row.how_to_use,
+        "ImageUrl": row.image_url,
+        "VolumeMl": row.volume_ml,
+        "BrandId": row.brand_id,
+        "CategoryId": row.category_id,
+        "Id": row.id,
+        "Brand": {"Id": row.brand_id, "Name": row.brand_name} if row.brand_id is not None else None,
+        "Category": {"Id": row.category_id, "Name": row.category_name} if row.category_id is not None else None,
+    }, ensure_ascii=False) + "\n"
+
+
+async def ndjson_chunks(partitions: AsyncIterator[Sequence[Row]]) -> AsyncIterator[str]:
+    async for rows in partitions:
+        yield "".join(_ndjson_line(row) for row in rows)
+
+
+async def csv_chunks(partitions: AsyncIterator[Sequence[Row]]) -> AsyncIterator[str]:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(CSV_COLUMNS)
+    yield buffer.getvalue()
+    async for rows in partitions:
+        buffer.seek(0)
+        buffer.truncate()
+        writer.writerows(
+            (row.id, row.name, row.description, row.how_to_use, row.image_url, row.volume_ml,
+             row.brand_id, row.brand_name, row.category_id, row.category_name)
+            for row in rows
+        )
+        yield buffer.getvalue()
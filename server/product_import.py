@@ -0,0 +1,245 @@
+import csv
+from typing import AsyncIterator, Dict, List, Optional, Set, Tuple, Union
+
+import sqlalchemy as sa
+from pydantic import ValidationError
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.orm import Session
+
+from db import Product
+from db.read_model import refresh_product_read_models
+from .cache import facet_cache
+from .product_writes import (
+    CONCENTRATIONS_FIELD,
+    FK_FIELDS,
+    LINK_FIELDS,
+    M2M_FIELDS,
+    REFERENCE_MODELS,
+    existing_reference_ids,
+)
+from .schemas.common import to_pascal
+from .schemas.product import BulkImportError, ProductCreate
+
+BATCH_SIZE = 1000
+# Ошибок в ответе не больше этого числа; failed считает все
+MAX_REPORTED_ERRORS = 1000
+
+NDJSON_MEDIA_TYPES = {"application/x-ndjson", "application/jsonl", "application/json-lines"}
+
+# Строка входного файла: (номер строки, товар или текст ошибки разбора)
+ParsedRow = Tuple[int, Union[ProductCreate, str]]
+
+# Колонки CSV со списками id (в snake_case или PascalCase, как и поля JSON)
+_CSV_LIST_COLUMNS = set(M2M_FIELDS) | {to_pascal(field) for field in M2M_FIELDS}
+# Концентрации в ячейке CSV: пары «id:процент» через ';', например "12:2.5;40:0.1"
+_CSV_CONCENTRATION_COLUMNS = {CONCENTRATIONS_FIELD, to_pascal(CONCENTRATIONS_FIELD)}
+
+_PRODUCT_FIELDS = set(ProductCreate.model_fields) - LINK_FIELDS
+_STRING_LIMITS = {
+    column.name: column.type.length
+    for column in Product.__table__.columns
+    if isinstance(column.type, sa.String) and column.type.length
+}
+
+
+def _validation_message(exc: ValidationError) -> str:
+    messages = []
+    for error in exc.errors():
+        location = ".".join(str(part) for part in error["loc"])
+        messages.append(f"{location}: {error['msg']}" if location else error["msg"])
+    return "; ".join(messages)
+
+
+def _decode(line_no: int, raw: bytes) -> Tuple[int, Optional[str], Optional[str]]:
+    try:
+        return line_no, raw.decode("utf-8").rstrip("\r"), None
+    except UnicodeDecodeError as exc:
+        return line_no, None, f"invalid UTF-8 at byte {exc.start}"
+
+
+async def _lines(stream: AsyncIterator[bytes]) -> AsyncIterator[Tuple[int, Optional[str], Optional[str]]]:
+    """Разбивает поток байтов на строки, не загружая тело запроса целиком.
+
+    Выдаёт (номер строки, текст, ошибка): строка, не являющаяся корректным
+    UTF-8, приходит без текста и с ошибкой, а не с подставленными U+FFFD.
+    Байт '\n' не встречается внутри многобайтовых символов UTF-8, поэтому
+    делить можно до декодирования.
+    """
+    pending, line_no = b"", 0
+    async for chunk in stream:
+        pending += chunk
+        *lines, pending = pending.split(b"\n")
+        for raw in lines:
+            line_no += 1
+            yield _decode(line_no, raw)
+    if pending:
+        yield _decode(line_no + 1, pending)
+
+
+async def parse_ndjson(stream: AsyncIterator[bytes]) -> AsyncIterator[ParsedRow]:
+    async for line_no, line, problem in _lines(stream):
+        if problem:
+            yield line_no, problem
+            continue
+        if not line.strip():
+            continue
+        try:
+            yield line_no, ProductCreate.model_validate_json(line)
+        except ValidationError as exc:
+            yield line_no, _validation_message(exc)
+
+
+def _csv_record(header: List[str], values: List[str]) -> Dict[str, object]:
+    record: Dict[str, object] = {}
+    for column, value in zip(header, values):
+        value = value.strip()
+        if not value:
+            continue
+        # Списки id в ячейке CSV разделяются ';'
+        if column in _CSV_LIST_COLUMNS:
+            record[column] = [part.strip() for part in value.split(";") if part.strip()]
+        elif column in _CSV_CONCENTRATION_COLUMNS:
+            pairs = (part.partition(":") for part in value.split(";") if part.strip())
+            record[column] = {key.strip(): amount.strip() or None for key, _, amount in pairs}
+        else:
+            record[column] = value
+    return record
+
+
+async def parse_csv(stream: AsyncIterator[bytes]) -> AsyncIterator[ParsedRow]:
+    header: Optional[List[str]] = None
+    record_text, record_line = "", 0
+    async for line_no, line, problem in _lines(stream):
+        if problem:
+            # Запись с такой строкой отбрасывается целиком
+            yield (record_line if record_text else line_no), problem
+            record_text = ""
+            continue
+        if not record_text:
+            record_line = line_no
+            record_text = line
+        else:
+            record_text += "\n" + line
+        # Поле в кавычках может содержать перевод строки: ждём закрывающую кавычку
+        if record_text.count('"') % 2:
+            continue
+
+        text, record_text = record_text, ""
+        if not text.strip():
+            continue
+        values = next(csv.reader([text]))
+        if header is None:
+            header = [column.strip() for column in values]
+            continue
+        if len(values) != len(header):
+            yield record_line, f"expected {len(header)} columns, got {len(values)}"
+            continue
+        try:
+            yield record_line, ProductCreate.model_validate(_csv_record(header, values))
+        except ValidationError as exc:
+            yield record_line, _validation_message(exc)
+
+    if record_text:
+        yield record_line, "unterminated quoted field"
+
+
+async def batches(rows: AsyncIterator[ParsedRow], size: int = BATCH_SIZE) -> AsyncIterator[List[ParsedRow]]:
+    batch: List[ParsedRow] = []
+    async for row in rows:
+        batch.append(row)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def _row_problem(product: ProductCreate, existing: Dict[str, Set[int]]) -> Optional[str]:
+    for field, length in _STRING_LIMITS.items():
+        value = getattr(product, field, None)
+        if value is not None and len(value) > length:
+            return f"{field}: longer than {length} characters"
+    for field in FK_FIELDS:
+        value = getattr(product, field)
+        if value is not None and value not in existing[field]:
+            return f"{field}: {value} not found"
+    for field in M2M_FIELDS:
+        missing = set(getattr(product, field) or ()) - existing[field]
+        if missing:
+            return f"{field}: {sorted(missing)} not found"
+    unlinked = set(product.ingredient_concentrations or ()) - set(product.ingredient_ids or ())
+    if unlinked:
+        return f"{CONCENTRATIONS_FIELD}: {sorted(unlinked)} not in ingredient_ids"
+    return None
+
+
+def _insert_products(s: Session, products: List[ProductCreate]) -> List[int]:
+    """Многострочный INSERT ... RETURNING товаров и их связей; возвращает id в порядке входа."""
+    table = Product.__table__
+    ids = list(s.scalars(
+        sa.insert(table).returning(table.c.id, sort_by_parameter_order=True),
+        [product.model_dump(include=_PRODUCT_FIELDS) for product in products],
+    ))
+    for field, (_, assoc_table, column) in M2M_FIELDS.items():
+        links = [
+            {"product_id": product_id, column: obj_id}
+            for product_id, product in zip(ids, products)
+            for obj_id in set(getattr(product, field) or ())
+        ]
+        if field == "ingredient_ids":
+            concentrations = dict(zip(ids, (product.ingredient_concentrations or {} for product in products)))
+            for link in links:
+                link["concentration"] = concentrations[link["product_id"]].get(link[column])
+        if links:
+            s.execute(sa.insert(assoc_table), links)
+    return ids
+
+
+def import_batch(s: Session, batch: List[ParsedRow]) -> Tuple[List[int], List[BulkImportError]]:
+    """Записывает пачку строк; ошибочные строки пропускаются и попадают в отчёт."""
+    errors: List[BulkImportError] = []
+    valid: List[Tuple[int, ProductCreate]] = []
+    for line_no, row in batch:
+        if isinstance(row, str):
+            errors.append(BulkImportError(line=line_no, error=row))
+        else:
+            valid.append((line_no, row))
+
+    # Все ссылки пачки проверяются одним запросом
+    referenced: Dict[str, Set[int]] = {field: set() for field in REFERENCE_MODELS}
+    for _, product in valid:
+        for field in FK_FIELDS:
+            if getattr(product, field) is not None:
+                referenced[field].add(getattr(product, field))
+        for field in M2M_FIELDS:
+            referenced[field].update(getattr(product, field) or ())
+    existing = existing_reference_ids(s, referenced)
+
+    accepted: List[Tuple[int, ProductCreate]] = []
+    for line_no, product in valid:
+        problem = _row_problem(product, existing)
+        if problem:
+            errors.append(BulkImportError(line=line_no, error=problem))
+        else:
+            accepted.append((line_no, product))
+
+    ids: List[int] = []
+    if accepted:
+        try:
+            with s.begin_nested():
+                ids = _insert_products(s, [product for _, product in accepted])
+        except DBAPIError:
+            # Пачка не прошла целиком — изолируем виновные строки по одной
+            for line_no, product in accepted:
+                try:
+                    with s.begin_nested():
+                        ids.extend(_insert_products(s, [product]))
+                except DBAPIError as exc:
+                    errors.append(BulkImportError(line=line_no, error=str(exc.orig).strip()))
+
+    if ids:
+        refresh_product_read_models(s, product_ids=ids)
+        facet_cache.clear_on_commit(s)
+
+    errors.sort(key=lambda error: error.line)
+    return ids, errors
@@ -0,0 +1,116 @@
+from decimal import Decimal
+from typing import Dict, Iterable, List, Optional, Set
+
+import sqlalchemy as sa
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.orm import Session
+
+from db import Brand, Category, Concern, Ingredient, Product, SkinType, Tag
+from db.models import product_concerns, product_ingredients, product_skin_types, product_tags
+
+# Поле схемы -> (справочник, таблица связей, колонка id значения)
+M2M_FIELDS = {
+    "ingredient_ids": (Ingredient, product_ingredients, "ingredient_id"),
+    "skin_type_ids": (SkinType, product_skin_types, "skin_type_id"),
+    "concern_ids": (Concern, product_concerns, "concern_id"),
+    "tag_ids": (Tag, product_tags, "tag_id"),
+}
+FK_FIELDS = {"brand_id": Brand, "category_id": Category}
+# Концентрации пишутся в product_ingredients.concentration уже существующих связей
+CONCENTRATIONS_FIELD = "ingredient_concentrations"
+# Поля схем товара, которые не являются колонками products
+LINK_FIELDS = set(M2M_FIELDS) | {CONCENTRATIONS_FIELD}
+REFERENCE_MODELS = {**FK_FIELDS, **{field: model for field, (model, _, _) in M2M_FIELDS.items()}}
+# existing_reference_ids проверяет и сам изменяемый товар — по ключу "id"
+_CHECKED_MODELS = {**REFERENCE_MODELS, "id": Product}
+
+# Колонки ProductShort в RETURNING: названия бренда и категории — коррелированными подзапросами
+RETURNING_COLUMNS = (
+    Product.id,
+    Product.name,
+    Product.description,
+    Product.how_to_use,
+    Product.image_url,
+    Product.volume_ml,
+    Product.brand_id,
+    sa.select(Brand.name).where(Brand.id == Product.brand_id).scalar_subquery().label("brand_name"),
+    Product.category_id,
+    sa.select(Category.name).where(Category.id == Product.category_id).scalar_subquery().label("category_name"),
+)
+
+
+def existing_reference_ids(s: Session, referenced: Dict[str, Set[int]]) -> Dict[str, Set[int]]:
+    """Какие из упомянутых id справочников (и товаров, ключ "id") существуют — одним запросом (UNION ALL)."""
+    existing: Dict[str, Set[int]] = {field: set() for field in referenced}
+    selects = [
+        sa.select(sa.literal(field).label("field"), _CHECKED_MODELS[field].id.label("id"))
+        .where(_CHECKED_MODELS[field].id.in_(ids))
+        for field, ids in referenced.items()
+        if ids
+    ]
+    if selects:
+        for field, obj_id in s.execute(sa.union_all(*selects)):
+            existing[field].add(obj_id)
+    return existing
+
+
+def replace_links(s: Session, product_id: int, field: str, ids: Iterable[int]) -> None:
+    """Приводит связи товара к ids: удаляет лишние и добавляет недостающие, не читая старый список."""
+    _, table, column = M2M_FIELDS[field]
+    ids = sorted(set(ids))
+    s.execute(
+        sa.delete(table).where(table.c.product_id == product_id, table.c[column].not_in(ids))
+    )
+    add_links(s, product_id, field, ids)
+
+
+def add_links(s: Session, product_id: int, field: str, ids: Iterable[int]) -> None:
+    """INSERT ... ON CONFLICT DO NOTHING: уже существующие связи не трогаются."""
+    _, table, column = M2M_FIELDS[field]
+    rows = [{"product_id": product_id, column: obj_id} for obj_id in sorted(set(ids))]
+    if rows:
+        s.execute(pg_insert(table).values(rows).on_conflict_do_nothing())
+
+
+def remove_links(s: Session, product_id: int, field: str, ids: Iterable[int]) -> None:
+    _, table, column = M2M_FIELDS[field]
+    ids = sorted(set(ids))
+    if ids:
+        s.execute(sa.delete(table).where(table.c.product_id == product_id, table.c[column].in_(ids)))
+
+
+def set_concentrations(s: Session, product_id: int, concentrations: Dict[int, Optional[Decimal]]) -> List[int]:
+    """Записывает концентрации ингредиентов товара.
+
+    Возвращает id ингредиентов, которых нет в составе товара; в этом случае
+    ничего не записывается.
+    """
+    if not concentrations:
+        return []
+    table = product_ingredients
+    linked = set(s.scalars(
+        sa.select(table.c.ingredient_id)
+        .where(table.c.product_id == product_id, table.c.ingredient_id.in_(list(concentrations)))
+    ))
+    missing = sorted(set(concentrations) - linked)
+    if missing:
+        return missing
+    s.execute(
+        sa.update(table)
+        .where(table.c.product_id == sa.bindparam("b_product_id"), table.c.ingredient_id == sa.bindparam("b_ingredient_id"))
+        .values(concentration=sa.bindparam("b_concentration")),
+        [
+            {"b_product_id": product_id, "b_ingredient_id": ingredient_id, "b_concentration": value}
+            for ingredient_id, value in sorted(concentrations.items())
+        ],
+    )
+    return []
+
+
+def update_product_row(s: Session, product_id: int, values: Dict) -> Optional[sa.Row]:
+    """UPDATE ... RETURNING колонок ProductShort; None, если товара нет."""
+    if values:
+        table = Product.__table__
+        stmt = sa.update(table).where(table.c.id == product_id).values(**values)
+        return s.execute(stmt.returning(*RETURNING_COLUMNS)).one_or_none()
+    return s.execute(sa.select(*RETURNING_COLUMNS).where(Product.id == product_id)).one_or_none()
@@ -0,0 +1,274 @@
+import asyncio
+import logging
+import threading
+import time
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional, Sequence, Set, Tuple
+
+import numpy as np
+import sqlalchemy as sa
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+
+from core.enums import SafetyLevel
+from db.config import config
+from db.models import ProductListing
+from db.read_model import on_listing_change
+from db.risk import SAFETY_LEVEL_RANK
+from db.session import run_in_session
+from .cache import on_commit
+
+# Веса слагаемых оценки
+SKIN_TYPE_WEIGHT = 2.0
+CONCERN_WEIGHT = 3.0
+SAFETY_WEIGHT = 0.5
+
+# Ранг безопасности товара без ингредиентов
+_NO_PROFILE = -1
+
+# Строка product_listing для индекса: (product_id, skin_type_ids, concern_ids, ingredient_ids, safety_rank)
+IndexRow = Tuple[int, Sequence[int], Sequence[int], Sequence[int], Optional[int]]
+
+_COLUMNS = (
+    ProductListing.product_id,
+    ProductListing.skin_type_ids,
+    ProductListing.concern_ids,
+    ProductListing.ingredient_ids,
+    ProductListing.safety_rank,
+)
+_RELATIONS = ("skin_type_ids", "concern_ids", "ingredient_ids")
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class UserProfile:
+    skin_type_ids: Tuple[int, ...] = ()
+    concern_ids: Tuple[int, ...] = ()
+    avoid_ingredient_ids: Tuple[int, ...] = ()
+    max_safety_level: Optional[SafetyLevel] = None
+
+
+@dataclass(frozen=True)
+class _Links:
+    """Связи товаров со значениями справочника в виде пар (строка товара, id значения)."""
+
+    rows: np.ndarray
+    values: np.ndarray
+
+    @classmethod
+    def build(cls, rows: List[int], values: List[int]) -> "_Links":
+        return cls(np.asarray(rows, dtype=np.int32), np.asarray(values, dtype=np.int32))
+
+    def replaced(self, touched: np.ndarray, rows: List[int], values: List[int]) -> "_Links":
+        keep = ~np.isin(self.rows, touched)
+        return _Links(
+            np.concatenate([self.rows[keep], np.asarray(rows, dtype=np.int32)]),
+            np.concatenate([self.values[keep], np.asarray(values, dtype=np.int32)]),
+        )
+
+    def matches(self, ids: Iterable[int], size: int) -> np.ndarray:
+        """Число совпавших значений у каждого товара."""
+        hits = np.isin(self.values, np.fromiter(ids, dtype=np.int32))
+        return np.bincount(self.rows[hits], minlength=size)
+
+
+@dataclass(frozen=True)
+class _Snapshot:
+    product_ids: np.ndarray
+    active: np.ndarray
+    safety: np.ndarray
+    links: Dict[str, _Links]
+
+
+def _links_of(rows: Sequence[IndexRow], positions: Sequence[int]) -> Dict[str, Tuple[List[int], List[int]]]:
+    links = {name: ([], []) for name in _RELATIONS}
+    for position, row in zip(positions, rows):
+        for name, values in zip(_RELATIONS, row[1:4]):
+            links[name][0].extend([position] * len(values))
+            links[name][1].extend(values)
+    return links
+
+
+class RecommendationIndex:
+    """Каталог в массивах NumPy для оценки всех товаров под профиль пользователя.
+
+    Загружается из product_listing целиком при первом запросе, а затем по
+    истечении TTL (изменения в других процессах) фоновой задачей: пока она
+    читает каталог, запросы оценивают прежний снимок. Записи этого процесса
+    помечают товары устаревшими, и перед следующей оценкой перечитываются
+    только они. Снимок данных неизменяем: оценка идёт без блокировки,
+    обновление подменяет снимок целиком.
+    """
+
+    def __init__(self, ttl: float):
+        self._ttl = ttl
+        self._lock = threading.Lock()
+        self._snapshot: Optional[_Snapshot] = None
+        self._row_of: Dict[int, int] = {}
+        self._loaded_at = 0.0
+        self._dirty: Set[int] = set()
+        # Идёт полная загрузка; товары, изменённые с её начала, перечитываются после неё
+        self._reloading = False
+        self._changed_since_reload: Set[int] = set()
+
+    def mark_dirty(self, product_ids: Iterable[int]) -> None:
+        with self._lock:
+            self._dirty.update(product_ids)
+            if self._reloading:
+                self._changed_since_reload.update(product_ids)
+
+    def _begin_reload(self) -> None:
+        self._reloading = True
+        self._changed_since_reload = set()
+
+    def claim_reload(self) -> bool:
+        """Пора ли перечитать каталог по TTL; пока загрузка идёт, повторно не выдаётся."""
+        with self._lock:
+            due = (
+                self._snapshot is not None
+                and not self._reloading
+                and time.monotonic() - self._loaded_at > self._ttl
+            )
+            if due:
+                self._begin_reload()
+            return due
+
+    def reload_failed(self) -> None:
+        with self._lock:
+            self._reloading = False
+
+    def sync(self, s: Session) -> None:
+        """Подгружает изменения этого процесса; запрос к БД выполняется без удержания блокировки.
+
+        Весь каталог читается здесь только при первом запросе, пока снимка ещё нет.
+        """
+        if self._snapshot is None:
+            # Без ожидания на блокировке: в асинхронном режиме sync выполняется в цикле
+            # событий, и одновременные первые запросы читают каталог каждый сам
+            with self._lock:
+                if not self._reloading:
+                    self._begin_reload()
+            started = time.monotonic()
+            try:
+                self.load(_load_rows(s), started)
+            except Exception:
+                self.reload_failed()
+                raise
+            return
+        with self._lock:
+            dirty, self._dirty = self._dirty, set()
+        if dirty:
+            self._update(dirty, list(s.execute(sa.select(*_COLUMNS).where(ProductListing.product_id.in_(dirty)))))
+
+    def load(self, rows: Sequence[IndexRow], loaded_at: float) -> None:
+        links = _links_of(rows, range(len(rows)))
+        snapshot = _Snapshot(
+            product_ids=np.fromiter((row[0] for row in rows), dtype=np.int64, count=len(rows)),
+            active=np.ones(len(rows), dtype=bool),
+            safety=np.fromiter(
+                (_NO_PROFILE if row[4] is None else row[4] for row in rows), dtype=np.int8, count=len(rows)
+            ),
+            links={name: _Links.build(*links[name]) for name in _RELATIONS},
+        )
+        with self._lock:
+            self._snapshot = snapshot
+            self._row_of = {int(product_id): row for row, product_id in enumerate(snapshot.product_ids)}
+            self._loaded_at = loaded_at
+            if self._reloading:
+                # Изменения до начала загрузки уже в снимке, более поздние могли не попасть
+                self._dirty = self._changed_since_reload
+                self._changed_since_reload = set()
+                self._reloading = False
+
+    def _update(self, dirty: Set[int], rows: Sequence[IndexRow]) -> None:
+        with self._lock:
+            old = self._snapshot
+            row_of = dict(self._row_of)
+            new_ids = [row[0] for row in rows if row[0] not in row_of]
+            for product_id in new_ids:
+                row_of[product_id] = len(row_of)
+
+            product_ids = np.concatenate([old.product_ids, np.asarray(new_ids, dtype=np.int64)])
+            active = np.concatenate([old.active, np.ones(len(new_ids), dtype=bool)])
+            safety = np.concatenate([old.safety, np.full(len(new_ids), _NO_PROFILE, dtype=np.int8)])
+
+            # Товары, пропавшие из product_listing, исключаются из оценки
+            touched = np.asarray([row_of[product_id] for product_id in dirty if product_id in row_of], dtype=np.int32)
+            active[touched] = False
+            positions = [row_of[row[0]] for row in rows]
+            active[positions] = True
+            safety[positions] = [_NO_PROFILE if row[4] is None else row[4] for row in rows]
+
+            links = _links_of(rows, positions)
+            self._snapshot = _Snapshot(
+                product_ids=product_ids,
+                active=active,
+                safety=safety,
+                links={name: old.links[name].replaced(touched, *links[name]) for name in _RELATIONS},
+            )
+            self._row_of = row_of
+
+    def top(self, profile: UserProfile, k: int) -> List[Tuple[int, float]]:
+        """k лучших (product_id, оценка) по убыванию оценки, при равенстве — по id."""
+        snapshot = self._snapshot
+        if snapshot is None or k <= 0:
+            return []
+        size = len(snapshot.product_ids)
+
+        score = np.zeros(size, dtype=np.float64)
+        if profile.skin_type_ids:
+            suits = snapshot.links["skin_type_ids"].matches(profile.skin_type_ids, size) > 0
+            score += SKIN_TYPE_WEIGHT * suits
+        if profile.concern_ids:
+            concerns = set(profile.concern_ids)
+            overlap = snapshot.links["concern_ids"].matches(concerns, size)
+            score += CONCERN_WEIGHT * overlap / len(concerns)
+        # Нет данных об ингредиентах — штраф как за unknown
+        safety = np.where(snapshot.safety == _NO_PROFILE, SAFETY_LEVEL_RANK[SafetyLevel.unknown], snapshot.safety)
+        score -= SAFETY_WEIGHT * safety
+
+        allowed = snapshot.active.copy()
+        if profile.avoid_ingredient_ids:
+            ingredients = snapshot.links["ingredient_ids"]
+            allowed[ingredients.rows[np.isin(ingredients.values, profile.avoid_ingredient_ids)]] = False
+        if profile.max_safety_level is not None:
+            allowed &= (snapshot.safety != _NO_PROFILE) & (
+                snapshot.safety <= SAFETY_LEVEL_RANK[profile.max_safety_level]
+            )
+
+        candidates = np.flatnonzero(allowed)
+        if len(candidates) > k:
+            # Отбор за O(n): все кандидаты не хуже k-й оценки, затем точная сортировка
+            kth = np.partition(score[candidates], len(candidates) - k)[len(candidates) - k]
+            candidates = candidates[score[candidates] >= kth]
+        order = np.lexsort((snapshot.product_ids[candidates], -score[candidates]))[:k]
+        best = candidates[order]
+        return list(zip(snapshot.product_ids[best].tolist(), score[best].tolist()))
+
+
+recommendation_index = RecommendationIndex(ttl=config.RECOMMEND_INDEX_TTL)
+
+
+def _load_rows(s: Session) -> List[IndexRow]:
+    return list(s.execute(sa.select(*_COLUMNS)))
+
+
+async def run_recommendation_loader() -> None:
+    """Фоновая задача процесса: раз в RECOMMEND_INDEX_CHECK_INTERVAL проверяет, не устарел ли индекс."""
+    while True:
+        if recommendation_index.claim_reload():
+            started = time.monotonic()
+            try:
+                rows = await run_in_session(_load_rows)
+                await run_in_threadpool(recommendation_index.load, rows, started)
+            except Exception:
+                # Запросы продолжают работать с прежним снимком, загрузка повторится на следующей проверке
+                recommendation_index.reload_failed()
+                logger.exception("Recommendation index reload failed")
+        await asyncio.sleep(config.RECOMMEND_INDEX_CHECK_INTERVAL)
+
+
+@on_listing_change
+def _mark_changed(db_session: Session, product_ids: List[int]) -> None:
+    on_commit(db_session, lambda: recommendation_index.mark_dirty(product_ids))
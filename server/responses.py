@@ -0,0 +1,47 @@
+from functools import lru_cache
+from typing import Any, Mapping, Optional
+
+from fastapi import status
+from fastapi.responses import JSONResponse
+from pydantic import TypeAdapter
+from pydantic_core import to_json
+
+
+@lru_cache(maxsize=None)
+def adapter_for(annotation: Any) -> TypeAdapter:
+    """Cached TypeAdapter for a schema or a typing annotation such as List[ProductShort]."""
+    return TypeAdapter(annotation)
+
+
+class APIJSONResponse(JSONResponse):
+    """JSONResponse rendered by pydantic-core instead of the stdlib json module.
+
+    Models are dumped by alias, so APIModel content keeps its PascalCase keys;
+    bytes are taken as already serialized JSON.
+    """
+
+    def render(self, content: Any) -> bytes:
+        if isinstance(content, bytes):
+            return content
+        return to_json(content, by_alias=True)
+
+
+def model_response(
+    annotation: Any,
+    content: Any,
+    status_code: int = status.HTTP_200_OK,
+    headers: Optional[Mapping[str, str]] = None,
+) -> APIJSONResponse:
+    """Validate handler output once (ORM objects or dicts) and dump it straight to JSON bytes.
+
+    Returning a Response bypasses FastAPI's response_model handling, which would
+    otherwise validate the same data again and encode it through jsonable_encoder.
+    Keep response_model on the route for the OpenAPI schema.
+    """
+    return APIJSONResponse(model_payload(annotation, content), status_code=status_code, headers=headers)
+
+
+def model_payload(annotation: Any, content: Any) -> bytes:
+    """JSON bytes of content validated against annotation, for responses that are cached."""
+    adapter = adapter_for(annotation)
+    return adapter.dump_json(adapter.validate_python(content, from_attributes=True), by_alias=True)
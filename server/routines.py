@@ -0,0 +1,153 @@
+import re
+from collections import defaultdict
+from dataclasses import dataclass
+from decimal import Decimal
+from typing import Dict, List, Optional, Sequence, Set, Tuple
+
+import sqlalchemy as sa
+from sqlalchemy.orm import Session
+
+from core.enums import SafetyLevel
+from db import Ingredient, Product
+from db.config import config
+from db.models import product_ingredients
+from .cache import DerivedIndex
+
+# Классы активов распознаются по INCI-названию ингредиента
+ACTIVE_CLASSES: Dict[str, "re.Pattern[str]"] = {
+    "retinoid": re.compile(r"retin|adapalene|tazarotene", re.I),
+    # Лимонная, яблочная и винная кислоты не входят: в составах это обычно
+    # регуляторы pH в следовых количествах, а не отшелушивающие активы
+    "aha": re.compile(r"glycolic acid|lactic acid|mandelic acid", re.I),
+    "bha": re.compile(r"salicylic acid|betaine salicylate|salix alba", re.I),
+    "vitamin_c": re.compile(r"ascorbic acid|ascorbyl", re.I),
+    "benzoyl_peroxide": re.compile(r"benzoyl peroxide", re.I),
+    "copper_peptide": re.compile(r"copper tripeptide|copper peptide", re.I),
+}
+
+
+@dataclass(frozen=True)
+class ConflictRule:
+    first: str
+    second: str
+    severity: SafetyLevel
+    reason: str
+
+
+CONFLICT_RULES: Tuple[ConflictRule, ...] = (
+    ConflictRule("retinoid", "aha", SafetyLevel.caution, "Retinoids with AHAs increase irritation and barrier damage"),
+    ConflictRule("retinoid", "bha", SafetyLevel.caution, "Retinoids with BHAs increase irritation and dryness"),
+    ConflictRule("retinoid", "benzoyl_peroxide", SafetyLevel.danger, "Benzoyl peroxide oxidizes and deactivates retinoids"),
+    ConflictRule("vitamin_c", "benzoyl_peroxide", SafetyLevel.caution, "Benzoyl peroxide oxidizes vitamin C"),
+    ConflictRule("aha", "bha", SafetyLevel.caution, "Layering exfoliating acids risks over-exfoliation"),
+    ConflictRule("vitamin_c", "copper_peptide", SafetyLevel.caution, "Ascorbic acid breaks down copper peptides"),
+)
+
+
+@dataclass(frozen=True)
+class _Rules:
+    """Ингредиенты справочника, разложенные для проверки без перебора пар."""
+
+    classes: Dict[int, Tuple[str, ...]]
+    names: Dict[int, str]
+    max_concentration: Dict[int, int]
+    # Класс -> правила, в которых он стоит первым
+    by_class: Dict[str, Tuple[ConflictRule, ...]]
+
+
+def _build_rules(s: Session) -> _Rules:
+    ingredients = s.execute(sa.select(Ingredient.id, Ingredient.name, Ingredient.max_concentration)).all()
+    classes = {}
+    for ingredient_id, name, _ in ingredients:
+        matched = tuple(active for active, pattern in ACTIVE_CLASSES.items() if pattern.search(name))
+        if matched:
+            classes[ingredient_id] = matched
+    by_class = defaultdict(list)
+    for rule in CONFLICT_RULES:
+        by_class[rule.first].append(rule)
+    return _Rules(
+        classes=classes,
+        names={ingredient_id: name for ingredient_id, name, _ in ingredients},
+        max_concentration={
+            ingredient_id: limit for ingredient_id, _, limit in ingredients if limit is not None
+        },
+        by_class={active: tuple(rules) for active, rules in by_class.items()},
+    )
+
+
+# Пересобирается после изменения ингредиентов; TTL — для изменений в других процессах
+routine_rules = DerivedIndex(ttl=config.REFERENCE_CACHE_TTL, build=_build_rules)
+
+
+def load_routine(s: Session, product_ids: Sequence[int]) -> Dict[int, List[Tuple[int, Optional[Decimal]]]]:
+    """Состав товаров одним запросом: product_id -> [(ingredient_id, concentration)].
+
+    Товары без ингредиентов присутствуют с пустым списком, несуществующие — отсутствуют.
+    """
+    query = (
+        sa.select(Product.id, product_ingredients.c.ingredient_id, product_ingredients.c.concentration)
+        .outerjoin(product_ingredients, product_ingredients.c.product_id == Product.id)
+        .where(Product.id.in_(product_ids))
+    )
+    routine: Dict[int, List[Tuple[int, Optional[Decimal]]]] = {}
+    for product_id, ingredient_id, concentration in s.execute(query):
+        items = routine.setdefault(product_id, [])
+        if ingredient_id is not None:
+            items.append((ingredient_id, concentration))
+    return routine
+
+
+def check_routine(rules: _Rules, routine: Dict[int, List[Tuple[int, Optional[Decimal]]]]) -> dict:
+    """Конфликты классов активов, повторяющиеся активы и превышение max_concentration.
+
+    Один проход по ингредиентам раскладывает товары по классам активов, затем
+    проверяются только правила для присутствующих классов. Конфликт засчитывается,
+    если классы встречаются в разных товарах: сочетание внутри одной формулы —
+    решение производителя.
+    """
+    products: Dict[str, Set[int]] = defaultdict(set)
+    ingredients: Dict[str, Set[int]] = defaultdict(set)
+    totals: Dict[int, Decimal] = defaultdict(Decimal)
+    carriers: Dict[int, Set[int]] = defaultdict(set)
+    for product_id, items in routine.items():
+        for ingredient_id, concentration in items:
+            for active in rules.classes.get(ingredient_id, ()):
+                products[active].add(product_id)
+                ingredients[active].add(ingredient_id)
+            if concentration is not None and ingredient_id in rules.max_concentration:
+                totals[ingredient_id] += concentration
+                carriers[ingredient_id].add(product_id)
+
+    present = [active for active in ACTIVE_CLASSES if active in products]
+    conflicts = []
+    for active in present:
+        for rule in rules.by_class.get(active, ()):
+            involved = products[rule.first] | products.get(rule.second, set())
+            if rule.second in products and len(involved) > 1:
+                conflicts.append({
+                    "actives": [rule.first, rule.second],
+                    "severity": rule.severity,
+                    "reason": rule.reason,
+                    "product_ids": sorted(involved),
+                    "ingredient_ids": sorted(ingredients[rule.first] | ingredients[rule.second]),
+                })
+
+    duplicates = [
+        {"active": active, "product_ids": sorted(product_ids), "ingredient_ids": sorted(ingredients[active])}
+        for active in present
+        if len(product_ids := products[active]) > 1
+    ]
+
+    excess = [
+        {
+            "ingredient_id": ingredient_id,
+            "ingredient_name": rules.names[ingredient_id],
+            "total_concentration": total,
+            "max_concentration": rules.max_concentration[ingredient_id],
+            "product_ids": sorted(carriers[ingredient_id]),
+        }
+        for ingredient_id, total in sorted(totals.items())
+        if total > rules.max_concentration[ingredient_id]
+    ]
+
+    return {"conflicts": conflicts, "duplicated_actives": duplicates, "concentration_excess": excess}
@@ -1,6 +1,9 @@
-from typing import Optional
+from typing import List, Optional
+
+from pydantic import Field
+
 from .common import APIModel
-from core.enums import SafetyLevel
+from core.enums import InciMatch, SafetyLevel
 
 
 class IngredientCreate(APIModel):
@@ -28,4 +31,22 @@ class IngredientSchema(APIModel):
     safety_level: SafetyLevel
     max_concentration: Optional[int] = None
     carcinogenicity: Optional[int] = None
-    allergenicity: Optional[int] = None
\ No newline at end of file
+    allergenicity: Optional[int] = None
+
+
+class InciParseRequest(APIModel):
+    texts: List[str] = Field(min_length=1, max_length=1000)
+
+
+class InciItem(APIModel):
+    raw: str
+    ingredient_id: Optional[int] = None
+    ingredient_name: Optional[str] = None
+    matched_by: Optional[InciMatch] = None
+
+
+class InciParseResult(APIModel):
+    ingredient_ids: List[int]
+    items: List[InciItem]
+    needs_review: List[str]
+    unmatched: List[str]
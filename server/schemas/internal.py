@@ -0,0 +1,18 @@
+from typing import Dict, Optional
+from .common import APIModel
+
+
+class HistogramSchema(APIModel):
+    buckets: Dict[str, int]
+    count: int
+    sum: float
+
+
+class PoolStatsSchema(APIModel):
+    pool_class: Optional[str] = None
+    size: int
+    checked_in: int
+    checked_out: int
+    overflow: int
+    timeouts: int
+    checkout_seconds: HistogramSchema
@@ -1,5 +1,10 @@
-from typing import Optional, List
+from decimal import Decimal
+from typing import Annotated, Dict, Optional, List
+
+from pydantic import Field
+
 from .common import APIModel
+from core.enums import SafetyLevel
 from .ingredient import IngredientSchema
 from .brand import BrandSchema
 from .category import CategorySchema
@@ -8,6 +13,10 @@ from .concern import ConcernSchema
 from .tag import TagSchema
 
 
+# Доля ингредиента в формуле, %; совпадает с product_ingredients.concentration (Numeric(5, 2))
+Concentration = Annotated[Decimal, Field(ge=0, le=100, max_digits=5, decimal_places=2)]
+
+
 class ProductBase(APIModel):
     name: str
     description: Optional[str] = None
@@ -23,6 +32,8 @@ class ProductCreate(ProductBase):
     skin_type_ids: Optional[List[int]] = None
     concern_ids: Optional[List[int]] = None
     tag_ids: Optional[List[int]] = None
+    # id ингредиента -> концентрация; ингредиент должен быть в составе товара
+    ingredient_concentrations: Optional[Dict[int, Optional[Concentration]]] = None
 
 
 class ProductUpdate(ProductBase):
@@ -30,6 +41,27 @@ class ProductUpdate(ProductBase):
     skin_type_ids: Optional[List[int]] = None
     concern_ids: Optional[List[int]] = None
     tag_ids: Optional[List[int]] = None
+    ingredient_concentrations: Optional[Dict[int, Optional[Concentration]]] = None
+
+
+class ProductPatch(APIModel):
+    name: Optional[str] = None
+    description: Optional[str] = None
+    how_to_use: Optional[str] = None
+    image_url: Optional[str] = None
+    volume_ml: Optional[int] = None
+    brand_id: Optional[int] = None
+    category_id: Optional[int] = None
+    add_ingredient_ids: Optional[List[int]] = None
+    remove_ingredient_ids: Optional[List[int]] = None
+    add_skin_type_ids: Optional[List[int]] = None
+    remove_skin_type_ids: Optional[List[int]] = None
+    add_concern_ids: Optional[List[int]] = None
+    remove_concern_ids: Optional[List[int]] = None
+    add_tag_ids: Optional[List[int]] = None
+    remove_tag_ids: Optional[List[int]] = None
+    # Меняет концентрации только перечисленных ингредиентов; null — сбрасывает
+    ingredient_concentrations: Optional[Dict[int, Optional[Concentration]]] = None
 
 
 class ProductName(ProductBase):
@@ -42,8 +74,68 @@ class ProductShort(ProductBase):
     category: Optional[CategorySchema] = None
 
 
+class ProductRisk(APIModel):
+    worst_safety_level: Optional[SafetyLevel] = None
+    max_allergenicity: Optional[int] = None
+    max_carcinogenicity: Optional[int] = None
+    safe_count: int = 0
+    caution_count: int = 0
+    danger_count: int = 0
+    unknown_count: int = 0
+
+
+class ProductListItem(ProductShort):
+    risk: Optional[ProductRisk] = None
+
+
+class ProductRecommendation(ProductListItem):
+    score: float
+
+
+class ProductSimilar(ProductListItem):
+    similarity: float
+
+
 class ProductDetailed(ProductShort):
     ingredients: List[IngredientSchema] = []
     suitable_for_skin_types: List[SkinTypeSchema] = []
     targets_concerns: List[ConcernSchema] = []
-    tags: List[TagSchema] = []
\ No newline at end of file
+    tags: List[TagSchema] = []
+
+
+# Верхняя граница числа id в одном запросе /products/batch
+MAX_BATCH_IDS = 200
+
+
+class ProductBatchRequest(APIModel):
+    ids: List[int] = Field(min_length=1, max_length=MAX_BATCH_IDS)
+
+
+class ProductBatch(APIModel):
+    products: List[ProductDetailed]
+    missing_ids: List[int]
+
+
+class FacetCount(APIModel):
+    id: int
+    count: int
+
+
+class ProductFacets(APIModel):
+    categories: List[FacetCount] = []
+    skin_types: List[FacetCount] = []
+    concerns: List[FacetCount] = []
+    tags: List[FacetCount] = []
+
+
+class BulkImportError(APIModel):
+    line: int
+    error: str
+
+
+class BulkImportResult(APIModel):
+    created: int
+    failed: int
+    # Первые MAX_REPORTED_ERRORS ошибок; failed — общее число
+    errors: List[BulkImportError] = []
+    errors_truncated: bool = False
@@ -0,0 +1,38 @@
+from typing import List
+
+from pydantic import Field
+
+from .common import APIModel
+from core.enums import SafetyLevel
+
+
+class RoutineCheckRequest(APIModel):
+    product_ids: List[int] = Field(min_length=1, max_length=50)
+
+
+class RoutineConflict(APIModel):
+    actives: List[str]
+    severity: SafetyLevel
+    reason: str
+    product_ids: List[int]
+    ingredient_ids: List[int]
+
+
+class DuplicatedActive(APIModel):
+    active: str
+    product_ids: List[int]
+    ingredient_ids: List[int]
+
+
+class ConcentrationExcess(APIModel):
+    ingredient_id: int
+    ingredient_name: str
+    total_concentration: float
+    max_concentration: int
+    product_ids: List[int]
+
+
+class RoutineCheck(APIModel):
+    conflicts: List[RoutineConflict]
+    duplicated_actives: List[DuplicatedActive]
+    concentration_excess: List[ConcentrationExcess]
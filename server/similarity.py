@@ -0,0 +1,244 @@
+import asyncio
+import logging
+import threading
+import time
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional, Sequence, Set, Tuple
+
+import numpy as np
+import sqlalchemy as sa
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+
+from db.config import config
+from db.models import ProductListing
+from db.read_model import on_listing_change
+from db.session import run_in_session
+from .cache import on_commit
+
+# LSH: подпись MinHash из BANDS * ROWS хешей, кандидаты — товары с совпавшей полосой.
+# При 32 x 4 пара с Jaccard 0.5 становится кандидатом с вероятностью ~0.87, 0.7 — ~0.9999,
+# 0.1 — ~0.003, поэтому число пар растёт почти линейно с размером каталога.
+BANDS = 32
+ROWS = 4
+# Из корзины одной полосы берутся пары не дальше MAX_BUCKET позиций друг от друга
+MAX_BUCKET = 64
+# Пары для точного Jaccard обрабатываются пачками, чтобы ограничить память
+_PAIR_CHUNK = 200_000
+
+_PRIME = (1 << 31) - 1
+
+logger = logging.getLogger(__name__)
+
+# Строка product_listing для индекса: (product_id, ingredient_ids)
+SimilarityRow = Tuple[int, Sequence[int]]
+
+
+@dataclass(frozen=True)
+class _Neighbours:
+    """Списки соседей в формате CSR: соседи строки i — [indptr[i], indptr[i + 1])."""
+
+    row_of: Dict[int, int]
+    indptr: np.ndarray
+    product_ids: np.ndarray
+    scores: np.ndarray
+
+    def of(self, product_id: int) -> Optional[List[Tuple[int, float]]]:
+        row = self.row_of.get(product_id)
+        if row is None:
+            return None
+        start, end = self.indptr[row], self.indptr[row + 1]
+        return list(zip(self.product_ids[start:end].tolist(), self.scores[start:end].tolist()))
+
+
+def _candidate_pairs(values: np.ndarray, starts: np.ndarray, seed: int) -> np.ndarray:
+    """Пары строк (a < b), совпавшие хотя бы в одной полосе MinHash; код пары a * n + b."""
+    n = len(starts)
+    rnd = np.random.default_rng(seed)
+    unique = int(values.max()) + 1
+    pairs = []
+    for _ in range(BANDS):
+        key = np.zeros(n, dtype=np.uint64)
+        for _ in range(ROWS):
+            a, b = rnd.integers(1, _PRIME, size=2)
+            hashes = (a * np.arange(unique, dtype=np.int64) + b) % _PRIME
+            signature = np.minimum.reduceat(hashes[values], starts).astype(np.uint64)
+            key = key * np.uint64(1_000_003) ^ signature
+        order = np.argsort(key, kind="stable")
+        sorted_key = key[order]
+        for distance in range(1, MAX_BUCKET):
+            same = sorted_key[:-distance] == sorted_key[distance:]
+            if not same.any():
+                break
+            first, second = order[:-distance][same], order[distance:][same]
+            pairs.append(np.minimum(first, second) * n + np.maximum(first, second))
+    if not pairs:
+        return np.empty(0, dtype=np.int64)
+    return np.unique(np.concatenate(pairs))
+
+
+def _jaccard(
+    values: np.ndarray, keys: np.ndarray, starts: np.ndarray, sizes: np.ndarray, first: np.ndarray, second: np.ndarray
+) -> np.ndarray:
+    """Точный Jaccard пар: ингредиенты first ищутся в отсортированных ключах строка * unique + ингредиент."""
+    unique = int(values.max()) + 1
+    lengths = sizes[first]
+    offsets = np.cumsum(lengths) - lengths
+    positions = np.repeat(starts[first] - offsets, lengths) + np.arange(lengths.sum())
+    query = np.repeat(second.astype(np.int64), lengths) * unique + values[positions]
+    found = keys[np.searchsorted(keys, query).clip(max=len(keys) - 1)] == query
+    common = np.bincount(np.repeat(np.arange(len(first)), lengths), weights=found, minlength=len(first))
+    return common / (sizes[first] + sizes[second] - common)
+
+
+def build_neighbours(rows: Sequence[SimilarityRow], count: int, seed: int = 0) -> _Neighbours:
+    """Для каждого товара — до count соседей по убыванию Jaccard, при равенстве — по id."""
+    rows = [row for row in rows if row[1]]
+    n = len(rows)
+    product_ids = np.fromiter((row[0] for row in rows), dtype=np.int64, count=n)
+    sizes = np.fromiter((len(row[1]) for row in rows), dtype=np.int64, count=n)
+    if n < 2:
+        return _Neighbours({}, np.zeros(n + 1, dtype=np.int64), np.empty(0, dtype=np.int64), np.empty(0))
+
+    # Ингредиенты перенумерованы подряд; внутри строки отсортированы (ORDER BY в product_listing)
+    _, values = np.unique(np.fromiter((x for row in rows for x in row[1]), dtype=np.int64), return_inverse=True)
+    starts = np.cumsum(sizes) - sizes
+    keys = np.repeat(np.arange(n, dtype=np.int64), sizes) * (int(values.max()) + 1) + values
+
+    codes = _candidate_pairs(values, starts, seed)
+    sources, targets, scores = [], [], []
+    for chunk in range(0, len(codes), _PAIR_CHUNK):
+        first, second = np.divmod(codes[chunk:chunk + _PAIR_CHUNK], n)
+        # Перебираются ингредиенты меньшего из двух товаров
+        swap = sizes[first] > sizes[second]
+        first, second = np.where(swap, second, first), np.where(swap, first, second)
+        similarity = _jaccard(values, keys, starts, sizes, first, second)
+        sources += [first, second]
+        targets += [second, first]
+        scores += [similarity, similarity]
+
+    source = np.concatenate(sources) if sources else np.empty(0, dtype=np.int64)
+    target = np.concatenate(targets) if targets else np.empty(0, dtype=np.int64)
+    score = np.concatenate(scores) if scores else np.empty(0)
+
+    order = np.lexsort((product_ids[target], -score, source))
+    source, target, score = source[order], target[order], score[order]
+    rank = np.arange(len(source)) - np.searchsorted(source, source)
+    keep = rank < count
+    source, target, score = source[keep], target[keep], score[keep]
+
+    return _Neighbours(
+        row_of={int(product_id): row for row, product_id in enumerate(product_ids)},
+        indptr=np.concatenate([[0], np.cumsum(np.bincount(source, minlength=n))]),
+        product_ids=product_ids[target],
+        scores=score.astype(np.float32),
+    )
+
+
+class SimilarityIndex:
+    """Предрассчитанные «похожие товары» по составу.
+
+    Перестраивается целиком фоновой задачей: после изменений в этом процессе,
+    но не чаще раза в min_interval (сборка каталога — секунды CPU, и поток
+    записей не должен держать воркер в постоянной пересборке), и не реже
+    раза в TTL (изменения в других процессах). Запрос только берёт готовый
+    список соседей. Для товаров, которых нет в индексе или которые
+    изменились после сборки, возвращается None, и вызывающий код считает
+    соседей запросом к БД.
+    """
+
+    def __init__(self, ttl: float, count: int, min_interval: float = 0):
+        self.count = count
+        self._ttl = ttl
+        self._min_interval = min_interval
+        self._lock = threading.Lock()
+        self._neighbours: Optional[_Neighbours] = None
+        self._built_at = 0.0
+        self._dirty = False
+        # Изменённые товары: ещё не взятые в сборку и попавшие в текущую
+        self._changed: Set[int] = set()
+        self._rebuilding: Set[int] = set()
+
+    def mark_dirty(self, product_ids: Iterable[int] = ()) -> None:
+        with self._lock:
+            self._dirty = True
+            self._changed.update(product_ids)
+
+    def claim_rebuild(self) -> bool:
+        """Пора ли пересобрать; изменения, пришедшие во время сборки, вызовут следующую."""
+        with self._lock:
+            age = time.monotonic() - self._built_at
+            due = self._neighbours is None or age > self._ttl or (self._dirty and age >= self._min_interval)
+            if due:
+                self._dirty = False
+                # При неудачной сборке товары остаются в _rebuilding до следующей
+                self._rebuilding |= self._changed
+                self._changed = set()
+            return due
+
+    def rebuild(self, rows: Sequence[SimilarityRow], started: float) -> None:
+        neighbours = build_neighbours(rows, self.count)
+        with self._lock:
+            self._neighbours = neighbours
+            self._built_at = started
+            self._rebuilding = set()
+
+    def neighbours(self, product_id: int) -> Optional[List[Tuple[int, float]]]:
+        """Соседи товара; None — индекс ещё не собран, товара в нём нет или он изменился после сборки."""
+        with self._lock:
+            neighbours = self._neighbours
+            if neighbours is None or product_id in self._changed or product_id in self._rebuilding:
+                return None
+        return neighbours.of(product_id)
+
+
+similarity_index = SimilarityIndex(
+    ttl=config.SIMILAR_INDEX_TTL,
+    count=config.SIMILAR_PRODUCTS_COUNT,
+    min_interval=config.SIMILAR_INDEX_MIN_REBUILD_INTERVAL,
+)
+
+
+# Точные соседи одного товара для товаров вне индекса: кандидаты по GIN-индексу ingredient_ids
+_EXACT_SQL = sa.text("""
+SELECT o.product_id, common::float / (cardinality(o.ingredient_ids) + cardinality(t.ingredient_ids) - common) AS score
+FROM product_listing AS t
+JOIN product_listing AS o ON o.ingredient_ids && t.ingredient_ids AND o.product_id <> t.product_id
+CROSS JOIN LATERAL (
+    SELECT count(*) AS common FROM unnest(o.ingredient_ids) AS x WHERE x = ANY(t.ingredient_ids)
+) AS c
+WHERE t.product_id = :product_id
+ORDER BY score DESC, o.product_id
+LIMIT :count
+""")
+
+
+def exact_neighbours(s: Session, product_id: int, count: int) -> List[Tuple[int, float]]:
+    return [tuple(row) for row in s.execute(_EXACT_SQL, {"product_id": product_id, "count": count})]
+
+
+def _load_rows(s: Session) -> List[SimilarityRow]:
+    query = sa.select(ProductListing.product_id, ProductListing.ingredient_ids).where(
+        sa.func.cardinality(ProductListing.ingredient_ids) > 0
+    )
+    return [tuple(row) for row in s.execute(query)]
+
+
+async def run_similarity_builder() -> None:
+    """Фоновая задача процесса: раз в SIMILAR_INDEX_CHECK_INTERVAL проверяет, пора ли пересобрать индекс."""
+    while True:
+        if similarity_index.claim_rebuild():
+            started = time.monotonic()
+            try:
+                rows = await run_in_session(_load_rows)
+                await run_in_threadpool(similarity_index.rebuild, rows, started)
+            except Exception:
+                # Старый индекс продолжает работать, сборка повторится на следующей проверке
+                similarity_index.mark_dirty()
+                logger.exception("Similar products index rebuild failed")
+        await asyncio.sleep(config.SIMILAR_INDEX_CHECK_INTERVAL)
+
+
+@on_listing_change
+def _mark_changed(db_session: Session, product_ids: List[int]) -> None:
+    on_commit(db_session, lambda: similarity_index.mark_dirty(product_ids))
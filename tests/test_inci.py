@@ -0,0 +1,82 @@
+import pytest
+
+from core.enums import InciMatch
+from server.inci import build_matcher, normalize, split_inci
+
+INGREDIENTS = [
+    (1, "Aqua (Water)"),
+    (2, "Sodium Hyaluronate"),
+    (3, "Caprylic/Capric Triglyceride"),
+    (4, "Glycerin"),
+    (5, "Titanium Dioxide"),
+    (6, "Hyaluronic Acid"),
+]
+
+
+@pytest.fixture(scope="module")
+def matcher():
+    return build_matcher(INGREDIENTS)
+
+
+def test_normalize():
+    assert normalize("  Crème  de-Rosé ") == "creme de rose"
+    assert normalize("Caprylic/Capric Triglyceride") == "caprylic capric triglyceride"
+    assert normalize("***") == ""
+
+
+def test_split_keeps_parentheses_and_numeric_commas():
+    text = "Ingredients: Aqua (Water), 1,2-Hexanediol, Caprylic/Capric Triglyceride; Parfum (Fragrance, Perfume)."
+    assert split_inci(text) == [
+        "Aqua (Water)",
+        "1,2-Hexanediol",
+        "Caprylic/Capric Triglyceride",
+        "Parfum (Fragrance, Perfume)",
+    ]
+
+
+def test_split_may_contain():
+    assert split_inci("Glycerin • Mica [+/-: CI 77891, CI 77491]") == ["Glycerin", "Mica", "CI 77891", "CI 77491"]
+    assert split_inci("Состав: Aqua, , *") == ["Aqua"]
+
+
+def test_slash_is_not_split(matcher):
+    assert "caprylic" not in matcher.keys
+    assert "capric triglyceride" not in matcher.keys
+    assert matcher.match("Caprylic/Capric Triglyceride") == (3, InciMatch.exact)
+    assert matcher.match("Caprylic Acid") == (None, None)
+
+
+def test_parenthetical_and_synonyms(matcher):
+    assert matcher.match("Aqua (Water)") == (1, InciMatch.exact)
+    assert matcher.match("water") == (1, InciMatch.synonym)
+    assert matcher.match("Eau") == (1, InciMatch.synonym)
+    assert matcher.match("Glycerol") == (4, InciMatch.synonym)
+    assert matcher.match("CI 77891") == (5, InciMatch.synonym)
+
+
+def test_key_priority():
+    # Точное название важнее части названия в скобках, при равенстве — меньший id
+    matcher = build_matcher([(7, "Water"), (2, "Aqua (Water)"), (9, "Aqua (Eau)")])
+    assert matcher.match("Water") == (7, InciMatch.exact)
+    assert matcher.match("Aqua") == (2, InciMatch.synonym)
+
+
+def test_parse_separates_partial_matches(matcher):
+    result = matcher.parse(
+        "Water, Glycerin, Sodium Hyaluronate Crosspolymer, Hydrolyzed Hyaluronic Acid, "
+        "Caprylic Acid, Aqua, Sodium Hyaluronate"
+    )
+    assert result["ingredient_ids"] == [1, 4, 2]
+    assert result["needs_review"] == ["Sodium Hyaluronate Crosspolymer", "Hydrolyzed Hyaluronic Acid"]
+    assert result["unmatched"] == ["Caprylic Acid"]
+    partial = result["items"][2]
+    assert partial == {
+        "raw": "Sodium Hyaluronate Crosspolymer",
+        "ingredient_id": 2,
+        "ingredient_name": "Sodium Hyaluronate",
+        "matched_by": InciMatch.partial,
+    }
+
+
+def test_partial_prefers_longest_match(matcher):
+    assert matcher.match("Sodium Hyaluronic Acid Blend") == (6, InciMatch.partial)
@@ -0,0 +1,76 @@
+import base64
+import json
+
+import pytest
+from fastapi import HTTPException
+
+from server.pagination import decode_cursor, encode_cursor
+
+
+@pytest.mark.parametrize("values", [(1,), (0.4375, 12), (2, 7), (2**31 - 1, 0)])
+def test_cursor_round_trip(values):
+    assert decode_cursor(encode_cursor(*values), size=len(values)) == list(values)
+
+
+def test_cursor_is_url_safe_without_padding():
+    cursor = encode_cursor("???>>>", 2 ** 40)
+    assert "=" not in cursor
+    assert set(cursor) <= set("ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789-_")
+
+
+@pytest.mark.parametrize(
+    "cursor",
+    [
+        "",
+        "not base64!",
+        base64.urlsafe_b64encode(b"\xff\xfe").decode(),
+        base64.urlsafe_b64encode(json.dumps({"id": 1}).encode()).decode(),
+        base64.urlsafe_b64encode(b"7").decode(),
+    ],
+)
+def test_malformed_cursor_is_rejected(cursor):
+    with pytest.raises(HTTPException) as exc:
+        decode_cursor(cursor)
+    assert exc.value.status_code == 400
+
+
+def test_cursor_with_one_of_several_sizes():
+    assert decode_cursor(encode_cursor(5), size=(1, 2)) == [5]
+    assert decode_cursor(encode_cursor(0.25, 5), size=(1, 2)) == [0.25, 5]
+    with pytest.raises(HTTPException):
+        decode_cursor(encode_cursor(1, 2, 3), size=(1, 2))
+
+
+def test_cursor_with_wrong_key_size_is_rejected():
+    with pytest.raises(HTTPException):
+        decode_cursor(encode_cursor(0.5, 3), size=1)
+    with pytest.raises(HTTPException):
+        decode_cursor(encode_cursor(3), size=2)
+
+
+def cursor_of(values):
+    return base64.urlsafe_b64encode(json.dumps(values).encode()).decode()
+
+
+@pytest.mark.parametrize(
+    "values",
+    [
+        [True],
+        [1.0],
+        ["7"],
+        [None],
+        [-1],
+        [2**31],
+        [0.5, False],
+        [True, 3],
+        [None, 3],
+        ["Brand 1", 3],
+        [2**31, 3],
+        [float("nan"), 3],
+        [float("inf"), 3],
+    ],
+)
+def test_cursor_with_invalid_key_types_is_rejected(values):
+    with pytest.raises(HTTPException) as exc:
+        decode_cursor(cursor_of(values), size=len(values))
+    assert exc.value.status_code == 400
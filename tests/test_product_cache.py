@@ -0,0 +1,85 @@
+import pytest
+
+import server.product_cache as product_cache
+from server.product_cache import MemoryBackend, ProductDetailCache
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(product_cache.time, "monotonic", clock)
+    return clock
+
+
+@pytest.fixture
+def cache(clock):
+    return ProductDetailCache(MemoryBackend(maxsize=100), ttl=10)
+
+
+def test_miss_then_hit(cache):
+    assert cache.get_many([1, 2]) == {1: (None, 0), 2: (None, 0)}
+    cache.set_many({1: (b'{"Id":1}', 0)})
+    assert cache.get_many([1, 2]) == {1: (b'{"Id":1}', 0), 2: (None, 0)}
+
+
+def test_invalidate_bumps_version(cache):
+    cache.set_many({1: (b"old", 0)})
+    cache.invalidate([1])
+    assert cache.get_many([1]) == {1: (None, 1)}
+    cache.set_many({1: (b"new", 1)})
+    cache.invalidate([1, 1])
+    assert cache.get_many([1]) == {1: (None, 3)}
+
+
+def test_stale_set_after_invalidation_is_ignored(cache):
+    # Чтение из БД началось до коммита, запись в кэш — после инвалидации
+    _, version = cache.get_many([1])[1]
+    cache.invalidate([1])
+    cache.set_many({1: (b"stale", version)})
+    assert cache.get_many([1]) == {1: (None, 1)}
+
+
+def test_payload_may_contain_separator(cache):
+    cache.set_many({1: (b"a:b:c", 0)})
+    assert cache.get_many([1])[1] == (b"a:b:c", 0)
+
+
+def test_entries_expire(cache, clock):
+    cache.set_many({1: (b"x", 0)})
+    clock.now += 9
+    assert cache.get_many([1])[1] == (b"x", 0)
+    clock.now += 2
+    assert cache.get_many([1])[1] == (None, 0)
+
+
+def test_version_outlives_entries(cache, clock):
+    cache.set_many({1: (b"x", 0)})
+    cache.invalidate([1])
+    cache.set_many({1: (b"y", 1)})
+    clock.now += 15
+    # Запись истекла, счётчик (2 * ttl) ещё жив
+    assert cache.get_many([1])[1] == (None, 1)
+
+
+def test_lru_eviction(clock):
+    cache = ProductDetailCache(MemoryBackend(maxsize=2), ttl=10)
+    cache.set_many({1: (b"1", 0), 2: (b"2", 0)})
+    cache.get_many([1])
+    cache.set_many({3: (b"3", 0)})
+    found = cache.get_many([1, 2, 3])
+    assert found == {1: (b"1", 0), 2: (None, 0), 3: (b"3", 0)}
+
+
+def test_counters_are_not_evicted_by_entries(clock):
+    cache = ProductDetailCache(MemoryBackend(maxsize=2), ttl=10)
+    cache.invalidate([1])
+    cache.set_many({2: (b"2", 0), 3: (b"3", 0), 4: (b"4", 0)})
+    assert cache.get_many([1])[1] == (None, 1)
@@ -0,0 +1,92 @@
+from collections import namedtuple
+
+import pytest
+from fastapi import Response
+from sqlalchemy.dialects import postgresql
+
+import server.api.product as product_api
+from core.enums import ProductSort
+from db.product_filters import ProductFilters
+from server.pagination import NEXT_CURSOR_HEADER
+
+
+class Result:
+    def __init__(self, rows):
+        self.rows = rows
+
+    def all(self):
+        return self.rows
+
+
+class RecordingSession:
+    """Запоминает выполненные выражения и отдаёт заданные строки."""
+
+    def __init__(self, rows=()):
+        self.rows = list(rows)
+        self.statements = []
+
+    def execute(self, statement, *args, **kwargs):
+        self.statements.append(statement)
+        return Result(self.rows)
+
+
+Row = namedtuple("Row", "id name")
+
+
+def compiled_sql(statement):
+    return str(statement.compile(dialect=postgresql.dialect()))
+
+
+def test_sort_by_id_overrides_search_relevance(monkeypatch):
+    def fail(*args):
+        raise AssertionError("relevance must not be considered when sort_by is set")
+
+    monkeypatch.setattr(product_api, "_rank_by_relevance", fail)
+    s = RecordingSession()
+    response = Response()
+
+    product_api._list_products(s, response, ProductFilters(search="serum"), [7], 0, 10, ProductSort.id)
+
+    sql = compiled_sql(s.statements[-1])
+    assert "ts_rank_cd" not in sql and "similarity(" not in sql
+    assert "products.id > " in sql
+    assert "ORDER BY products.id \n LIMIT" in sql
+    assert NEXT_CURSOR_HEADER not in response.headers
+
+
+def test_search_without_sort_by_orders_by_relevance():
+    s = RecordingSession()
+
+    product_api._list_products(s, Response(), ProductFilters(search="serum"), [0.5, 7], 0, 10)
+
+    sql = compiled_sql(s.statements[-1])
+    assert "ts_rank_cd" in sql
+    assert "DESC, products.id" in sql
+
+
+@pytest.mark.parametrize(
+    "sort_by, search, size",
+    [
+        (None, None, 1),
+        (None, "serum", (1, 2)),
+        (ProductSort.id, "serum", 1),
+        (ProductSort.safety, "serum", 2),
+        (ProductSort.allergenicity, None, 2),
+    ],
+)
+def test_cursor_size(sort_by, search, size):
+    assert product_api._cursor_size(sort_by, ProductFilters(search=search)) == size
+
+
+def test_etag_changes_when_only_the_next_page_appears(monkeypatch):
+    monkeypatch.setattr(product_api, "product_list_item_dict", Row._asdict)
+    rows = [Row(1, "a"), Row(2, "b")]
+
+    last_page = Response()
+    product_api._list_products(RecordingSession(rows), last_page, ProductFilters(), None, 0, 2)
+    more = Response()
+    product_api._list_products(RecordingSession(rows + [Row(3, "c")]), more, ProductFilters(), None, 0, 2)
+
+    assert NEXT_CURSOR_HEADER not in last_page.headers
+    assert NEXT_CURSOR_HEADER in more.headers
+    assert last_page.headers["ETag"] != more.headers["ETag"]
@@ -0,0 +1,102 @@
+import random
+
+import pytest
+
+from core.enums import SafetyLevel
+from server.recommend import RecommendationIndex, UserProfile
+
+
+def catalog(products, seed):
+    rnd = random.Random(seed)
+    return {
+        product_id: (
+            product_id,
+            sorted(rnd.sample(range(1, 7), rnd.randint(0, 3))),
+            sorted(rnd.sample(range(1, 10), rnd.randint(0, 4))),
+            sorted(rnd.sample(range(1, 40), rnd.randint(0, 8))),
+            rnd.choice([None, 0, 1, 2, 3]),
+        )
+        for product_id in range(1, products + 1)
+    }
+
+
+PROFILES = [
+    UserProfile(),
+    UserProfile(skin_type_ids=(1, 2), concern_ids=(3, 4, 5)),
+    UserProfile(concern_ids=(1,), avoid_ingredient_ids=(1, 2, 3, 4, 5)),
+    UserProfile(skin_type_ids=(6,), max_safety_level=SafetyLevel.caution),
+]
+
+
+def loaded(rows):
+    index = RecommendationIndex(ttl=3600)
+    index.load(sorted(rows.values()), loaded_at=0.0)
+    return index
+
+
+@pytest.mark.parametrize("profile", PROFILES)
+def test_incremental_update_matches_full_load(profile):
+    rows = catalog(300, seed=1)
+    index = loaded(rows)
+
+    rnd = random.Random(2)
+    changed = catalog(340, seed=3)
+    dirty = set(rnd.sample(sorted(rows), 60)) | set(range(301, 341))
+    for product_id in dirty:
+        rows[product_id] = changed[product_id]
+    # Удалённые товары приходят в dirty, но их нет среди строк
+    deleted = set(rnd.sample(sorted(dirty), 10))
+    for product_id in deleted:
+        rows.pop(product_id)
+    index._update(dirty, [rows[product_id] for product_id in sorted(dirty - deleted)])
+
+    expected = loaded(rows).top(profile, len(rows))
+    assert index.top(profile, len(rows)) == expected
+    assert not deleted & {product_id for product_id, _ in index.top(profile, 1000)}
+
+
+def test_top_orders_by_score_then_id():
+    rows = {
+        1: (1, [1], [], [], 0),
+        2: (2, [1], [], [], 0),
+        3: (3, [], [], [], 0),
+        4: (4, [1], [2], [], 3),
+    }
+    index = loaded(rows)
+    assert [product_id for product_id, _ in index.top(UserProfile(skin_type_ids=(1,), concern_ids=(2,)), 3)] == [4, 1, 2]
+
+
+def test_filters_exclude_avoided_ingredients_and_unsafe_products():
+    rows = {
+        1: (1, [], [], [5], 0),
+        2: (2, [], [], [6], 0),
+        3: (3, [], [], [7], 3),
+        4: (4, [], [], [], None),
+    }
+    index = loaded(rows)
+    profile = UserProfile(avoid_ingredient_ids=(5,), max_safety_level=SafetyLevel.caution)
+    assert [product_id for product_id, _ in index.top(profile, 10)] == [2]
+
+
+def test_reload_is_claimed_once_and_keeps_changes_made_during_it():
+    rows = catalog(20, seed=4)
+    index = RecommendationIndex(ttl=0)
+    index.load(sorted(rows.values()), loaded_at=0.0)
+    index.mark_dirty([1])
+
+    assert index.claim_reload()
+    assert not index.claim_reload()
+    # Изменение во время загрузки могло не попасть в прочитанные строки
+    index.mark_dirty([2])
+    index.load(sorted(rows.values()), loaded_at=0.0)
+
+    assert index._dirty == {2}
+    assert index.claim_reload()
+
+
+def test_failed_reload_can_be_claimed_again():
+    index = loaded(catalog(20, seed=5))
+    index._ttl = 0
+    assert index.claim_reload()
+    index.reload_failed()
+    assert index.claim_reload()
@@ -0,0 +1,91 @@
+from decimal import Decimal
+
+from core.enums import SafetyLevel
+from server.routines import _build_rules, check_routine
+
+INGREDIENTS = [
+    (1, "Retinol", 1),
+    (2, "Glycolic Acid", 10),
+    (3, "Salicylic Acid", 2),
+    (4, "Ascorbic Acid", None),
+    (5, "Citric Acid", None),
+    (6, "Aqua", None),
+    (7, "Hydroxypinacolone Retinoate", None),
+]
+
+
+class _Result:
+    def __init__(self, rows):
+        self.rows = rows
+
+    def all(self):
+        return self.rows
+
+
+class _Session:
+    """Справочник ингредиентов без БД: _build_rules делает один SELECT."""
+
+    def execute(self, query):
+        return _Result(INGREDIENTS)
+
+
+rules = _build_rules(_Session())
+
+
+def test_classes():
+    assert rules.classes[1] == ("retinoid",)
+    assert rules.classes[2] == ("aha",)
+    assert rules.classes[3] == ("bha",)
+    # Регулятор pH — не отшелушивающая кислота
+    assert 5 not in rules.classes
+    assert 6 not in rules.classes
+
+
+def test_conflict_across_products():
+    report = check_routine(rules, {10: [(1, None)], 20: [(2, None), (6, None)]})
+    assert report["conflicts"] == [{
+        "actives": ["retinoid", "aha"],
+        "severity": SafetyLevel.caution,
+        "reason": "Retinoids with AHAs increase irritation and barrier damage",
+        "product_ids": [10, 20],
+        "ingredient_ids": [1, 2],
+    }]
+    assert report["duplicated_actives"] == []
+
+
+def test_conflict_inside_one_product_is_ignored():
+    report = check_routine(rules, {10: [(1, None), (2, None), (3, None)], 20: [(6, None)]})
+    assert report["conflicts"] == []
+
+
+def test_citric_acid_does_not_conflict_with_retinoid():
+    report = check_routine(rules, {10: [(1, None)], 20: [(5, None)]})
+    assert report == {"conflicts": [], "duplicated_actives": [], "concentration_excess": []}
+
+
+def test_duplicated_actives():
+    report = check_routine(rules, {10: [(1, None)], 20: [(7, None)], 30: [(4, None)]})
+    assert report["duplicated_actives"] == [
+        {"active": "retinoid", "product_ids": [10, 20], "ingredient_ids": [1, 7]},
+    ]
+
+
+def test_concentration_excess_sums_products():
+    routine = {
+        10: [(2, Decimal("7"))],
+        20: [(2, Decimal("5")), (1, Decimal("0.5"))],
+        30: [(1, None)],
+    }
+    report = check_routine(rules, routine)
+    assert report["concentration_excess"] == [{
+        "ingredient_id": 2,
+        "ingredient_name": "Glycolic Acid",
+        "total_concentration": Decimal("12"),
+        "max_concentration": 10,
+        "product_ids": [10, 20],
+    }]
+
+
+def test_concentration_within_limit():
+    report = check_routine(rules, {10: [(2, Decimal("10"))], 20: [(6, Decimal("80"))]})
+    assert report["concentration_excess"] == []
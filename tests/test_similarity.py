@@ -0,0 +1,114 @@
+import random
+import time
+
+import pytest
+
+from server.similarity import SimilarityIndex, build_neighbours
+
+
+def catalog(products, seed=1):
+    """Вариации базовых рецептур: как в bench.similarity, но маленький каталог."""
+    rnd = random.Random(seed)
+    formulas = [rnd.sample(range(6, 600), rnd.randint(8, 20)) for _ in range(products // 10)]
+    rows = []
+    for product_id in range(1, products + 1):
+        base = rnd.choice(formulas)
+        kept = rnd.sample(base, len(base) - rnd.randint(0, 3))
+        extra = rnd.sample(range(6, 600), rnd.randint(0, 3))
+        rows.append((product_id, sorted(set(kept + extra + rnd.sample(range(1, 6), 2)))))
+    return rows
+
+
+def jaccard(first, second):
+    first, second = set(first), set(second)
+    return len(first & second) / len(first | second)
+
+
+def brute_force(rows, product_id, count):
+    ingredients = dict(rows)
+    scored = sorted(
+        ((-jaccard(ingredients[product_id], other), other_id) for other_id, other in rows if other_id != product_id),
+    )
+    return [(other_id, -score) for score, other_id in scored[:count] if score < 0]
+
+
+@pytest.fixture(scope="module")
+def rows():
+    return catalog(1500)
+
+
+@pytest.fixture(scope="module")
+def neighbours(rows):
+    return build_neighbours(rows, 10)
+
+
+def test_neighbour_scores_are_exact_jaccard_in_descending_order(rows, neighbours):
+    ingredients = dict(rows)
+    for product_id in range(1, 200):
+        found = neighbours.of(product_id)
+        assert len(found) <= 10
+        assert product_id not in {other_id for other_id, _ in found}
+        scores = [score for _, score in found]
+        assert scores == sorted(scores, reverse=True)
+        for other_id, score in found:
+            assert score == pytest.approx(jaccard(ingredients[product_id], ingredients[other_id]), abs=1e-6)
+
+
+def test_recall_against_brute_force(rows, neighbours):
+    found = total = 0
+    for product_id in random.Random(2).sample(range(1, len(rows) + 1), 100):
+        # Близкие соседи (Jaccard >= 0.5) LSH должен находить почти всегда
+        expected = {other_id for other_id, score in brute_force(rows, product_id, 10) if score >= 0.5}
+        found += len(expected & {other_id for other_id, _ in neighbours.of(product_id)})
+        total += len(expected)
+    assert total > 0
+    assert found / total >= 0.9
+
+
+def test_unknown_product_and_empty_catalog():
+    # None — товара нет в индексе, соседей ищет запрос к БД
+    assert build_neighbours([], 5).of(1) is None
+    neighbours = build_neighbours([(1, [1, 2]), (2, [1, 2]), (3, [9])], 5)
+    assert neighbours.of(4) is None
+    assert neighbours.of(3) == []
+    assert neighbours.of(1) == [(2, pytest.approx(1.0))]
+
+
+def test_changed_products_bypass_index_until_throttled_rebuild():
+    index = SimilarityIndex(ttl=3600, count=5, min_interval=600)
+    rows = [(1, [1, 2, 3]), (2, [1, 2, 4]), (3, [7, 8])]
+    assert index.claim_rebuild()
+    index.rebuild(rows, time.monotonic())
+    assert index.neighbours(1) == [(2, pytest.approx(0.5))]
+
+    index.mark_dirty([1])
+    # Изменённый товар считается запросом к БД, остальные — по индексу
+    assert index.neighbours(1) is None
+    assert index.neighbours(2) is not None
+    # Пересборка после изменения — не раньше min_interval с прошлой
+    assert not index.claim_rebuild()
+
+    index._built_at -= 601
+    assert index.claim_rebuild()
+    assert index.neighbours(1) is None
+    index.rebuild(rows, time.monotonic())
+    assert index.neighbours(1) is not None
+    assert not index.claim_rebuild()
+
+
+def test_failed_rebuild_keeps_changed_products_out_of_index():
+    index = SimilarityIndex(ttl=3600, count=5)
+    index.rebuild([(1, [1, 2]), (2, [1, 2])], time.monotonic())
+    index.mark_dirty([1])
+    assert index.claim_rebuild()
+    # Сборка не удалась: как в run_similarity_builder
+    index.mark_dirty()
+    assert index.neighbours(1) is None
+    assert index.claim_rebuild()
+    assert index.neighbours(1) is None
+
+
+def test_ttl_forces_rebuild_without_changes():
+    index = SimilarityIndex(ttl=60, count=5, min_interval=600)
+    index.rebuild([(1, [1])], time.monotonic() - 61)
+    assert index.claim_rebuild()